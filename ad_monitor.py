@@ -0,0 +1,287 @@
+# ad_monitor.py
+"""
+Слежение за рекламой по миниатюрам экрана вместо слепого ожидания.
+
+Раньше _handle_advertisement ждал полные WAIT секунд и тапал все
+AD_CLOSE_POINTS подряд, а ScreenProcessor.detect_advertisement_img
+всегда возвращал False. AdMonitor раз в interval снимает экран, сжимает
+его в серую миниатюру (scale от исходного размера) и ищет шаблоны
+cv2.matchTemplate (TM_CCOEFF_NORMED) — на миниатюре это доли миллисекунды:
+
+    ad_templates/close/*.png  — крестик / «Закрыть» / «>>» в углу рекламы
+    ad_templates/board/*.png  — кусок экрана игры (шапка, рамка поля):
+                                реклама уже закрылась, доска вернулась
+
+Шаблоны — вырезки из полноразмерных скриншотов того же устройства,
+сжимаются тем же scale при загрузке. Без файлов шаблон игры снимается
+с кадра самого бота перед тапом по кнопке рекламы (dismiss(board_frame=...)):
+полоса board_region (доли экрана, по умолчанию шапка с очками) — только
+на время этого ожидания. TM_CCOEFF_NORMED не чувствителен к яркости, так
+что затемнение попапа на кадре-образце совпадению не мешает.
+Состояния экрана:
+
+    "board"    — найден шаблон игры: ждать нечего;
+    "closable" — найден крестик, point — его центр в пикселях экрана;
+    "playing"  — ничего не найдено, реклама ещё идёт.
+
+watch() возвращается в момент, когда состояние перестало быть "playing"
+(или по timeout / should_stop), — тапать можно сразу, не дожидаясь конца
+WAIT. Итог последнего dismiss() — last_outcome: "closed", "not_started"
+(реклама так и не началась), "stopped" или "timeout".
+Настройки — config["ad_monitor"] (см. DEFAULT_AD_MONITOR).
+"""
+import time
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import constants as const
+
+DEFAULT_AD_MONITOR = {
+    "scale": 0.25,  # миниатюра: доля исходного размера
+    "threshold": 0.8,  # TM_CCOEFF_NORMED, ниже — не найдено
+    "interval": 0.3,  # с между кадрами
+    "board_region": [0.0, 0.0, 1.0, 0.12],  # x0, y0, x1, y1 — доли экрана
+}
+
+# однотонная вырезка совпадает с любой ровной заливкой — такой образец не берём
+MIN_TEMPLATE_STD = 8.0
+
+
+class AdState(NamedTuple):
+    state: str  # "board" | "closable" | "playing"
+    point: Optional[Tuple[int, int]] = None  # центр крестика, пиксели экрана
+    score: float = 0.0  # лучшее совпадение шаблона
+
+
+def to_thumbnail(img: np.ndarray, scale: float) -> np.ndarray:
+    """Серая уменьшенная копия кадра или шаблона."""
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    h, w = img.shape[:2]
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def load_template_dir(folder: Path) -> List[np.ndarray]:
+    """Все *.png / *.jpg папки (BGR), как EndGameHandler._load_templates."""
+    folder = Path(folder)
+    templates = []
+    for path in sorted(list(folder.glob("*.png")) + list(folder.glob("*.jpg"))):
+        img = cv2.imread(str(path))
+        if img is not None:
+            templates.append(img)
+            print(f"✅ Загружен шаблон рекламы: {path}")
+    return templates
+
+
+def best_match(thumb: np.ndarray, templates: List[np.ndarray]) -> Tuple[float, Optional[Tuple[int, int]]]:
+    """Лучшее совпадение шаблонов на миниатюре: (оценка, центр в миниатюре)."""
+    best_score, best_center = -1.0, None
+    th, tw = thumb.shape[:2]
+    for tmpl in templates:
+        h, w = tmpl.shape[:2]
+        if h > th or w > tw:
+            continue
+        res = cv2.matchTemplate(thumb, tmpl, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(res)
+        if score > best_score:
+            best_score, best_center = score, (loc[0] + w // 2, loc[1] + h // 2)
+    return best_score, best_center
+
+
+class AdMonitor:
+    def __init__(
+        self,
+        grab: Callable[[], Optional[np.ndarray]],
+        close_templates: Optional[List[np.ndarray]] = None,
+        board_templates: Optional[List[np.ndarray]] = None,
+        scale: float = DEFAULT_AD_MONITOR["scale"],
+        threshold: float = DEFAULT_AD_MONITOR["threshold"],
+        interval: float = DEFAULT_AD_MONITOR["interval"],
+        board_region=DEFAULT_AD_MONITOR["board_region"],
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        grab() -> BGR-кадр всего экрана или None.
+        Шаблоны — полноразмерные BGR-вырезки; храним уже сжатые.
+        """
+        self.grab = grab
+        self.scale = scale
+        self.threshold = threshold
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.board_region = tuple(board_region)
+        self.close_templates = [to_thumbnail(t, scale) for t in close_templates or []]
+        self.board_templates = [to_thumbnail(t, scale) for t in board_templates or []]
+        # образец доски с кадра бота — только на время одного dismiss()
+        self._captured: List[np.ndarray] = []
+
+        self.polls = 0
+        self.last_elapsed = 0.0
+        self.last_outcome: Optional[str] = None
+
+    @classmethod
+    def from_config(cls, screen_processor, config: Optional[dict], folder=None) -> "AdMonitor":
+        """Шаблоны из folder (по умолчанию const.AD_TEMPLATES_DIR), настройки — config["ad_monitor"]."""
+        params = dict(DEFAULT_AD_MONITOR)
+        params.update((config or {}).get("ad_monitor", {}))
+        folder = Path(folder or const.AD_TEMPLATES_DIR)
+        return cls(
+            screen_processor.grab_screen_cv2,
+            load_template_dir(folder / "close"),
+            load_template_dir(folder / "board"),
+            **params,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Есть хоть один шаблон — иначе монитору нечего узнавать."""
+        return bool(self.close_templates or self.board_templates)
+
+    def board_template(self, img: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Миниатюра полосы board_region кадра игры — образец «доска вернулась».
+        None — кадра нет или полоса однотонная.
+        """
+        if img is None:
+            return None
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = self.board_region
+        crop = img[int(y0 * h) : int(y1 * h), int(x0 * w) : int(x1 * w)]
+        if not crop.size:
+            return None
+        thumb = to_thumbnail(crop, self.scale)
+        if float(thumb.std()) < MIN_TEMPLATE_STD:
+            return None
+        return thumb
+
+    def _board_templates(self) -> List[np.ndarray]:
+        return self.board_templates + self._captured
+
+    # ===== Распознавание =====
+
+    def classify(self, img: Optional[np.ndarray]) -> AdState:
+        """Состояние экрана по одному кадру."""
+        if img is None:
+            return AdState("playing")
+        thumb = to_thumbnail(img, self.scale)
+
+        score, _ = best_match(thumb, self._board_templates())
+        if score >= self.threshold:
+            return AdState("board", score=score)
+
+        score, center = best_match(thumb, self.close_templates)
+        if score >= self.threshold:
+            point = (int(center[0] / self.scale), int(center[1] / self.scale))
+            return AdState("closable", point, score)
+        return AdState("playing", score=max(score, 0.0))
+
+    def is_advertisement(self, img: Optional[np.ndarray]) -> bool:
+        """
+        Реклама на экране? Крестик найден — да; без шаблонов игры про
+        остальное судить не по чему — нет (как прежний детектор).
+        """
+        state = self.classify(img).state
+        if state == "closable":
+            return True
+        return bool(self.board_templates) and img is not None and state == "playing"
+
+    # ===== Ожидание =====
+
+    def watch(
+        self,
+        timeout: float = const.WAIT,
+        until=("board", "closable"),
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> AdState:
+        """
+        Опрашивать экран, пока состояние не попадёт в until, не выйдет
+        timeout или should_stop() не вернёт True.
+        -> последнее состояние ("playing" — по таймауту / остановке).
+        """
+        started = self.clock()
+        state = AdState("playing")
+        while True:
+            state = self.classify(self.grab())
+            self.polls += 1
+            if state.state in until:
+                break
+            if self.clock() - started >= timeout:
+                break
+            if should_stop is not None and should_stop():
+                break
+            self.sleep(self.interval)
+        self.last_elapsed = self.clock() - started
+        return state
+
+    def dismiss(
+        self,
+        tap: Callable[[int, int], object],
+        timeout: float = const.WAIT,
+        closed_timeout: float = const.AD_CLOSED_TIMEOUT,
+        start_timeout: float = const.AD_START_TIMEOUT,
+        should_stop: Optional[Callable[[], bool]] = None,
+        board_frame: Optional[np.ndarray] = None,
+    ) -> bool:
+        """
+        Дождаться конца рекламы: крестик — tap(x, y) сразу, как появился.
+        board_frame — кадр игры до тапа по кнопке рекламы: образец доски
+        на это ожидание (см. board_template); start_timeout — сколько ждать,
+        пока реклама вообще появится (до того на экране ещё доска).
+        -> True, если доска вернулась (без шаблонов доски — после тапа
+        по крестику); False — иначе, причина в last_outcome.
+        """
+        captured = self.board_template(board_frame)
+        self._captured = [captured] if captured is not None else []
+        try:
+            self.last_outcome = self._dismiss(
+                tap, timeout, closed_timeout, start_timeout, should_stop
+            )
+        finally:
+            self._captured = []
+        return self.last_outcome == "closed"
+
+    def _dismiss(self, tap, timeout, closed_timeout, start_timeout, should_stop) -> str:
+        started = self.clock()
+        if self._board_templates():
+            # сразу после тапа по кнопке рекламы на экране ещё доска —
+            # «доска вернулась» засчитывается только после самой рекламы
+            first = self.watch(
+                timeout=min(timeout, start_timeout),
+                until=("playing", "closable"),
+                should_stop=should_stop,
+            )
+            if first.state == "board":
+                print("⚠️ Реклама так и не началась, на экране доска.")
+                return "not_started"
+
+        while True:
+            if should_stop is not None and should_stop():
+                return "stopped"
+            remaining = timeout - (self.clock() - started)
+            if remaining <= 0:
+                print("⏱ Крестик рекламы так и не появился.")
+                return "timeout"
+            state = self.watch(timeout=remaining, should_stop=should_stop)
+            elapsed = self.clock() - started
+            if state.state == "board":
+                print(f"✅ Реклама закрылась, доска на экране ({elapsed:.1f} с)")
+                return "closed"
+            if state.state != "closable":
+                continue
+
+            x, y = state.point
+            print(f"  → Тап по найденному крестику ({x}, {y}) через {elapsed:.1f} с")
+            tap(x, y)
+            if not self._board_templates():
+                return "closed"
+            after = self.watch(timeout=closed_timeout, until=("board",), should_stop=should_stop)
+            if after.state == "board":
+                print(f"✅ Реклама закрыта за {self.clock() - started:.1f} с")
+                return "closed"
+            # крестик был не последним (или ещё не активен) — следим дальше
@@ -0,0 +1,317 @@
+# adb_transport.py
+"""
+Транспорт adb без запуска процесса на каждую команду.
+
+`adb ...` через subprocess — это fork/exec клиента adb, который сам
+подключается к adb-серверу (localhost:5037) и пересылает ему запрос:
+десятки миллисекунд на каждый тап и кадр. Здесь тот же протокол сервера
+говорится напрямую по сокету:
+
+    запрос:  4 hex-цифры длины + текст ("host:devices", "exec:screencap")
+    ответ:   "OKAY" | "FAIL" + 4 hex-цифры длины + сообщение
+
+    host:devices                  — список устройств (ответ с длиной)
+    host:transport:<serial>       — переключить соединение на устройство
+    host:transport-any            — ... на единственное устройство
+    exec:<cmd>                    — exec-out: бинарный поток до закрытия сокета
+    shell:<cmd> / shell:          — shell (без команды — интерактивный)
+
+- exec_out()/stream() — отдельное соединение на команду (локальный TCP,
+  доли миллисекунды), вывод читается потоком; команды из разных потоков
+  идут параллельно, сервер мультиплексирует их по одному USB;
+- run() — долгоживущая интерактивная shell-сессия: команда пишется в уже
+  открытый сокет, конец вывода и код возврата — по маркеру
+  `echo __ADB_END__$((N-1+1)):$?` (эхо ввода в PTY маркер не содержит:
+  арифметику раскрывает только shell). Сессия идёт через PTY, поэтому в
+  вывод попадают эхо команды и приглашение — годится для команд, у
+  которых важен только код (тапы, sendevent);
+- exec_status() — команда, чей вывод нужен: через exec: (без PTY),
+  код возврата — маркером `echo __ADB_END__$?` в конце потока;
+- adb_command() понимает строки старого вида ("adb shell input tap 1 2",
+  'adb shell "sendevent ...; ..."', "adb exec-out screencap -p > f.png",
+  "adb devices"); остальное — ValueError, вызывающий откатывается
+  на subprocess. На subprocess можно откатиться и по AdbUnavailable
+  (сервер недоступен, команда не уходила); прочие OSError — сбой без
+  повтора: команда могла уже выполниться.
+
+Для тестов — fake_adb.FakeAdbServer с тем же протоколом.
+"""
+import os
+import re
+import shlex
+import socket
+import threading
+from typing import Iterator, Optional, Tuple
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", "5037"))
+CHUNK = 1 << 16
+
+_MARKER = "__ADB_END__"
+
+
+class AdbError(RuntimeError):
+    """Сервер ответил FAIL (нет устройства, offline, неизвестный сервис)."""
+
+
+class AdbUnavailable(ConnectionError):
+    """
+    Соединиться с сервером не удалось — до отправки команды. Только после
+    такой ошибки команду можно безопасно повторить другим путём (subprocess);
+    любая другая OSError (обрыв, таймаут) — команда могла уже выполниться.
+    """
+
+
+def _read_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("adb: соединение закрыто")
+        buf += chunk
+    return bytes(buf)
+
+
+def _request(sock: socket.socket, payload: str) -> None:
+    data = payload.encode("utf-8")
+    sock.sendall(b"%04x" % len(data) + data)
+
+
+def _read_status(sock: socket.socket) -> None:
+    status = _read_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        length = int(_read_exact(sock, 4), 16)
+        raise AdbError(_read_exact(sock, length).decode("utf-8", "replace"))
+    raise AdbError(f"неожиданный ответ adb-сервера: {status!r}")
+
+
+def parse_adb_command(cmd: str) -> Tuple[str, str, Optional[str]]:
+    """
+    "adb shell ...", "adb exec-out ... > file", "adb devices"
+    -> (вид, команда на телефоне, файл перенаправления или None).
+    Нераспознанное — ValueError.
+    """
+    args = shlex.split(cmd)
+    if len(args) < 2 or os.path.basename(args[0]) not in ("adb", "adb.exe"):
+        raise ValueError(f"не команда adb: {cmd!r}")
+    kind, rest = args[1], args[2:]
+    if kind == "devices" and not rest:
+        return kind, "", None
+    if kind not in ("shell", "exec-out") or not rest:
+        raise ValueError(f"не поддерживается транспортом: {cmd!r}")
+    redirect = None
+    if ">" in rest:
+        i = rest.index(">")
+        if i != len(rest) - 2:
+            raise ValueError(f"сложное перенаправление: {cmd!r}")
+        redirect, rest = rest[-1], rest[:i]
+    return kind, " ".join(rest), redirect
+
+
+class ShellSession:
+    """Одна интерактивная shell-сессия на телефоне (shell: без команды)."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.count = 0
+        self._buf = b""
+
+    def run(self, cmd: str) -> Tuple[int, str]:
+        """Выполнить команду и дождаться её конца. -> (код возврата, вывод)."""
+        return self.wait(self.send(cmd))
+
+    def send(self, cmd: str) -> int:
+        """Отправить команду и маркер конца. -> номер маркера для wait()."""
+        self.count += 1
+        n = self.count
+        self.sock.sendall(f"{cmd}\necho {_MARKER}$(({n - 1}+1)):$?\n".encode("utf-8"))
+        return n
+
+    def wait(self, n: int) -> Tuple[int, str]:
+        """Дочитать вывод до маркера n. -> (код возврата, вывод)."""
+        end = re.compile(rf"{_MARKER}{n}:(\d+)\r?\n".encode())
+        while True:
+            found = end.search(self._buf)
+            if found:
+                break
+            chunk = self.sock.recv(CHUNK)
+            if not chunk:
+                raise ConnectionError("adb: shell-сессия закрыта")
+            self._buf += chunk
+        out, self._buf = self._buf[: found.start()], self._buf[found.end() :]
+        return int(found.group(1)), out.decode("utf-8", "replace").replace("\r\n", "\n")
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class AdbTransport:
+    def __init__(
+        self,
+        serial: Optional[str] = None,
+        host: str = ADB_HOST,
+        port: int = ADB_PORT,
+        timeout: float = 10.0,
+    ):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._session: Optional[ShellSession] = None
+        self._session_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> Optional["AdbTransport"]:
+        """config["adb_transport"]: "socket" (по умолчанию) или "subprocess" -> None."""
+        config = config or {}
+        if config.get("adb_transport", "socket") != "socket":
+            return None
+        return cls(
+            serial=config.get("adb_serial"),
+            port=int(config.get("adb_port", ADB_PORT)),
+        )
+
+    # ===== Соединения =====
+
+    def _connect(self) -> socket.socket:
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as err:
+            raise AdbUnavailable(f"adb-сервер {self.host}:{self.port} недоступен: {err}") from err
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def open_service(self, service: str) -> socket.socket:
+        """
+        Соединение, переключённое на устройство и открытый сервис.
+        Обрыв до отправки service — AdbUnavailable.
+        """
+        sock = self._connect()
+        try:
+            try:
+                _request(
+                    sock,
+                    f"host:transport:{self.serial}" if self.serial else "host:transport-any",
+                )
+                _read_status(sock)
+            except OSError as err:
+                raise AdbUnavailable(f"adb: переключение на устройство: {err}") from err
+            _request(sock, service)
+            _read_status(sock)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def host_query(self, payload: str) -> str:
+        """Запрос к самому серверу (host:*) с ответом-строкой."""
+        with self._connect() as sock:
+            _request(sock, payload)
+            _read_status(sock)
+            length = int(_read_exact(sock, 4), 16)
+            return _read_exact(sock, length).decode("utf-8", "replace")
+
+    # ===== Команды =====
+
+    def devices(self) -> str:
+        """Вывод как у `adb devices`."""
+        return "List of devices attached\n" + self.host_query("host:devices")
+
+    def stream(self, cmd: str, chunk_size: int = CHUNK) -> Iterator[bytes]:
+        """exec-out: бинарный вывод команды кусками по мере прихода."""
+        with self.open_service(f"exec:{cmd}") as sock:
+            while True:
+                chunk = sock.recv(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def exec_out(self, cmd: str) -> bytes:
+        """exec-out: весь бинарный вывод команды."""
+        return b"".join(self.stream(cmd))
+
+    def exec_status(self, cmd: str) -> Tuple[int, str]:
+        """
+        Команда через exec: — без PTY, в выводе нет ни эха, ни приглашения.
+        -> (код возврата, вывод); код — по маркеру в конце потока.
+        """
+        text = self.exec_out(f"{cmd}; echo {_MARKER}$?").decode("utf-8", "replace")
+        found = re.search(rf"{_MARKER}(\d+)\r?\n?$", text)
+        if not found:
+            raise ConnectionError("adb: вывод exec оборван до маркера")
+        return int(found.group(1)), text[: found.start()]
+
+    def run(self, cmd: str) -> Tuple[int, str]:
+        """
+        Команда в долгоживущей shell-сессии. -> (код возврата, вывод с эхом
+        PTY). Сессия открывается при первом вызове. Оборвалась до отправки
+        команды — переоткрывается и отправка повторяется один раз; после
+        отправки (и по таймауту) команда могла выполниться — ошибка наружу,
+        без повтора.
+        """
+        with self._session_lock:
+            for attempt in range(2):
+                if self._session is None:
+                    try:
+                        self._session = ShellSession(self.open_service("shell:"))
+                    except AdbUnavailable:
+                        raise
+                    except OSError as err:
+                        # "shell:" без команды — сама команда ещё не уходила
+                        raise AdbUnavailable(f"adb: shell-сессия не открылась: {err}") from err
+                try:
+                    n = self._session.send(cmd)
+                except socket.timeout:
+                    self._drop_session()
+                    raise
+                except OSError:
+                    self._drop_session()
+                    if attempt:
+                        raise
+                    continue
+                try:
+                    return self._session.wait(n)
+                except OSError:
+                    self._drop_session()
+                    raise
+
+    def _drop_session(self) -> None:
+        self._session.close()
+        self._session = None
+
+    def adb_command(self, cmd: str, capture_output: bool = False):
+        """
+        Строка "adb ..." как у ScreenProcessor.adb_command:
+        capture_output -> вывод (str), иначе True; ненулевой код -> None.
+        Нераспознанная строка — ValueError, сервер недоступен до отправки —
+        AdbUnavailable, сбой после отправки — OSError, FAIL — AdbError.
+        """
+        kind, remote, redirect = parse_adb_command(cmd)
+        if kind == "devices":
+            out = self.devices()
+            return out.strip() if capture_output else True
+
+        if kind == "exec-out" or redirect:
+            data = self.exec_out(remote)
+            if redirect:
+                with open(redirect, "wb") as f:
+                    f.write(data)
+                return True
+            return data.decode("utf-8", "replace").strip() if capture_output else True
+
+        # вывод нужен — через exec:, в PTY-сессии к нему примешалось бы эхо
+        status, out = self.exec_status(remote) if capture_output else self.run(remote)
+        if status != 0:
+            return None
+        return out.strip() if capture_output else True
+
+    def close(self) -> None:
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
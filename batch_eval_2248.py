@@ -0,0 +1,275 @@
+# batch_eval_2248.py
+"""
+Пакетная оценка всех цепочек доски на NumPy.
+
+Цепочки доски собираются в ChainBatch:
+  index — (B, Lmax) индексы клеток, хвост забит -1;
+  mask  — (B, CELL_COUNT) матрица принадлежности клеток цепочкам (0/1).
+
+Каждое слагаемое evaluate_chain_smart / Heuristics2248.evaluate_chain
+становится столбцом матрицы признаков (B, K); оценка — признаки @ веса.
+Парные слагаемые считаются через матрицы доски (CELL_COUNT, CELL_COUNT):
+  мосты  — sum_{i в цепочке, j вне} P[i, j]  =  ((M @ P) * (1 - M)).sum(1)
+  пары   — пары равных соседей, оставшиеся вне цепочки:
+           ((R @ Q) * R).sum(1) / 2, R = 1 - M
+  изоляция — гистограмма показателей в цепочке C = M @ onehot(exp):
+           тайл изолирован, если C[e] == (сколько e на доске).
+
+Результаты совпадают со скалярными оценками один в один (целые веса —
+целочисленная арифметика int64); тест сверяет обе реализации.
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from board_engine import (
+    CELL_COUNT,
+    EXP_VALUE,
+    NEIGHBORS4,
+    PackedBoard,
+    chain_to_indices,
+)
+from constants import MAX_EXP
+from evaluate_chain_smart import CORNER_DIST, POSITION_WEIGHT
+
+# при меньшем числе цепочек скалярная оценка быстрее накладных расходов NumPy
+BATCH_MIN_CHAINS = 20
+
+_ADJ4 = np.zeros((CELL_COUNT, CELL_COUNT), dtype=bool)
+for _i in range(CELL_COUNT):
+    _ADJ4[_i, list(NEIGHBORS4[_i])] = True
+
+_POSITION = np.array(POSITION_WEIGHT, dtype=np.int64)
+_CORNER_DIST = np.array(CORNER_DIST, dtype=np.int64)
+_EXP_VALUE = np.array(EXP_VALUE, dtype=np.int64)
+_EXPS = np.arange(MAX_EXP + 1)
+# value // 128 для изолированных крупных тайлов (>= 128) по показателю
+_ISOLATION_UNITS = np.where(_EXPS >= 7, _EXP_VALUE // 128, 0)
+
+# Веса evaluate_chain_smart по столбцам smart_features
+SMART_WEIGHTS = np.array(
+    [1, 100, -40, 3, -20, 5, -30, 1, 1, 1, 25, -15], dtype=np.int64
+)
+
+
+class ChainBatch:
+    """Цепочки одной доски в матричном виде."""
+
+    def __init__(self, board: PackedBoard, chains: Sequence):
+        self.board = board
+        index_lists = [
+            list(ch) if not ch or isinstance(ch[0], int) else chain_to_indices(ch)
+            for ch in chains
+        ]
+        count = len(index_lists)
+        width = max((len(ix) for ix in index_lists), default=0)
+
+        self.index = np.full((count, width), -1, dtype=np.int64)
+        for b, ix in enumerate(index_lists):
+            self.index[b, : len(ix)] = ix
+        self.length = np.array([len(ix) for ix in index_lists], dtype=np.int64)
+
+        mask = np.zeros((count, CELL_COUNT + 1), dtype=np.int64)
+        np.put_along_axis(mask, np.where(self.index < 0, CELL_COUNT, self.index), 1, axis=1)
+        self.mask = mask[:, :CELL_COUNT]
+
+        cells = np.frombuffer(board.cells, dtype=np.uint8).astype(np.int64)
+        self.cells = cells
+        self.values = _EXP_VALUE[cells]
+        self.occupied = cells > 0
+
+    def __len__(self):
+        return len(self.length)
+
+    # ===== Общие слагаемые =====
+
+    def bridge_units(self, floor_one: bool) -> np.ndarray:
+        """
+        sum по (i в цепочке, 4-сосед j вне цепочки, тайлы равны или x2)
+        value_i // 64 (не меньше 1 при floor_one), x2 если у j одна пара.
+        """
+        cells, occ = self.cells, self.occupied
+        compat = (
+            _ADJ4
+            & occ[:, None]
+            & occ[None, :]
+            & (np.abs(cells[:, None] - cells[None, :]) <= 1)
+        )
+        units = self.values // 64
+        if floor_one:
+            units = np.maximum(units, 1)
+        single = np.array(self.board.features.potential_pairs) == 1
+        p = compat * units[:, None] * np.where(single, 2, 1)[None, :]
+        return ((self.mask @ p) * (1 - self.mask)).sum(axis=1)
+
+    def equal_pairs_left(self, weighted: bool) -> np.ndarray:
+        """Пары равных 4-соседей вне цепочки (или сумма value // 64 по ним)."""
+        occ = self.occupied
+        equal = _ADJ4 & occ[:, None] & (self.cells[:, None] == self.cells[None, :])
+        q = equal * (self.values // 64)[:, None] if weighted else equal.astype(np.int64)
+        rest = 1 - self.mask
+        return ((rest @ q) * rest).sum(axis=1) // 2
+
+    def isolation_units(self) -> np.ndarray:
+        """sum value // 128 по крупным тайлам цепочки, которых вне её не останется."""
+        onehot = (self.cells[:, None] == _EXPS[None, :]).astype(np.int64)
+        in_chain = self.mask @ onehot
+        isolated = (in_chain > 0) & (in_chain == onehot.sum(axis=0)[None, :])
+        return (in_chain * isolated) @ _ISOLATION_UNITS
+
+    def removed(self) -> np.ndarray:
+        return self.mask @ self.occupied.astype(np.int64)
+
+    def empty_neighbors(self) -> np.ndarray:
+        """Пустые 8-соседи клеток цепочки (бонус за зачистку)."""
+        return self.mask @ np.array(self.board.features.empty8, dtype=np.int64)
+
+    def straight(self) -> np.ndarray:
+        """Все шаги в одном направлении (шаг индекса однозначно задаёт направление)."""
+        if self.index.shape[1] < 2:
+            return np.zeros(len(self), dtype=bool)
+        steps = self.index[:, 1:] - self.index[:, :-1]
+        valid = self.index[:, 1:] >= 0
+        same = (steps == steps[:, :1]) | ~valid
+        return (self.length >= 2) & same.all(axis=1)
+
+
+def smart_features(batch: ChainBatch) -> np.ndarray:
+    """Матрица (B, 12) слагаемых evaluate_chain_smart (веса — SMART_WEIGHTS)."""
+    f = batch.board.features
+    length = batch.length
+    values = batch.values
+
+    base_value = batch.mask @ values
+    over5 = np.maximum(length - 5, 0)
+    position = batch.mask @ _POSITION
+    isolation = batch.isolation_units() * (length >= 2)
+
+    empty_after = CELL_COUNT - (f.occupied_count - batch.removed())
+    empty_bonus = np.where(
+        empty_after < 3, -150, np.where(empty_after < 5, -50, np.minimum(empty_after * 5, 100))
+    )
+
+    # максимум вне цепочки: первая клетка max_order, не попавшая в цепочку
+    order = np.array(f.max_order, dtype=np.int64)
+    corner = np.zeros(len(batch), dtype=np.int64)
+    growth = np.zeros(len(batch), dtype=np.int64)
+    if order.size:
+        outside = batch.mask[:, order] == 0
+        has_max = outside.any(axis=1)
+        pos_after = order[outside.argmax(axis=1)]
+        max_after = np.where(has_max, values[pos_after], 0)
+        max_before = values[order[0]]
+        k = max_after // 1024
+
+        dist_before = _CORNER_DIST[order[0]]
+        dist_after = _CORNER_DIST[pos_after]
+        corner = np.where(
+            has_max,
+            np.where(dist_after < dist_before, 100 * k, np.where(dist_after > dist_before, -120 * k, 0)),
+            0,
+        )
+        growth = np.where(max_after > max_before, 200 * k, 0)
+
+    connectivity = batch.mask @ (np.array(f.occupied4) >= 3).astype(np.int64)
+
+    return np.column_stack(
+        [
+            base_value,
+            length,
+            over5,
+            position,
+            batch.bridge_units(floor_one=False),
+            batch.empty_neighbors(),
+            isolation,
+            empty_bonus,
+            corner,
+            growth,
+            batch.equal_pairs_left(weighted=True),
+            connectivity,
+        ]
+    )
+
+
+def evaluate_chains_smart(board: PackedBoard, chains: Sequence) -> np.ndarray:
+    """Оценки evaluate_chain_smart для всех chains одним пакетом."""
+    if not chains:
+        return np.zeros(0, dtype=np.int64)
+    return smart_features(ChainBatch(board, chains)) @ SMART_WEIGHTS
+
+
+def evaluate_chains(self, chains, board: Optional[PackedBoard] = None) -> list:
+    """
+    Оценки evaluate_chain_smart списка цепочек (метод GameLogic/SmartPolicy).
+    Короткие списки — скалярно, от BATCH_MIN_CHAINS — одним пакетом.
+    """
+    if board is None:
+        board = self.packed_board()
+    if len(chains) < BATCH_MIN_CHAINS:
+        return [self.evaluate_chain_smart(chain, board) for chain in chains]
+    return evaluate_chains_smart(board, chains).tolist()
+
+
+def heuristics_features(batch: ChainBatch, center_cells: Sequence[int]) -> np.ndarray:
+    """Матрица (B, 12) слагаемых Heuristics2248.evaluate_chain."""
+    f = batch.board.features
+    cells, values = batch.cells, batch.values
+    length = batch.length
+
+    small = batch.mask @ ((cells >= 1) & (cells <= 4)).astype(np.int64)
+    center = np.asarray(center_cells, dtype=np.int64)
+    center_units = int(
+        np.where(cells[center] >= 8, np.maximum(1, values[center] // 256), 0).sum()
+    )
+
+    return np.column_stack(
+        [
+            batch.mask @ values,
+            length,
+            small,
+            np.maximum(length - 5, 0),
+            3 * (batch.mask @ _POSITION),
+            batch.bridge_units(floor_one=True),
+            batch.empty_neighbors(),
+            batch.isolation_units(),
+            batch.straight(),
+            f.occupied_count - batch.removed(),
+            batch.equal_pairs_left(weighted=False),
+            np.full(len(batch), center_units, dtype=np.int64),
+        ]
+    )
+
+
+def heuristics_weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    """Веса heuristics_weights.json в порядке столбцов heuristics_features."""
+    vector = [
+        1,
+        weights["length_bonus"],
+        weights["small_bonus"],
+        -weights.get("length_penalty_step", 40),
+        1,
+        -weights["bridge_penalty_base"],
+        5,
+        -weights["isolation_penalty_base"],
+        weights["straight_bonus"],
+        weights["open_cell_coef"],
+        weights["pair_coef"],
+        -weights["center_penalty_base"],
+    ]
+    dtype = np.int64 if all(float(w).is_integer() for w in vector) else np.float64
+    return np.array(vector, dtype=dtype)
+
+
+def evaluate_chains_heuristics(
+    board: PackedBoard,
+    chains: Sequence,
+    weights: Dict[str, float],
+    center_cells: Sequence[int],
+    weight_vector: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Оценки Heuristics2248.evaluate_chain для всех chains одним пакетом."""
+    if not chains:
+        return np.zeros(0, dtype=np.int64)
+    if weight_vector is None:
+        weight_vector = heuristics_weight_vector(weights)
+    return heuristics_features(ChainBatch(board, chains), center_cells) @ weight_vector
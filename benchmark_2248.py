@@ -0,0 +1,313 @@
+# benchmark_2248.py
+"""
+Офлайн-бенчмарк стратегии на Simulator2248 (без телефона и ADB).
+
+Каждый профиль (порядок длин из optimal_orders.json или вариант весов
+heuristics_weights.json) играет одни и те же партии с одинаковыми сидами.
+Считаем ходы/сек, решения/сек, средний максимальный тайл и распределение
+очков; результат пишем в JSON, можно сравнить с прошлым прогоном.
+
+Примеры:
+    python benchmark_2248.py --games 100
+    python benchmark_2248.py --orders 0,5,17 --games 200
+    python benchmark_2248.py --weights heuristics_weights.json new_weights.json
+    python benchmark_2248.py --baseline benchmark_prev.json --tolerance 0.1
+    python benchmark_2248.py --expectimax 2 3 --games 20
+    python benchmark_2248.py --mcts 200 800 --games 20
+    python benchmark_2248.py --beam 3 5 --games 20
+"""
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import constants as const
+from expectimax_2248 import ExpectimaxPolicy
+from find_all_chains import clear_chain_cache
+from mcts_2248 import MCTSPolicy
+from lookahead_2248 import BeamPolicy
+from simulator_2248 import HeuristicsPolicy, Simulator2248, SmartPolicy
+
+BENCH_FILE = Path("benchmark_results.json")
+
+
+def load_orders() -> List[List[int]]:
+    if not const.ORDERS_FILE.exists():
+        return []
+    try:
+        data = json.loads(const.ORDERS_FILE.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return []
+    return data.get("orders", [])
+
+
+def load_sim_config() -> dict:
+    if not const.CONFIG_FILE.exists():
+        return {}
+    try:
+        return json.loads(const.CONFIG_FILE.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+
+
+def build_profiles(
+    order_indices: List[int],
+    explicit_orders: List[List[int]],
+    weight_paths: List[str],
+    max_chain_paths: Optional[int] = None,
+    expectimax_depths: Optional[List[int]] = None,
+    mcts_iterations: Optional[List[int]] = None,
+    sim_config: Optional[dict] = None,
+    beam_depths: Optional[List[int]] = None,
+) -> Dict[str, Callable]:
+    """
+    Профили бенчмарка: имя -> политика.
+    order:<i>   — порядок #i из optimal_orders.json (ValueError, если такого нет)
+    order:[...] — явно заданный порядок
+    weights:<p> — Heuristics2248 с весами из файла (порядок — первый из заданных)
+    expectimax:<d> — Expectimax2248 глубины d (без лимита времени)
+    mcts:<n>    — MCTS2248 с n rollout'ами на ход (без лимита времени)
+    beam:<d>    — beam-поиск Lookahead2248 глубины d
+    """
+    profiles: Dict[str, Callable] = {}
+    orders = load_orders()
+
+    for idx in order_indices:
+        if not orders:
+            print(f"[BENCH] {const.ORDERS_FILE} не найден, пропускаю order:{idx}")
+            continue
+        if not 0 <= idx < len(orders):
+            raise ValueError(
+                f"order:{idx} вне диапазона: в {const.ORDERS_FILE} "
+                f"{len(orders)} порядков (0..{len(orders) - 1})"
+            )
+        profiles[f"order:{idx}"] = SmartPolicy(orders[idx], max_chain_paths)
+
+    for order in explicit_orders:
+        profiles[f"order:{order}"] = SmartPolicy(order, max_chain_paths)
+
+    base_order = const.DEFAULT_OPTIMAL_LENGTHS
+    if explicit_orders:
+        base_order = explicit_orders[0]
+    elif order_indices and orders:
+        base_order = orders[order_indices[0]]
+
+    for path in weight_paths:
+        profiles[f"weights:{path}"] = HeuristicsPolicy(
+            path, base_order, max_chain_paths=max_chain_paths
+        )
+
+    for depth in expectimax_depths or []:
+        profiles[f"expectimax:{depth}"] = ExpectimaxPolicy(
+            base_order,
+            {"depth": depth, "time_limit": None},
+            sim_config,
+            max_chain_paths=max_chain_paths,
+        )
+
+    for iterations in mcts_iterations or []:
+        profiles[f"mcts:{iterations}"] = MCTSPolicy(
+            base_order,
+            {"iterations": iterations, "time_limit": None},
+            sim_config,
+            max_chain_paths=max_chain_paths,
+        )
+
+    for depth in beam_depths or []:
+        profiles[f"beam:{depth}"] = BeamPolicy(
+            base_order,
+            {"depth": depth},
+            sim_config,
+            max_chain_paths=max_chain_paths,
+        )
+
+    if not profiles:
+        profiles[f"order:{base_order}"] = SmartPolicy(base_order, max_chain_paths)
+    return profiles
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return float(sorted_values[k])
+
+
+def run_profile(policy, games: int, seed: int, max_moves: int, sim_config: dict) -> dict:
+    """Сыграть games партий одной политикой и собрать метрики."""
+    # мемо перебора цепочек общий на процесс — сбрасываем, чтобы профили
+    # не получали чужие попадания в кэш
+    clear_chain_cache()
+
+    decision_time = 0.0
+    decisions = 0
+
+    def timed_policy(board):
+        nonlocal decision_time, decisions
+        t0 = time.perf_counter()
+        chain = policy(board)
+        decision_time += time.perf_counter() - t0
+        decisions += 1
+        return chain
+
+    scores = []
+    max_tiles = []
+    total_moves = 0
+    chain_lengths: Dict[int, int] = {}
+
+    started = time.perf_counter()
+    for g in range(games):
+        sim = Simulator2248.from_config(sim_config, seed=seed + g)
+        result = sim.play_game(timed_policy, max_moves=max_moves)
+        scores.append(result.score)
+        max_tiles.append(result.max_tile)
+        total_moves += result.moves
+        for length, count in result.chain_lengths.items():
+            chain_lengths[length] = chain_lengths.get(length, 0) + count
+    elapsed = time.perf_counter() - started
+
+    sorted_scores = sorted(scores)
+    tile_hist: Dict[str, int] = {}
+    for tile in max_tiles:
+        tile_hist[str(tile)] = tile_hist.get(str(tile), 0) + 1
+
+    return {
+        "games": games,
+        "moves": total_moves,
+        "elapsed_sec": round(elapsed, 4),
+        "moves_per_sec": round(total_moves / elapsed, 2) if elapsed else 0.0,
+        "decisions": decisions,
+        "decisions_per_sec": (
+            round(decisions / decision_time, 2) if decision_time else 0.0
+        ),
+        "avg_moves": round(total_moves / games, 2) if games else 0.0,
+        "avg_max_tile": round(statistics.mean(max_tiles), 2) if max_tiles else 0.0,
+        "max_tile_hist": dict(sorted(tile_hist.items(), key=lambda kv: int(kv[0]))),
+        "score": {
+            "mean": round(statistics.mean(scores), 2) if scores else 0.0,
+            "median": float(statistics.median(scores)) if scores else 0.0,
+            "stdev": round(statistics.pstdev(scores), 2) if scores else 0.0,
+            "min": min(scores) if scores else 0,
+            "p10": _percentile(sorted_scores, 0.1),
+            "p90": _percentile(sorted_scores, 0.9),
+            "max": max(scores) if scores else 0,
+        },
+        "chain_lengths": {str(k): v for k, v in sorted(chain_lengths.items())},
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Регрессии относительно прошлого прогона: падение решений/сек или
+    среднего счёта больше чем на tolerance (доля) для общих профилей.
+    """
+    problems = []
+    for name, cur in report["profiles"].items():
+        prev = baseline.get("profiles", {}).get(name)
+        if not prev:
+            continue
+        for label, cur_val, prev_val in (
+            ("decisions_per_sec", cur["decisions_per_sec"], prev["decisions_per_sec"]),
+            ("score.mean", cur["score"]["mean"], prev["score"]["mean"]),
+        ):
+            if prev_val and cur_val < prev_val * (1.0 - tolerance):
+                problems.append(
+                    f"{name}: {label} {prev_val} -> {cur_val} "
+                    f"({(cur_val / prev_val - 1) * 100:+.1f}%)"
+                )
+    return problems
+
+
+def _parse_int_list(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк стратегии 2248")
+    parser.add_argument("--games", type=int, default=50, help="партий на профиль")
+    parser.add_argument("--seed", type=int, default=2248, help="сид первой партии")
+    parser.add_argument("--max-moves", type=int, default=500, help="лимит ходов на партию")
+    parser.add_argument("--orders", type=_parse_int_list, default=[],
+                        help="индексы порядков из optimal_orders.json: 0,5,17")
+    parser.add_argument("--order", type=_parse_int_list, action="append", default=[],
+                        help="явный порядок длин: 4,5,3,6,2,7,8,9 (можно несколько)")
+    parser.add_argument("--weights", nargs="*", default=[],
+                        help="файлы весов Heuristics2248")
+    parser.add_argument("--expectimax", type=int, nargs="*", default=[],
+                        help="глубины Expectimax2248 для сравнения")
+    parser.add_argument("--mcts", type=int, nargs="*", default=[],
+                        help="число rollout'ов MCTS2248 на ход для сравнения")
+    parser.add_argument("--beam", type=int, nargs="*", default=[],
+                        help="глубины beam-поиска Lookahead2248 для сравнения")
+    parser.add_argument("--max-chain-paths", type=int, default=None,
+                        help="лимит путей перебора цепочек")
+    parser.add_argument("--out", default=str(BENCH_FILE), help="куда писать JSON")
+    parser.add_argument("--baseline", default=None, help="JSON прошлого прогона")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="допустимое падение метрик относительно baseline")
+    args = parser.parse_args(argv)
+
+    sim_config = load_sim_config()
+    try:
+        profiles = build_profiles(
+            args.orders,
+            args.order,
+            args.weights,
+            args.max_chain_paths,
+            args.expectimax,
+            args.mcts,
+            sim_config,
+            args.beam,
+        )
+    except ValueError as e:
+        parser.error(f"--orders: {e}")
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "settings": {
+            "games": args.games,
+            "seed": args.seed,
+            "max_moves": args.max_moves,
+            "simulator": sim_config.get("simulator", {}),
+        },
+        "profiles": {},
+    }
+
+    for name, policy in profiles.items():
+        print(f"[BENCH] {name}: {args.games} партий...")
+        stats = run_profile(policy, args.games, args.seed, args.max_moves, sim_config)
+        report["profiles"][name] = stats
+        print(
+            f"[BENCH] {name}: {stats['moves_per_sec']} ходов/с, "
+            f"{stats['decisions_per_sec']} решений/с, "
+            f"макс. тайл {stats['avg_max_tile']}, "
+            f"очки {stats['score']['mean']} (медиана {stats['score']['median']})"
+        )
+
+    out = Path(args.out)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[BENCH] Результаты сохранены в {out}")
+
+    if args.baseline:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.exists():
+            print(f"[BENCH] baseline {baseline_path} не найден")
+            return 0
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        problems = compare_with_baseline(report, baseline, args.tolerance)
+        if problems:
+            print("[BENCH] ⚠️ Регрессии относительно baseline:")
+            for line in problems:
+                print("   ", line)
+            return 1
+        print("[BENCH] ✅ Регрессий относительно baseline нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# benchmark_colors.py
+"""
+Бенчмарк оценщиков доминирующего цвета (dominant_color.ESTIMATORS).
+
+Образцы: клетки из cells/, клетки из problem_cells.json и (опционально)
+клетки, нарезанные по сетке из последних --moves скриншотов moves/.
+Эталон — старый kmeans (10 попыток) с фиксированным сидом.
+
+Для каждого оценщика:
+  ms/клетку   — среднее время оценки одной клетки;
+  совпадение  — доля клеток, где метка ColorClassifier совпала с эталоном;
+  conf        — средняя уверенность классификатора;
+  неуверенно  — клетки, не прошедшие порог distance/confidence (пустые на доске);
+  детерм.     — одинаковый ли цвет при повторном запуске.
+
+Пример:
+    python benchmark_colors.py --moves 20 --repeat 3
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+import constants as const
+from color_classifier import ColorClassifier
+from dominant_color import ESTIMATORS
+from frame_pipeline import slice_cells
+
+CONFIDENCE_THRESHOLD = 0.7  # как GameLogic.confidence_threshold
+# два прогона при разном состоянии RNG OpenCV: кто от него зависит — нестабилен
+RNG_SEED = 2248
+
+
+def load_samples(moves: int = 0, grid=None) -> List[Tuple[str, np.ndarray]]:
+    """[(имя, BGR-клетка), ...] без повторов."""
+    samples: Dict[str, np.ndarray] = {}
+
+    paths = sorted(const.CELLS_DIR.glob("cell_*.png"))
+    if const.PROBLEMS_FILE.exists():
+        try:
+            problems = json.loads(const.PROBLEMS_FILE.read_text(encoding="utf-8"))
+            paths += [Path(p["cell"]) for p in problems.get("problems", [])]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            pass
+    for path in paths:
+        if str(path) in samples or not path.exists():
+            continue
+        img = cv2.imread(str(path))
+        if img is not None:
+            samples[str(path)] = img
+
+    if moves and grid:
+        shots = sorted(
+            const.MOVES_DIR.glob("move*.png"), key=lambda p: p.stat().st_mtime
+        )[-moves:]
+        for shot in shots:
+            img = cv2.imread(str(shot))
+            if img is None:
+                continue
+            for r, row in enumerate(slice_cells(img, grid)):
+                for c, cell in enumerate(row):
+                    samples[f"{shot.name}:{r}_{c}"] = cell
+
+    return list(samples.items())
+
+
+def run_estimator(
+    name: str, samples, classifier: ColorClassifier, threshold: float, repeat: int
+) -> dict:
+    estimator = ESTIMATORS[name]
+    cv2.setRNGSeed(RNG_SEED)
+    colors = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        colors = [estimator(img) for _, img in samples]
+    elapsed = time.perf_counter() - started
+
+    cv2.setRNGSeed(RNG_SEED + 1)
+    again = [estimator(img) for _, img in samples]
+
+    results = classifier.classify(colors)
+    labels = [
+        label if dist < threshold and conf > CONFIDENCE_THRESHOLD else None
+        for label, dist, conf in results
+    ]
+    return {
+        "ms_per_cell": round(elapsed * 1000 / max(1, repeat * len(samples)), 3),
+        "labels": labels,
+        "mean_confidence": round(float(np.mean([r[2] for r in results])), 4),
+        "uncertain": sum(1 for label in labels if label is None),
+        "deterministic": colors == again,
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Бенчмарк оценщиков цвета клетки")
+    parser.add_argument("--moves", type=int, default=0,
+                        help="добавить клетки из N последних скриншотов moves/")
+    parser.add_argument("--repeat", type=int, default=1, help="повторов для замера времени")
+    parser.add_argument("--estimators", default=",".join(ESTIMATORS),
+                        help="через запятую: " + ",".join(ESTIMATORS))
+    parser.add_argument("--out", default=None, help="записать итог в JSON")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if const.CONFIG_FILE.exists():
+        config = json.loads(const.CONFIG_FILE.read_text(encoding="utf-8"))
+    if not config.get("colors"):
+        print("❌ В config.json нет обученных цветов")
+        return 1
+
+    samples = load_samples(args.moves, config.get("grid"))
+    if not samples:
+        print("❌ Нет образцов клеток")
+        return 1
+
+    classifier = ColorClassifier()
+    classifier.compile(config["colors"])
+    threshold = config.get("threshold", 8000)
+    names = [n for n in args.estimators.split(",") if n in ESTIMATORS]
+
+    print(f"[COLORS] {len(samples)} клеток, оценщики: {', '.join(names)}")
+    reference = run_estimator("kmeans", samples, classifier, threshold, 1)["labels"]
+
+    report = {}
+    print(f"{'оценщик':<10}{'ms/клетку':>11}{'совпадение':>12}{'conf':>8}"
+          f"{'неуверенно':>12}{'детерм.':>9}")
+    for name in names:
+        res = run_estimator(name, samples, classifier, threshold, args.repeat)
+        agree = sum(1 for a, b in zip(res.pop("labels"), reference) if a == b)
+        res["agreement"] = round(agree / len(samples), 4)
+        report[name] = res
+        print(
+            f"{name:<10}{res['ms_per_cell']:>11.3f}{res['agreement'] * 100:>11.1f}%"
+            f"{res['mean_confidence']:>8.3f}{res['uncertain']:>12}"
+            f"{'да' if res['deterministic'] else 'нет':>9}"
+        )
+
+    if args.out:
+        Path(args.out).write_text(
+            json.dumps({"samples": len(samples), "estimators": report},
+                       ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        print(f"[COLORS] Результаты сохранены в {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
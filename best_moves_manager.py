@@ -0,0 +1,80 @@
+# best_moves_manager.py
+"""
+Книга заранее посчитанных ходов: Zobrist-хэш доски -> лучшая цепочка.
+
+Заполняется офлайн (build_best_moves.py — глубокий поиск по корпусу
+позиций PositionMemory), в игре — поиск за O(1) по хэшу вместо поиска.
+Каждая запись помечена версией стратегии (decision_cache.
+search_strategy_version): ход, посчитанный под другой режим, порядок длин
+или веса, get() не отдаёт.
+
+Формат файла:
+{
+  "<hash hex>": {"chain": [[r, c], ...], "score": ..., "length": ...,
+                 "engine": "expectimax:3", "version": "<версия стратегии>"},
+  ...
+}
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BEST_MOVES_FILE = Path("best_moves.json")
+
+
+class BestMovesManager:
+    def __init__(self, path: Optional[Path] = BEST_MOVES_FILE):
+        self.path = Path(path) if path else None
+        self.moves: Dict[int, dict] = {}
+
+    def load(self) -> int:
+        """Загрузить книгу из файла. -> сколько позиций."""
+        if not self.path or not self.path.exists():
+            return 0
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            print(f"[BEST-MOVES] Не удалось прочитать {self.path}")
+            return 0
+
+        for h_str, entry in data.items():
+            try:
+                chain = [tuple(cell) for cell in entry["chain"]]
+                self.moves[int(h_str, 16)] = dict(entry, chain=chain)
+            except (KeyError, TypeError, ValueError):
+                continue
+        return len(self.moves)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        data = {f"{h:016x}": entry for h, entry in self.moves.items()}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def get(self, board_hash: int, version: Optional[str] = None) -> Optional[List[Tuple[int, int]]]:
+        """
+        Заранее посчитанная цепочка для доски (None — позиции нет в книге
+        или запись посчитана для другой версии стратегии).
+        """
+        entry = self.moves.get(board_hash)
+        if not entry or (version is not None and entry.get("version") != version):
+            return None
+        return entry["chain"]
+
+    def put(self, board_hash: int, chain, score: float, engine: str, version: Optional[str] = None) -> None:
+        self.moves[board_hash] = {
+            "chain": [tuple(cell) for cell in chain],
+            "score": float(score),
+            "length": len(chain),
+            "engine": engine,
+            "version": version,
+        }
+
+    def __contains__(self, board_hash: int) -> bool:
+        return board_hash in self.moves
+
+    def __len__(self) -> int:
+        return len(self.moves)
@@ -0,0 +1,343 @@
+# board_engine.py
+"""
+Компактная доска 2248 для поиска и оценки ходов.
+
+Клетки хранятся неизменяемой строкой байтов (bytes) длиной ROWS * COLS:
+в каждом байте — показатель степени тайла (0 = пусто/реклама, 1 = 2,
+2 = 4, ..., 13 = 8192). Индекс клетки: i = r * COLS + c.
+
+Так как bytes неизменяем, clone() ничего не копирует, а применение цепочки
+создаёт одну новую строку на 20 байт вместо копии list-of-lists.
+Соседи и маски соседей посчитаны один раз при импорте.
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import constants as const
+from constants import MAX_EXP
+from zobrist import hash_cells, update_hash_many
+
+CELL_COUNT = const.ROWS * const.COLS
+
+# Значение тайла по показателю: 0 -> -1 (пусто, как в list-of-lists доске)
+EXP_VALUE: Tuple[int, ...] = (-1,) + tuple(1 << e for e in range(1, MAX_EXP + 1))
+
+_DIRS4 = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+_DIRS8 = _DIRS4 + [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _build_neighbors(dirs) -> Tuple[Tuple[int, ...], ...]:
+    table = []
+    for i in range(CELL_COUNT):
+        r, c = divmod(i, const.COLS)
+        row = []
+        for dr, dc in dirs:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < const.ROWS and 0 <= nc < const.COLS:
+                row.append(nr * const.COLS + nc)
+        table.append(tuple(row))
+    return tuple(table)
+
+
+# (r, c) по индексу клетки
+CELL_RC: Tuple[Tuple[int, int], ...] = tuple(
+    divmod(i, const.COLS) for i in range(CELL_COUNT)
+)
+
+# Соседи по 4 и 8 направлениям (порядок направлений как в find_all_chains)
+NEIGHBORS4 = _build_neighbors(_DIRS4)
+NEIGHBORS8 = _build_neighbors(_DIRS8)
+
+# Те же соседи битовыми масками: бит i = клетка i
+NEIGHBOR4_MASK: Tuple[int, ...] = tuple(
+    sum(1 << j for j in NEIGHBORS4[i]) for i in range(CELL_COUNT)
+)
+NEIGHBOR8_MASK: Tuple[int, ...] = tuple(
+    sum(1 << j for j in NEIGHBORS8[i]) for i in range(CELL_COUNT)
+)
+
+# Пары соседей "вправо" и "вниз" — каждая пара один раз
+FORWARD_PAIRS: Tuple[Tuple[int, int], ...] = tuple(
+    (i, j)
+    for i in range(CELL_COUNT)
+    for j in NEIGHBORS4[i]
+    if j == i + 1 or j == i + const.COLS
+)
+
+
+def value_to_exp(value: int) -> int:
+    """Значение тайла -> показатель степени (0 для пустых клеток)."""
+    if value is None or value <= 0:
+        return 0
+    e = int(value).bit_length() - 1
+    return e if e <= MAX_EXP else MAX_EXP
+
+
+def chain_to_indices(chain: Iterable[Tuple[int, int]]) -> List[int]:
+    return [r * const.COLS + c for r, c in chain]
+
+
+def indices_to_chain(indices: Iterable[int]) -> List[Tuple[int, int]]:
+    return [CELL_RC[i] for i in indices]
+
+
+def cells_mask(indices: Iterable[int]) -> int:
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def is_straight_chain(chain: Sequence[Tuple[int, int]]) -> bool:
+    """Все шаги цепочки в одном направлении."""
+    if len(chain) < 2:
+        return False
+
+    r1, c1 = chain[0]
+    r2, c2 = chain[1]
+    dr, dc = r2 - r1, c2 - c1
+
+    for i in range(2, len(chain)):
+        r_prev, c_prev = chain[i - 1]
+        r_curr, c_curr = chain[i]
+        if (r_curr - r_prev != dr) or (c_curr - c_prev != dc):
+            return False
+
+    return True
+
+
+class PackedBoard:
+    """
+    Неизменяемая доска 5x4 из показателей степени.
+
+    cells — bytes длиной CELL_COUNT.
+    hash  — Zobrist-хэш (считается лениво и обновляется инкрементально
+            при применении цепочки).
+    """
+
+    __slots__ = ("cells", "_hash", "_values", "_occupied", "_features")
+
+    def __init__(self, cells: bytes, board_hash: Optional[int] = None):
+        self.cells = bytes(cells)
+        self._hash = board_hash
+        self._values = None
+        self._occupied = None
+        self._features = None
+
+    # ===== Конвертация =====
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[int]]) -> "PackedBoard":
+        return cls(
+            bytes(
+                value_to_exp(rows[r][c])
+                for r in range(const.ROWS)
+                for c in range(const.COLS)
+            )
+        )
+
+    def to_rows(self) -> List[List[int]]:
+        vals = self.values
+        return [
+            list(vals[r * const.COLS:(r + 1) * const.COLS])
+            for r in range(const.ROWS)
+        ]
+
+    # ===== Доступ к клеткам =====
+
+    @property
+    def values(self) -> Tuple[int, ...]:
+        """Значения тайлов по индексу клетки (-1 для пустых)."""
+        if self._values is None:
+            self._values = tuple(EXP_VALUE[e] for e in self.cells)
+        return self._values
+
+    @property
+    def occupied_mask(self) -> int:
+        """Битовая маска непустых клеток."""
+        if self._occupied is None:
+            mask = 0
+            for i, e in enumerate(self.cells):
+                if e:
+                    mask |= 1 << i
+            self._occupied = mask
+        return self._occupied
+
+    @property
+    def empty_mask(self) -> int:
+        return ((1 << CELL_COUNT) - 1) & ~self.occupied_mask
+
+    def value(self, r: int, c: int) -> int:
+        return EXP_VALUE[self.cells[r * const.COLS + c]]
+
+    def exp(self, r: int, c: int) -> int:
+        return self.cells[r * const.COLS + c]
+
+    def max_exp(self) -> int:
+        return max(self.cells)
+
+    @property
+    def features(self) -> "BoardFeatures":
+        """Таблицы признаков доски (строятся один раз, см. BoardFeatures)."""
+        if self._features is None:
+            self._features = BoardFeatures(self)
+        return self._features
+
+    # ===== Хэш =====
+
+    @property
+    def hash(self) -> int:
+        if self._hash is None:
+            self._hash = hash_cells(self.cells)
+        return self._hash
+
+    # ===== Ходы =====
+
+    def clone(self) -> "PackedBoard":
+        # bytes неизменяем — копировать нечего
+        return self
+
+    def cleared(self, indices: Iterable[int]) -> "PackedBoard":
+        """
+        Новая доска, где клетки indices стали пустыми.
+        Хэш (если уже посчитан) обновляется только по изменённым клеткам.
+        """
+        return self.with_cells((i, 0) for i in indices)
+
+    def with_cells(self, updates: Iterable[Tuple[int, int]]) -> "PackedBoard":
+        """Новая доска с заменой клеток: updates = [(index, exp), ...]."""
+        buf = bytearray(self.cells)
+        changes = []
+        for i, e in updates:
+            old = buf[i]
+            if old != e:
+                buf[i] = e
+                changes.append((i, old, e))
+        h = self._hash
+        if h is not None:
+            h = update_hash_many(h, changes)
+        return PackedBoard(bytes(buf), h)
+
+    # ===== Служебное =====
+
+    def __eq__(self, other):
+        return isinstance(other, PackedBoard) and self.cells == other.cells
+
+    def __hash__(self):
+        return hash(self.cells)
+
+    def __repr__(self):
+        return f"PackedBoard({self.to_rows()!r})"
+
+
+class BoardFeatures:
+    """
+    Признаки доски, посчитанные одним проходом, чтобы оценка цепочки
+    шла за O(длина цепочки), а не сканом всей доски на каждую цепочку.
+
+    exp_count    — гистограмма показателей (сколько клеток с каждым);
+    occupied_count — число непустых клеток;
+    potential_pairs[i] — count_potential_pairs для клетки i;
+    empty8[i]    — пустых 8-соседей у клетки i;
+    occupied4[i] — непустых 4-соседей у клетки i;
+    equal4[i]    — 4-соседи клетки i с тем же тайлом;
+    equal_pairs  — пар равных 4-соседей на доске (каждая пара один раз);
+    equal_pairs_64 — сумма value // 64 по тем же парам;
+    max_order    — непустые клетки по убыванию тайла (при равенстве —
+                   построчно): максимум без клеток цепочки — первая клетка
+                   этого списка вне цепочки.
+    """
+
+    __slots__ = (
+        "exp_count",
+        "occupied_count",
+        "potential_pairs",
+        "empty8",
+        "occupied4",
+        "equal4",
+        "equal_pairs",
+        "equal_pairs_64",
+        "max_order",
+    )
+
+    def __init__(self, board: PackedBoard):
+        cells = board.cells
+        empty = board.empty_mask
+        occupied = board.occupied_mask
+
+        exp_count = [0] * (MAX_EXP + 1)
+        for e in cells:
+            exp_count[e] += 1
+        self.exp_count = exp_count
+        self.occupied_count = CELL_COUNT - exp_count[0]
+
+        self.potential_pairs = tuple(
+            count_potential_pairs(cells, i) for i in range(CELL_COUNT)
+        )
+        self.empty8 = tuple(popcount(NEIGHBOR8_MASK[i] & empty) for i in range(CELL_COUNT))
+        self.occupied4 = tuple(
+            popcount(NEIGHBOR4_MASK[i] & occupied) for i in range(CELL_COUNT)
+        )
+        self.equal4 = tuple(
+            tuple(j for j in NEIGHBORS4[i] if cells[i] and cells[j] == cells[i])
+            for i in range(CELL_COUNT)
+        )
+        self.equal_pairs = sum(len(eq) for eq in self.equal4) // 2
+        values = board.values
+        self.equal_pairs_64 = sum(
+            len(eq) * (values[i] // 64) for i, eq in enumerate(self.equal4)
+        ) // 2
+        self.max_order = tuple(
+            sorted((i for i in range(CELL_COUNT) if cells[i]), key=lambda i: -cells[i])
+        )
+
+    def max_outside(self, chain_mask: int) -> Optional[int]:
+        """Первая клетка с максимальным тайлом вне chain_mask (или None)."""
+        for i in self.max_order:
+            if not (chain_mask >> i) & 1:
+                return i
+        return None
+
+    def same_left(self, e: int, chain_exps: Sequence[int]) -> bool:
+        """Останется ли на доске тайл e, если убрать клетки цепочки."""
+        return self.exp_count[e] > chain_exps.count(e)
+
+
+def count_potential_pairs(cells: bytes, index: int) -> int:
+    """
+    Сколько 4-соседей клетки могут с ней соединиться (равные или x2).
+    Аналог GameLogic.count_potential_pairs для упакованной доски.
+    """
+    e = cells[index]
+    if not e:
+        return 0
+    count = 0
+    for j in NEIGHBORS4[index]:
+        ej = cells[j]
+        if ej and -1 <= ej - e <= 1:
+            count += 1
+    return count
+
+
+def simulate_after_clear(board: PackedBoard, chain_mask: int) -> Tuple[int, int]:
+    """
+    (useful_cells, neighbor_pairs) после удаления клеток цепочки:
+    сколько непустых клеток останется и сколько пар равных соседей.
+    """
+    f = board.features
+    useful_cells = f.occupied_count - popcount(board.occupied_mask & chain_mask)
+
+    # пары, задетые цепочкой: с соседом вне цепочки или внутри неё (один раз)
+    lost_pairs = 0
+    m = chain_mask
+    while m:
+        low = m & -m
+        i = low.bit_length() - 1
+        m ^= low
+        for j in f.equal4[i]:
+            if not (chain_mask >> j) & 1 or i < j:
+                lost_pairs += 1
+    return useful_cells, f.equal_pairs - lost_pairs
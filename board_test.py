@@ -1,6 +1,6 @@
 # board_test.py
 from position_memory import PositionMemory
-import constants as const
+from board_engine import PackedBoard
 
 def main():
     pm = PositionMemory()
@@ -14,15 +14,7 @@ def main():
     ]
 
     # считаем тот же Zobrist-хэш, что в GameLogic.get_board_hash
-    h = 0
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            v = board[r][c]
-            if v < 0:
-                v = 0
-            if v > const.MAX_VALUE:
-                v = const.MAX_VALUE
-            h ^= const.ZOBRIST_TABLE[(r, c, v)]
+    h = PackedBoard.from_rows(board).hash
 
     print(f"hash = {h:016x}")
 
@@ -81,9 +81,17 @@ class Auto2248Bot:
         # плохие ходы / конфиг
         self.config_manager.save_bad_moves()
         self.config_manager.save_config()
+        # кэш решений — чтобы следующая сессия стартовала тёплой
+        self.game_logic.save_decision_cache()
+        # журнал виденных позиций — в сжатый массив
+        self.game_logic.position_memory.compact()
         # если у GameRunner есть статистика — дергаем её
         if hasattr(self.game_runner, "save_stats"):
             self.game_runner.save_stats()
+        # отложенные записи (bad_moves, problem_cells, good_moves, stats) — на диск
+        self.config_manager.flush()
+        # пул процессов MCTS
+        self.game_logic.close()
         print("[STATE] Сохранение завершено.")
     
     def save_for_shutdown(self):
@@ -1,74 +1,194 @@
 # build_best_moves.py
+"""
+Офлайн-предрасчёт ходов для книги best_moves.json.
+
+Доски берутся из корпуса PositionMemory (seen_positions.dat хранит
+содержимое каждой виденной позиции), каждая позиция считается
+глубоким поиском (Expectimax2248 или beam-поиск Lookahead2248)
+параллельно в пуле процессов; в игре GameLogic достаёт ход из книги
+по Zobrist-хэшу за O(1) и не ищет.
+
+Записи помечаются версией стратегии того же режима из config.json
+(search_mode = --engine, порядок длин, лимиты, веса) — книга подменяет
+в игре именно её; --depth в версию не входит. Сменили порядок, настройки
+или веса — старые записи не отдаются и пересчитываются заново.
+
+Запуск:
+    python build_best_moves.py                     # expectimax, глубина из config.json
+    python build_best_moves.py --engine beam --depth 5 --workers 4
+    python build_best_moves.py --force             # пересчитать уже известные
+"""
 import json
-from pathlib import Path
-
-from position_memory import SEEN_BOARDS_FILE  # seen_boards.json
-from find_best_chain_smart import find_best_chain_smart as find_best_chain_smart_fn
-from game_logic import GameLogic
-from config_manager import ConfigManager
-from screen_processor import ScreenProcessor
-from input_controller import InputController
-
-BEST_MOVES_FILE = Path("best_moves.json")
-
-
-def load_seen_hashes():
-    if not SEEN_BOARDS_FILE.exists():
-        return []
-    data = json.loads(SEEN_BOARDS_FILE.read_text(encoding="utf-8"))
-    hashes = data.get("seen_hashes", [])
-    return [int(h, 16) for h in hashes]
-
-
-def main():
-    # Инициализируем окружение, как в боте
-    cfg = ConfigManager()
-    sp = ScreenProcessor(cfg)
-    ic = InputController(cfg)
-    gl = GameLogic(cfg, sp, ic)
-
-    seen_hashes = load_seen_hashes()
-    print(f"[BUILD] Найдено {len(seen_hashes)} уникальных позиций")
-
-    best_moves: dict[str, dict] = {}
-
-    for h in seen_hashes:
-        h_hex = f"{h:016x}"
-        print(f"\n[BUILD] Обработка позиции {h_hex}")
-
-        # ТУТ ВОПРОС: откуда взять board по этому хэшу?
-        # В тестовом варианте можно:
-        # - либо уже иметь сохранённые board-ы где-то в файлах;
-        # - либо пропустить этот шаг и просто показать структуру.
-
-        board = gl.board  # заглушка: нужно заменить на реальную загрузку доски
-
-        best_chain = find_best_chain_smart_fn(
-            board,
-            h,
-            gl.is_move_blacklisted,
-            gl.evaluate_chain_smart,
-            gl.find_all_chains,
-        )
-
-        if not best_chain:
-            print("[BUILD] Нет допустимых цепочек")
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import constants as const
+from best_moves_manager import BEST_MOVES_FILE, BestMovesManager
+from board_engine import PackedBoard
+from decision_cache import search_strategy_version, weights_digest
+from expectimax_2248 import Expectimax2248
+from lookahead_2248 import Lookahead2248, beam_params
+from position_memory import SEEN_POSITIONS_FILE, PositionMemory
+from simulator_2248 import Simulator2248, SmartPolicy
+
+# Поисковик воркера создаётся один раз через initializer пула
+_worker_search = None
+
+
+class PositionSearch:
+    """Глубокий поиск одной позиции: (cells) -> (цепочка, ценность)."""
+
+    def __init__(self, engine: str, optimal_lengths, config: dict, depth=None):
+        self.engine = engine
+        policy = SmartPolicy(optimal_lengths, config.get("max_chain_paths"))
+        sim = Simulator2248.from_config(config)
+        if engine == "beam":
+            from heuristics_2248 import Heuristics2248
+
+            heur = Heuristics2248(None)
+            heur.verbose = False
+            self.params = beam_params(config)
+            if depth is not None:
+                self.params["depth"] = depth
+            self.lookahead = Lookahead2248(policy, heur, sim)
+            self.label = f"beam:{self.params['depth']}"
+        else:
+            section = dict(config.get("expectimax", {}), time_limit=None)
+            if depth is not None:
+                section["depth"] = depth
+            self.expectimax = Expectimax2248.from_config(
+                policy, {"expectimax": section}, sim
+            )
+            self.label = f"expectimax:{self.expectimax.depth}"
+
+    def __call__(self, cells: bytes) -> Tuple[Optional[list], float]:
+        board = PackedBoard(cells)
+        if self.engine == "beam":
+            pv, value = self.lookahead.beam_search(board, **self.params)
+            return (pv[0] if pv else None), value
+        return self.expectimax.search(board)
+
+
+def _init_worker(engine, optimal_lengths, config, depth) -> None:
+    global _worker_search
+    _worker_search = PositionSearch(engine, optimal_lengths, config, depth)
+
+
+def _search_position(task: Tuple[int, bytes]):
+    board_hash, cells = task
+    chain, value = _worker_search(cells)
+    return board_hash, chain, value
+
+
+def load_config() -> dict:
+    if not const.CONFIG_FILE.exists():
+        return {}
+    try:
+        return json.loads(const.CONFIG_FILE.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+
+
+def load_current_order() -> List[int]:
+    """Текущий порядок длин из optimal_orders.json (как GameLogic.load_current_order)."""
+    try:
+        data = json.loads(const.ORDER_FILE.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return list(const.DEFAULT_OPTIMAL_LENGTHS)
+    orders = data.get("orders", [])
+    if not orders:
+        return list(const.DEFAULT_OPTIMAL_LENGTHS)
+    return orders[data.get("current_index", 0) % len(orders)]
+
+
+def build_best_moves(
+    memory: PositionMemory,
+    book: BestMovesManager,
+    engine: str = "expectimax",
+    optimal_lengths: Optional[List[int]] = None,
+    config: Optional[dict] = None,
+    depth: Optional[int] = None,
+    workers: int = 1,
+    force: bool = False,
+    limit: Optional[int] = None,
+) -> int:
+    """
+    Посчитать ходы для позиций корпуса, которых нет в книге для текущей
+    версии стратегии (force — для всех). workers > 1 — пул процессов.
+    -> сколько добавлено.
+    """
+    optimal_lengths = list(optimal_lengths or const.DEFAULT_OPTIMAL_LENGTHS)
+    config = config or {}
+    version = search_strategy_version(engine, optimal_lengths, config, weights_digest())
+    tasks = [
+        (board_hash, bytes(board.cells))
+        for board_hash, board in memory.positions()
+        if force or book.get(board_hash, version) is None
+    ][:limit]
+    if not tasks:
+        return 0
+
+    label = PositionSearch(engine, optimal_lengths, config, depth).label
+    initargs = (engine, optimal_lengths, config, depth)
+    if workers > 1:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=initargs
+        ) as pool:
+            results = list(pool.map(_search_position, tasks, chunksize=8))
+    else:
+        _init_worker(*initargs)
+        results = [_search_position(task) for task in tasks]
+
+    added = 0
+    for board_hash, chain, value in results:
+        if chain is None:
             continue
+        book.put(board_hash, chain, value, label, version)
+        added += 1
+    return added
+
+
+def _parse_int_list(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Предрасчёт best_moves.json")
+    parser.add_argument("--engine", choices=["expectimax", "beam"], default="expectimax")
+    parser.add_argument("--depth", type=int, default=None, help="глубина поиска")
+    parser.add_argument("--order", type=_parse_int_list, default=None,
+                        help="порядок длин: 4,5,3,6,2,7,8,9 (по умолчанию текущий)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="процессов в пуле")
+    parser.add_argument("--limit", type=int, default=None, help="не больше N позиций")
+    parser.add_argument("--force", action="store_true",
+                        help="пересчитать позиции, уже записанные в книгу")
+    args = parser.parse_args(argv)
+
+    memory = PositionMemory(SEEN_POSITIONS_FILE)
+    print(
+        f"[BUILD] Позиций: {len(memory)}, из них с сохранённой доской: "
+        f"{memory.board_count()}"
+    )
 
-        score = gl.evaluate_chain_smart(best_chain)
-        print(f"[BUILD] Лучшая цепочка: {best_chain}, score={score:.1f}")
-
-        best_moves[h_hex] = {
-            "chain": best_chain,
-            "score": score,
-            "length": len(best_chain),
-        }
-
-    BEST_MOVES_FILE.write_text(
-        json.dumps(best_moves, ensure_ascii=False, indent=2),
-        encoding="utf-8",
+    book = BestMovesManager(BEST_MOVES_FILE)
+    book.load()
+    added = build_best_moves(
+        memory,
+        book,
+        args.engine,
+        args.order or load_current_order(),
+        load_config(),
+        args.depth,
+        args.workers,
+        args.force,
+        args.limit,
     )
-    print(f"\n[BUILD] best_moves.json сохранён ({len(best_moves)} позиций)")
+    book.save()
+    print(f"[BUILD] best_moves.json сохранён: +{added}, всего {len(book)} позиций")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+# color_classifier.py
+"""
+Классификатор цвета клетки по выученным образцам config["colors"].
+
+Образцы компилируются один раз в матрицу (N, 3) float32, отсортированную по
+меткам, плюс индекс начала каждой метки. Все клетки доски классифицируются
+одним broadcast-расчётом расстояний (K, N) и np.minimum.reduceat по меткам.
+
+Семантика как у старого цикла в recognize_board_with_confidence:
+  best   — метка с минимальным расстоянием до ближайшего образца
+           (при равенстве — первая в порядке config["colors"]);
+  second — минимальное расстояние среди остальных меток;
+  confidence = 1 - best / (best + second), 1.0 если сумма 0,
+               0.0 если меток с образцами меньше двух.
+
+Если образцов много (>= KDTREE_MIN_SAMPLES) и есть scipy, минимум по каждой
+метке ищется в её KD-дереве вместо полной матрицы расстояний.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy нужен только для больших наборов образцов
+    cKDTree = None
+
+KDTREE_MIN_SAMPLES = 2000
+
+
+class ColorClassifier:
+    def __init__(self):
+        self.labels: List[str] = []
+        self.samples = np.empty((0, 3), dtype=np.float32)
+        self.starts = np.empty(0, dtype=np.intp)
+        self.trees = None
+        self._signature = None
+
+    @staticmethod
+    def signature(colors: Dict[str, list]):
+        """
+        Дешёвый отпечаток словаря цветов: объект, метки, списки и их длины.
+        Замена словаря/списка или добавление образца меняет отпечаток.
+        """
+        return (id(colors),) + tuple(
+            (label, id(samples), len(samples)) for label, samples in colors.items()
+        )
+
+    def compile(self, colors: Dict[str, list]) -> None:
+        labels = []
+        starts = []
+        rows = []
+        for label, samples in colors.items():
+            if not samples:
+                continue
+            labels.append(label)
+            starts.append(len(rows))
+            rows.extend(samples)
+
+        self.labels = labels
+        self.starts = np.asarray(starts, dtype=np.intp)
+        self.samples = (
+            np.asarray(rows, dtype=np.float32).reshape(-1, 3)
+            if rows
+            else np.empty((0, 3), dtype=np.float32)
+        )
+        self.trees = None
+        if cKDTree is not None and len(rows) >= KDTREE_MIN_SAMPLES:
+            ends = list(starts[1:]) + [len(rows)]
+            self.trees = [
+                cKDTree(self.samples[a:b]) for a, b in zip(starts, ends)
+            ]
+        self._signature = self.signature(colors)
+
+    def ensure_compiled(self, colors: Dict[str, list]) -> None:
+        """Перекомпилировать, только если цвета поменялись."""
+        if self._signature != self.signature(colors):
+            self.compile(colors)
+
+    def _label_min_distances(self, query: np.ndarray) -> np.ndarray:
+        """Расстояние от каждой клетки до ближайшего образца каждой метки: (K, L)."""
+        if self.trees is not None:
+            return np.stack(
+                [tree.query(query)[0] for tree in self.trees], axis=1
+            ).astype(np.float32)
+        diff = query[:, None, :] - self.samples[None, :, :]
+        dist = np.sqrt(np.einsum("kni,kni->kn", diff, diff))
+        return np.minimum.reduceat(dist, self.starts, axis=1)
+
+    def classify(
+        self, colors: Sequence[Sequence[int]]
+    ) -> List[Tuple[Optional[str], float, float]]:
+        """
+        colors — список RGB клеток.
+        Возвращает [(метка, расстояние до неё, confidence), ...] в том же порядке.
+        """
+        if not len(colors):
+            return []
+        if not self.labels:
+            return [(None, float("inf"), 0.0)] * len(colors)
+
+        query = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        label_min = self._label_min_distances(query)
+
+        best_idx = np.argmin(label_min, axis=1)
+        rows = np.arange(len(query))
+        best = label_min[rows, best_idx]
+        if len(self.labels) > 1:
+            label_min[rows, best_idx] = np.inf
+            second = label_min.min(axis=1)
+        else:
+            second = np.full(len(query), np.inf, dtype=np.float32)
+
+        total = best + second
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidence = np.where(total > 0, 1.0 - best / total, 1.0)
+        confidence = np.where(np.isfinite(second), confidence, 0.0)
+
+        return [
+            (self.labels[b], float(d), float(conf))
+            for b, d, conf in zip(best_idx, best, confidence)
+        ]
@@ -2,6 +2,7 @@ import json
 from pathlib import Path
 from collections import defaultdict, deque
 import constants as const
+from persistence import store
 
 
 class ConfigManager:
@@ -16,6 +17,12 @@ class ConfigManager:
         self.load_bad_moves()
         self.load_good_moves()  # ⭐ загрузка хороших ходов
 
+        # save_* только помечают файлы — пишет фоновый поток (persistence)
+        store.register(
+            const.PROBLEMS_FILE, self._problem_cells_data, default=const.json_serializer
+        )
+        store.register(const.BAD_MOVES_FILE, self._bad_moves_data)
+
     def load_config(self):
         if const.CONFIG_FILE.exists():
             try:
@@ -74,14 +81,15 @@ class ConfigManager:
             except Exception:
                 self.problem_cells = []
 
-    def save_problem_cells(self):
+    def _problem_cells_data(self):
         data = {"problems": self.problem_cells[-50:]}
         for problem in data["problems"]:
             if "color" in problem and isinstance(problem["color"], (list, tuple)):
                 problem["color"] = [int(c) for c in problem["color"]]
+        return data
 
-        with open(const.PROBLEMS_FILE, "w") as f:
-            json.dump(data, f, indent=2, default=const.json_serializer)
+    def save_problem_cells(self):
+        store.mark_dirty(const.PROBLEMS_FILE)
 
     def load_bad_moves(self):
         if const.BAD_MOVES_FILE.exists():
@@ -94,9 +102,11 @@ class ConfigManager:
             except Exception:
                 self.bad_moves = defaultdict(list)
 
+    def _bad_moves_data(self):
+        return {k: list(v) for k, v in list(self.bad_moves.items())}
+
     def save_bad_moves(self):
-        with open(const.BAD_MOVES_FILE, "w") as f:
-            json.dump(dict(self.bad_moves), f, indent=2)
+        store.mark_dirty(const.BAD_MOVES_FILE)
 
     # ===== ХОРОШИЕ ХОДЫ =====
 
@@ -121,6 +131,10 @@ class ConfigManager:
             data = {str(k): v for k, v in self.good_moves.items()}
             json.dump(data, f, indent=2)
 
+    def flush(self):
+        """Сбросить на диск всё, что ждёт отложенной записи (выход, SIGINT)."""
+        store.flush()
+
     def reset_all(self):
         """Сбросить все настройки"""
         self.config = const.DEFAULT_CONFIG.copy()
@@ -1,7 +1,6 @@
 from pathlib import Path
 from datetime import datetime
 import json
-import random
 
 # Размеры доски
 ROWS, COLS = 5, 4
@@ -55,6 +54,13 @@ DEFAULT_CONFIG = {
     "max_samples": 20,
     "ad_timeout": 60,
     "max_same_move_attempts": 2,
+    "max_chain_paths": 20000,
+    "save_frames": False,
+    "color_estimator": "kmeans",
+    "capture_mode": "raw",
+    "capture_crop": True,
+    "search_mode": "smart",
+    "decision_cache_mb": 16,
 }
 
 # ABS_MT границы поля (из getevent)
@@ -81,8 +87,16 @@ RESTART_BTN_Y = 30412
 END_SCREENS_DIR = Path("end_screens")
 END_MSE_THRESHOLD = 200.0
 
+# Шаблоны рекламы: close/ — крестики, board/ — экран игры (см. ad_monitor.py)
+AD_TEMPLATES_DIR = Path("ad_templates")
+AD_CLOSED_TIMEOUT = 5  # с: после тапа по крестику ждём возврата доски
+AD_START_TIMEOUT = 20  # с: после тапа по кнопке рекламы ждём, пока она начнётся
+
 ORDERS_FILE = Path("optimal_orders.json")
 
+# Порядок длин цепочек по умолчанию (если optimal_orders.json нет)
+DEFAULT_OPTIMAL_LENGTHS = [4, 5, 3, 6, 2, 7, 8, 9]
+
 
 # JSON сериализатор для numpy и дат
 def json_serializer(obj):
@@ -99,15 +113,8 @@ def json_serializer(obj):
 
 # ===== ZOBRIST-ХЕШ ДЛЯ ДОСКИ =====
 
-# Максимальное значение числа на клетке (подбери под свой максимум тайла в 2248)
-MAX_VALUE = 4096
+# Максимальный показатель степени тайла (2^20), ключи Zobrist — по показателю
+MAX_EXP = 20
 
-# Фиксируем сид, чтобы таблица была стабильна между запусками
-random.seed(2248)
-
-ZOBRIST_TABLE = {
-    (r, c, v): random.getrandbits(64)
-    for r in range(ROWS)
-    for c in range(COLS)
-    for v in range(0, MAX_VALUE + 1)
-}
+# Сид таблицы Zobrist, чтобы хэши были стабильны между запусками
+ZOBRIST_SEED = 2248
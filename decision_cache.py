@@ -0,0 +1,200 @@
+# decision_cache.py
+"""
+Кэш решений: (Zobrist-хэш доски, версия стратегии) -> выбранная цепочка.
+
+- версия стратегии — короткий дайджест всего, от чего зависит выбор хода
+  (режим поиска, порядок длин, лимиты перебора, веса); сменили порядок
+  или веса — старые ответы просто не находятся и со временем вытесняются;
+- LRU: OrderedDict, при попадании запись уходит в конец, при превышении
+  бюджета памяти (max_bytes, оценка по размеру записи) вытесняются
+  самые старые;
+- цепочка хранится компактно — bytes индексов клеток;
+- save()/load() — JSON в порядке LRU (от старых к новым), запись через
+  временный файл, чтобы не потерять кэш при обрыве;
+- счётчики hits/misses/evictions и среднее время поиска при промахе —
+  по ним видно, сколько времени кэш сэкономил.
+
+Формат файла:
+{
+  "entries": [["<hash hex>", "<версия>", "<индексы hex>"], ...],
+  "stats": {"hits": ..., "misses": ..., "evictions": ..., ...}
+}
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from board_engine import chain_to_indices, indices_to_chain
+from find_all_chains import DEFAULT_MAX_PATHS
+
+DECISION_CACHE_FILE = Path("decision_cache.json")
+
+# оценка памяти на запись: ключ-кортеж, int хэша, строка версии, bytes,
+# узел OrderedDict
+_ENTRY_OVERHEAD = 260
+
+
+def strategy_version(*parts) -> str:
+    """Дайджест параметров стратегии (любые JSON-сериализуемые значения)."""
+    raw = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=6).hexdigest()
+
+
+def weights_digest(path=Path("heuristics_weights.json")) -> str:
+    """Дайджест файла весов эвристик ("" — файла нет)."""
+    path = Path(path)
+    return strategy_version(path.read_text(encoding="utf-8")) if path.exists() else ""
+
+
+def search_strategy_version(search_mode: str, optimal_lengths, config: dict, weights: str = "") -> str:
+    """
+    Версия стратегии поиска хода из config: режим, порядок длин, лимит
+    перебора, настройки режима и дайджест весов. Общая для кэша решений
+    и книги best_moves.json.
+    """
+    return strategy_version(
+        search_mode,
+        list(optimal_lengths),
+        config.get("max_chain_paths", DEFAULT_MAX_PATHS),
+        config.get(search_mode, {}),
+        weights,
+    )
+
+
+class DecisionCache:
+    def __init__(self, path: Optional[Path] = DECISION_CACHE_FILE, max_bytes: int = 16 << 20):
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Tuple[int, str], bytes]" = OrderedDict()
+        self.bytes_used = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.search_time = 0.0  # суммарное время поиска при промахах, с
+        self.searches = 0
+
+    @staticmethod
+    def _entry_size(value: bytes) -> int:
+        return _ENTRY_OVERHEAD + len(value)
+
+    # ===== Публичный API =====
+
+    def get(self, board_hash: int, version: str) -> Optional[List[Tuple[int, int]]]:
+        key = (board_hash, version)
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return indices_to_chain(value)
+
+    def put(self, board_hash: int, version: str, chain) -> None:
+        key = (board_hash, version)
+        value = bytes(chain_to_indices(chain))
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes_used -= self._entry_size(old)
+        self.entries[key] = value
+        self.bytes_used += self._entry_size(value)
+        self._evict()
+
+    def discard(self, board_hash: int, version: str) -> None:
+        """Убрать запись (например, ход попал в bad_moves)."""
+        old = self.entries.pop((board_hash, version), None)
+        if old is not None:
+            self.bytes_used -= self._entry_size(old)
+
+    def record_search(self, seconds: float) -> None:
+        """Время одного поиска при промахе — для оценки сэкономленного."""
+        self.search_time += seconds
+        self.searches += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        avg_search = self.search_time / self.searches if self.searches else 0.0
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes_used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_search_sec": avg_search,
+            "saved_sec": self.hits * avg_search,
+        }
+
+    def summary(self) -> str:
+        st = self.stats()
+        return (
+            f"записей {st['entries']} ({st['bytes'] / 1024:.0f} КБ), "
+            f"попаданий {st['hits']}, промахов {st['misses']} "
+            f"({st['hit_rate']:.0%}), вытеснено {st['evictions']}, "
+            f"сэкономлено ~{st['saved_sec']:.1f} с"
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ===== Работа с файлом =====
+
+    def load(self) -> int:
+        """Загрузить записи из файла (поверх текущих). -> сколько загружено."""
+        if not self.path or not self.path.exists():
+            return 0
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            print(f"[DECISION-CACHE] Не удалось прочитать {self.path}, начинаю с пустого")
+            return 0
+
+        loaded = 0
+        for item in data.get("entries", []):
+            try:
+                h_str, version, chain_hex = item
+                value = bytes.fromhex(chain_hex)
+                board_hash = int(h_str, 16)
+            except (TypeError, ValueError):
+                continue
+            key = (board_hash, version)
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes_used -= self._entry_size(old)
+            self.entries[key] = value
+            self.bytes_used += self._entry_size(value)
+            loaded += 1
+
+        # среднее время поиска переносим, чтобы оценка экономии не начиналась с нуля
+        st = data.get("stats", {})
+        if not self.searches and st.get("avg_search_sec"):
+            self.search_time = float(st["avg_search_sec"])
+            self.searches = 1
+        self._evict(count=False)
+        return loaded
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        data = {
+            "entries": [
+                [f"{h:016x}", version, value.hex()]
+                for (h, version), value in self.entries.items()
+            ],
+            "stats": self.stats(),
+        }
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    # ===== Служебное =====
+
+    def _evict(self, count: bool = True) -> None:
+        while self.bytes_used > self.max_bytes and self.entries:
+            _, value = self.entries.popitem(last=False)
+            self.bytes_used -= self._entry_size(value)
+            if count:
+                self.evictions += 1
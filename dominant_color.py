@@ -0,0 +1,112 @@
+# dominant_color.py
+"""
+Оценка доминирующего цвета клетки (RGB) по BGR-картинке.
+
+Стратегия выбирается в config["color_estimator"]:
+  "kmeans"  — старый вариант (по умолчанию): cv2.kmeans, 3 кластера,
+              10 попыток со случайными центрами (медленно и
+              недетерминированно, но на нём обучены цвета в config);
+  "kmeans1" — одна попытка k-means от начального разбиения по яркости
+              (трети пикселей) — детерминированно и без глобального RNG
+              OpenCV, но с эталоном совпадает не лучше "median";
+  "median"  — медиана по каналам центрального квадрата клетки;
+  "hist"    — мода квантованной гистограммы центрального квадрата
+              (4 бита на канал), итоговый цвет — среднее пикселей в самой
+              частой корзине. Центр берём потому, что фон между плитками —
+              один точный цвет и забирает моду у градиентной плитки.
+
+Все варианты сначала сжимают клетку до 50x50, как раньше.
+"""
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+DEFAULT_ESTIMATOR = "kmeans"
+SAMPLE_SIZE = 50
+CENTER_FRACTION = 0.5  # доля стороны клетки для "median"
+HIST_BITS = 4
+KMEANS_CLUSTERS = 3
+
+_warned = set()
+
+
+def _small_rgb_pixels(img: np.ndarray) -> np.ndarray:
+    img_small = cv2.resize(img, (SAMPLE_SIZE, SAMPLE_SIZE))
+    return cv2.cvtColor(img_small, cv2.COLOR_BGR2RGB).reshape(-1, 3)
+
+
+def _kmeans(pixels: np.ndarray, attempts: int, flags: int, labels=None) -> List[int]:
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+    _, labels, centers = cv2.kmeans(
+        np.float32(pixels), KMEANS_CLUSTERS, labels, criteria, attempts, flags
+    )
+    centers = np.uint8(centers)
+    counts = np.bincount(labels.ravel(), minlength=len(centers))
+    dominant_color = centers[np.argmax(counts)]
+    return [int(dominant_color[0]), int(dominant_color[1]), int(dominant_color[2])]
+
+
+def kmeans_color(img: np.ndarray) -> List[int]:
+    return _kmeans(_small_rgb_pixels(img), 10, cv2.KMEANS_RANDOM_CENTERS)
+
+
+def _brightness_labels(pixels: np.ndarray) -> np.ndarray:
+    """Начальные метки: пиксели по яркости, разрезанные на равные трети."""
+    order = np.argsort(pixels.astype(np.int32).sum(axis=1), kind="stable")
+    labels = np.empty(len(pixels), dtype=np.int32)
+    labels[order] = np.arange(len(pixels)) * KMEANS_CLUSTERS // len(pixels)
+    return labels.reshape(-1, 1)
+
+
+def kmeans_once_color(img: np.ndarray) -> List[int]:
+    pixels = _small_rgb_pixels(img)
+    return _kmeans(
+        pixels, 1, cv2.KMEANS_USE_INITIAL_LABELS, _brightness_labels(pixels)
+    )
+
+
+def _center_pixels(img: np.ndarray) -> np.ndarray:
+    """Центральный квадрат клетки: без фона между плитками."""
+    pixels = _small_rgb_pixels(img).reshape(SAMPLE_SIZE, SAMPLE_SIZE, 3)
+    margin = int(SAMPLE_SIZE * (1 - CENTER_FRACTION) / 2)
+    center = pixels[margin : SAMPLE_SIZE - margin, margin : SAMPLE_SIZE - margin]
+    return center.reshape(-1, 3)
+
+
+def median_color(img: np.ndarray) -> List[int]:
+    med = np.median(_center_pixels(img), axis=0)
+    return [int(round(v)) for v in med]
+
+
+def hist_mode_color(img: np.ndarray) -> List[int]:
+    pixels = _center_pixels(img)
+    shift = 8 - HIST_BITS
+    q = (pixels >> shift).astype(np.intp)
+    bins = (q[:, 0] << (2 * HIST_BITS)) | (q[:, 1] << HIST_BITS) | q[:, 2]
+    mode = np.argmax(np.bincount(bins, minlength=1 << (3 * HIST_BITS)))
+    mean = pixels[bins == mode].mean(axis=0)
+    return [int(round(v)) for v in mean]
+
+
+ESTIMATORS: Dict[str, Callable[[np.ndarray], List[int]]] = {
+    "kmeans": kmeans_color,
+    "kmeans1": kmeans_once_color,
+    "median": median_color,
+    "hist": hist_mode_color,
+}
+
+
+def estimate_dominant_color(
+    img: Optional[np.ndarray], method: str = DEFAULT_ESTIMATOR
+) -> Optional[List[int]]:
+    """Доминирующий цвет [R, G, B] или None для пустой картинки."""
+    if img is None or img.size == 0:
+        return None
+    estimator = ESTIMATORS.get(method)
+    if estimator is None:
+        if method not in _warned:
+            _warned.add(method)
+            print(f"⚠️ Неизвестный color_estimator={method!r}, использую {DEFAULT_ESTIMATOR}")
+        estimator = ESTIMATORS[DEFAULT_ESTIMATOR]
+    return estimator(img)
@@ -1,9 +1,12 @@
 from pathlib import Path
-import time
 import cv2
 import numpy as np
 import constants as const
 import inspect
+from settle_detector import SettleDetector
+
+RESTART_SETTLE_TIMEOUT = 2.0  # с, не дольше прежней паузы
+RESTART_MIN_WAIT = 0.3  # с, пока тап дойдёт и начнётся переход
 
 
 class EndGameHandler:
@@ -22,6 +25,10 @@ class EndGameHandler:
         self.sp = screen_processor
         self.threshold = const.END_MSE_THRESHOLD
         self.restart_xy = (const.RESTART_BTN_X, const.RESTART_BTN_Y)
+        # после рестарта ждём, пока новая доска не встанет, а не 2 с наугад
+        self.settle = SettleDetector.from_config(
+            screen_processor, getattr(screen_processor, "config", None)
+        )
 
         # Загружаем шаблоны один раз
         self.win_templates, self.lose_templates = self._load_templates(
@@ -103,4 +110,4 @@ class EndGameHandler:
         cmd = f"adb shell input tap {x} {y}"
         print(f"🔁 Тап по кнопке рестарта ({x}, {y})")
         self.sp.adb_command(cmd)
-        time.sleep(2.0)
+        self.settle.wait(timeout=RESTART_SETTLE_TIMEOUT, min_wait=RESTART_MIN_WAIT)
@@ -1,18 +1,52 @@
 # evaluate_chain_smart.py
 import constants as const
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
+
+from board_engine import (
+    CELL_COUNT,
+    CELL_RC,
+    NEIGHBORS4,
+    PackedBoard,
+    popcount,
+)
 
 if TYPE_CHECKING:
     from game_logic import GameLogic
 
 
-def evaluate_chain_smart(self: 'GameLogic', chain):
-    print("[EVAL_FN] called, len(chain) =", len(chain))
+_CENTER_R, _CENTER_C = const.ROWS // 2, const.COLS // 2
+_CORNER = (const.ROWS - 1, 0)
+
+# позиционный вес клетки: max(0, 10 - 2 * расстояние до центра)
+POSITION_WEIGHT = tuple(
+    max(0, 10 - (abs(r - _CENTER_R) + abs(c - _CENTER_C)) * 2) for r, c in CELL_RC
+)
+
+# манхэттен до "угла силы"
+CORNER_DIST = tuple(abs(r - _CORNER[0]) + abs(c - _CORNER[1]) for r, c in CELL_RC)
+
+
+def evaluate_chain_smart(
+    self: 'GameLogic', chain, board: Optional[PackedBoard] = None
+):
     if not chain:
         return -999999
 
+    if board is None:
+        board = self.packed_board()
+    cells = board.cells
+    values = board.values
+    # таблицы доски строятся один раз; дальше всё за O(длина цепочки)
+    f = board.features
+
+    idx = [r * const.COLS + c for r, c in chain]
+    chain_mask = 0
+    for i in idx:
+        chain_mask |= 1 << i
+    chain_exps = [cells[i] for i in idx]
+
     # --- базовая эвристика как было ---
-    base_value = sum(self.board[r][c] for r, c in chain)
+    base_value = sum(values[i] for i in idx)
     length_bonus = len(chain) * 100
 
     if len(chain) > 5:
@@ -21,87 +55,46 @@ def evaluate_chain_smart(self: 'GameLogic', chain):
         length_penalty = 0
 
     # позиционный бонус
-    position_weight = 0
-    center_r, center_c = const.ROWS // 2, const.COLS // 2
-    for r, c in chain:
-        distance = abs(r - center_r) + abs(c - center_c)
-        position_weight += max(0, 10 - distance * 2)
-    position_bonus = position_weight * 3
+    position_bonus = sum(POSITION_WEIGHT[i] for i in idx) * 3
 
     # штраф за разрушение потенциальных пар
     bridge_penalty = 0
-    for r, c in chain:
-        cell_value = self.board[r][c]
-        for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < const.ROWS and 0 <= nc < const.COLS:
-                if (nr, nc) not in chain:
-                    neighbor_value = self.board[nr][nc]
-                    if neighbor_value > 0 and self.is_potential_pair(
-                        cell_value, neighbor_value
-                    ):
-                        penalty = 20 * (cell_value // 64)
-                        if self.count_potential_pairs(nr, nc) == 1:
-                            penalty *= 2
-                        bridge_penalty += penalty
+    for i in idx:
+        e = cells[i]
+        if not e:
+            continue
+        for j in NEIGHBORS4[i]:
+            if (chain_mask >> j) & 1:
+                continue
+            ej = cells[j]
+            if ej and -1 <= ej - e <= 1:
+                penalty = 20 * (values[i] // 64)
+                if f.potential_pairs[j] == 1:
+                    penalty *= 2
+                bridge_penalty += penalty
 
     # бонус за "зачистку" вокруг
     cleanup_bonus = 0
-    for r, c in chain:
-        for dr, dc in [
-            (0, 1),
-            (1, 0),
-            (0, -1),
-            (-1, 0),
-            (1, 1),
-            (1, -1),
-            (-1, 1),
-            (-1, -1),
-        ]:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < const.ROWS and 0 <= nc < const.COLS:
-                if self.board[nr][nc] == -1:
-                    cleanup_bonus += 5
+    for i in idx:
+        cleanup_bonus += 5 * f.empty8[i]
 
     # штраф за изоляцию крупных чисел
     isolation_penalty = 0
     if len(chain) >= 2:
-        chain_values = [self.board[r][c] for r, c in chain]
-        for value in chain_values:
-            if value >= 128:
-                same_values_left = False
-                for rr in range(const.ROWS):
-                    for cc in range(const.COLS):
-                        if (rr, cc) not in chain and self.board[rr][cc] == value:
-                            same_values_left = True
-                            break
-                    if same_values_left:
-                        break
-                if not same_values_left:
-                    isolation_penalty += 30 * (value // 128)
+        for i in idx:
+            e = cells[i]
+            if e >= 7 and not f.same_left(e, chain_exps):  # >= 128
+                isolation_penalty += 30 * (values[i] // 128)
 
     # --- ЛОКАЛЬНАЯ СИМУЛЯЦИЯ ПОСЛЕ ХОДА ---
-    simulated = [row[:] for row in self.board]
-    for r, c in chain:
-        simulated[r][c] = -1
-
-    empty_after = 0
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            if simulated[r][c] <= 0:
-                empty_after += 1
-
-    max_before = 0
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            if self.board[r][c] > max_before:
-                max_before = self.board[r][c]
-
-    max_after = 0
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            if simulated[r][c] > max_after:
-                max_after = simulated[r][c]
+    removed = popcount(board.occupied_mask & chain_mask)
+    empty_after = CELL_COUNT - (f.occupied_count - removed)
+
+    # максимум и его первая позиция (построчно) до и после хода
+    max_pos_before = f.max_order[0] if f.max_order else None
+    max_pos_after = f.max_outside(chain_mask)
+    max_before = values[max_pos_before] if max_pos_before is not None else 0
+    max_after = values[max_pos_after] if max_pos_after is not None else 0
 
     # --- 1) Бонус/штраф за пустые клетки ---
     empty_bonus = 0
@@ -113,33 +106,10 @@ def evaluate_chain_smart(self: 'GameLogic', chain):
         empty_bonus += min(empty_after * 5, 100)
 
     # --- 2) Контроль "угла силы" ---
-    corner_r, corner_c = const.ROWS - 1, 0
-
     corner_bonus = 0
-    max_pos_before = None
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            if self.board[r][c] == max_before:
-                max_pos_before = (r, c)
-                break
-        if max_pos_before:
-            break
-
-    max_pos_after = None
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            if simulated[r][c] == max_after:
-                max_pos_after = (r, c)
-                break
-        if max_pos_after:
-            break
-
-    def manhattan(p, q):
-        return abs(p[0] - q[0]) + abs(p[1] - q[1])
-
-    if max_pos_before and max_pos_after:
-        dist_before = manhattan(max_pos_before, (corner_r, corner_c))
-        dist_after = manhattan(max_pos_after, (corner_r, corner_c))
+    if max_pos_before is not None and max_pos_after is not None:
+        dist_before = CORNER_DIST[max_pos_before]
+        dist_after = CORNER_DIST[max_pos_after]
 
         if dist_after < dist_before:
             corner_bonus += 100 * (max_after // 1024)
@@ -151,29 +121,17 @@ def evaluate_chain_smart(self: 'GameLogic', chain):
     if max_after > max_before:
         growth_bonus += 200 * (max_after // 1024)
 
-    # бонус пар будущих
-    future_pair_bonus = 0
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            if simulated[r][c] > 0:
-                for dr, dc in [(0, 1), (1, 0)]:
-                    nr, nc = r + dr, c + dc
-                    if 0 <= nr < const.ROWS and 0 <= nc < const.COLS:
-                        if (
-                            simulated[nr][nc] > 0
-                            and simulated[r][c] == simulated[nr][nc]
-                        ):
-                            future_pair_bonus += 25 * (simulated[r][c] // 64)
+    # бонус пар будущих: все пары доски минус задетые цепочкой
+    pair_units = f.equal_pairs_64
+    for i in idx:
+        for j in f.equal4[i]:
+            if not (chain_mask >> j) & 1 or i < j:
+                pair_units -= values[i] // 64
+    future_pair_bonus = 25 * pair_units
 
     connectivity_penalty = 0
-    for r, c in chain:
-        neighbor_count = 0
-        for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < const.ROWS and 0 <= nc < const.COLS:
-                if self.board[nr][nc] > 0:
-                    neighbor_count += 1
-        if neighbor_count >= 3:
+    for i in idx:
+        if f.occupied4[i] >= 3:
             connectivity_penalty += 15
 
     total_score = (
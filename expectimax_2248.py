@@ -0,0 +1,241 @@
+# expectimax_2248.py
+"""
+Expectimax-поиск хода на PackedBoard.
+
+Узлы:
+  max    — выбор цепочки: reward = evaluate_chain_smart(цепочка, доска);
+  chance — после слияния и падения пустые клетки сверху заполняются
+           спавном (SpawnModel симулятора). Если исходов мало
+           (<= exact_outcomes), перебираем все с их вероятностями,
+           иначе берём spawn_samples детерминированных выборок.
+
+    V(s, 0) = 0
+    V(s, d) = max_a [ eval(a, s) + discount * E_spawn V(s', d - 1) ]
+    V(тупик) = -dead_end_penalty
+
+Ветвление max-узлов режем до branching лучших по eval цепочек.
+Транспозиционная таблица по Zobrist-хэшу доски (ключ (hash, depth)) общая
+для всех уровней и живёт между ходами. Глубина наращивается итеративно,
+по time_limit возвращается результат последней завершённой глубины.
+
+Перебор и оценка цепочек берутся у game_logic: нужны find_all_chains(board)
+и evaluate_chains(chains, board) (пакетная evaluate_chain_smart) — это
+GameLogic или SmartPolicy.
+"""
+import itertools
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from board_engine import PackedBoard, chain_to_indices
+from constants import MAX_EXP
+from simulator_2248 import Simulator2248, SmartPolicy
+
+DEFAULT_EXPECTIMAX = {
+    "depth": 3,
+    "branching": 6,
+    "spawn_samples": 3,
+    "exact_outcomes": 5,
+    "discount": 0.9,
+    "dead_end_penalty": 5000.0,
+    "time_limit": 0.5,
+}
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class Expectimax2248:
+    def __init__(
+        self,
+        game_logic,
+        simulator: Optional[Simulator2248] = None,
+        depth: int = 3,
+        branching: int = 6,
+        spawn_samples: int = 3,
+        exact_outcomes: int = 5,
+        discount: float = 0.9,
+        dead_end_penalty: float = 5000.0,
+        time_limit: Optional[float] = 0.5,
+        max_tt_entries: int = 200_000,
+    ):
+        self.gl = game_logic
+        self.sim = simulator or Simulator2248.from_config(
+            getattr(game_logic, "config", None)
+        )
+        self.depth = depth
+        self.branching = branching
+        self.spawn_samples = spawn_samples
+        self.exact_outcomes = exact_outcomes
+        self.discount = discount
+        self.dead_end_penalty = dead_end_penalty
+        self.time_limit = time_limit
+        self.max_tt_entries = max_tt_entries
+
+        # (hash, depth) -> V;  hash -> лучшие [(eval, chain), ...] узла
+        self.tt: Dict[Tuple[int, int], float] = {}
+        self.scored: Dict[int, List[Tuple[float, list]]] = {}
+
+        self.nodes = 0
+        self.tt_hits = 0
+        self.completed_depth = 0
+        self._deadline = None
+
+    @classmethod
+    def from_config(cls, game_logic, config: Optional[dict] = None, simulator=None):
+        """Настройки из config["expectimax"] поверх DEFAULT_EXPECTIMAX."""
+        params = dict(DEFAULT_EXPECTIMAX)
+        if config:
+            params.update(config.get("expectimax", {}))
+        return cls(game_logic, simulator, **params)
+
+    # ===== Поиск =====
+
+    def search(
+        self, board: PackedBoard, root_filter: Optional[Callable[[list], bool]] = None
+    ) -> Tuple[Optional[list], float]:
+        """
+        Лучшая цепочка [(r, c), ...] и её ожидаемая ценность.
+        root_filter(chain) -> False исключает ход в корне (блэклист).
+        """
+        self.nodes = 0
+        self.tt_hits = 0
+        self.completed_depth = 0
+        self._deadline = (
+            time.perf_counter() + self.time_limit if self.time_limit else None
+        )
+        if len(self.tt) + len(self.scored) > self.max_tt_entries:
+            self.tt.clear()
+            self.scored.clear()
+
+        root = [
+            (score, chain)
+            for score, chain in self._rank_chains(board)
+            if root_filter is None or root_filter(chain)
+        ]
+        if not root:
+            return None, -self.dead_end_penalty
+
+        best_chain, best_value = root[0][1], root[0][0]
+        for depth in range(1, self.depth + 1):
+            try:
+                chain, value = self._root(board, root, depth)
+            except _SearchTimeout:
+                break
+            best_chain, best_value = chain, value
+            self.completed_depth = depth
+        return best_chain, best_value
+
+    def _root(self, board, root, depth):
+        best_chain, best_value = None, float("-inf")
+        for score, chain in root[: self.branching] if depth > 1 else root:
+            value = score
+            if depth > 1:
+                value += self.discount * self._chance(board, chain, depth - 1)
+            if value > best_value:
+                best_chain, best_value = chain, value
+        return best_chain, best_value
+
+    def _value(self, board: PackedBoard, depth: int) -> float:
+        """max-узел"""
+        if depth <= 0:
+            return 0.0
+        key = (board.hash, depth)
+        cached = self.tt.get(key)
+        if cached is not None:
+            self.tt_hits += 1
+            return cached
+
+        self.nodes += 1
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _SearchTimeout
+
+        scored = self._scored_chains(board)
+        if not scored:
+            value = -self.dead_end_penalty
+        elif depth == 1:
+            value = scored[0][0]
+        else:
+            value = max(
+                score + self.discount * self._chance(board, chain, depth - 1)
+                for score, chain in scored
+            )
+        self.tt[key] = value
+        return value
+
+    def _chance(self, board: PackedBoard, chain, depth: int) -> float:
+        """chance-узел: слияние, падение, затем среднее по исходам спавна"""
+        after, _ = self.sim.apply_chain(board, chain_to_indices(chain))
+        total = 0.0
+        for weight, child in self.spawn_outcomes(after):
+            total += weight * self._value(child, depth)
+        return total
+
+    # ===== Вспомогательное =====
+
+    def _rank_chains(self, board: PackedBoard) -> List[Tuple[float, list]]:
+        """[(eval, chain), ...] по убыванию eval"""
+        chains = self.gl.find_all_chains(board)
+        return sorted(
+            zip(self.gl.evaluate_chains(chains, board), chains),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+
+    def _scored_chains(self, board: PackedBoard) -> List[Tuple[float, list]]:
+        """Лучшие branching цепочек внутреннего узла (кэш по хэшу доски)."""
+        h = board.hash
+        scored = self.scored.get(h)
+        if scored is None:
+            scored = self._rank_chains(board)[: self.branching]
+            self.scored[h] = scored
+        return scored
+
+    def spawn_outcomes(self, after: PackedBoard) -> List[Tuple[float, PackedBoard]]:
+        """[(вероятность, доска после спавна), ...]; сумма вероятностей = 1"""
+        empties = [i for i, e in enumerate(after.cells) if not e]
+        if not empties:
+            return [(1.0, after)]
+
+        model = self.sim.spawn_model
+        shift = model.base_shift(after)
+        total_w = sum(model.weights)
+        probs = [w / total_w for w in model.weights]
+
+        if len(model.exps) ** len(empties) <= self.exact_outcomes:
+            outcomes = []
+            for combo in itertools.product(range(len(model.exps)), repeat=len(empties)):
+                p = 1.0
+                for k in combo:
+                    p *= probs[k]
+                exps = [min(model.exps[k] + shift, MAX_EXP) for k in combo]
+                outcomes.append((p, after.with_cells(zip(empties, exps))))
+            return outcomes
+
+        # выборка детерминирована хэшем доски — значения в TT воспроизводимы
+        rng = random.Random(after.hash)
+        weight = 1.0 / self.spawn_samples
+        return [
+            (
+                weight,
+                after.with_cells(zip(empties, model.sample(rng, len(empties), shift))),
+            )
+            for _ in range(self.spawn_samples)
+        ]
+
+
+class ExpectimaxPolicy(SmartPolicy):
+    """Политика для Simulator2248/benchmark_2248: ход выбирает Expectimax2248."""
+
+    def __init__(self, optimal_lengths, expectimax_config=None, sim_config=None, **kwargs):
+        super().__init__(optimal_lengths, **kwargs)
+        self.engine = Expectimax2248.from_config(
+            self,
+            {"expectimax": expectimax_config or {}},
+            Simulator2248.from_config(sim_config),
+        )
+
+    def __call__(self, board: PackedBoard):
+        chain, _ = self.engine.search(board)
+        return chain
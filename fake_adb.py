@@ -0,0 +1,213 @@
+# fake_adb.py
+"""
+Заглушка adb для тестов и отладки без телефона: отдаёт записанные кадры.
+
+    FAKE_ADB_FRAMES=moves/move1.png:moves/move2.png python fake_adb.py exec-out screencap
+    FAKE_ADB_FRAMES=... python fake_adb.py serve 5037   — подменный adb-сервер
+
+FakeAdbServer говорит протоколом adb-сервера (см. adb_transport): host:devices,
+host:transport*, exec:<cmd> (кадры, как ниже), shell:<cmd> и интерактивный
+shell: — команды записываются в server.commands, `echo` с $((...)) и $?
+раскрывается, как в настоящем shell. exec:<cmd>; echo ... (не кадр) —
+команда записывается, вывод — server.outputs[cmd] (по умолчанию пустой).
+
+Понимает:
+  devices
+  exec-out screencap -p                          — PNG кадра
+  exec-out screencap                             — сырой буфер (заголовок + RGBA)
+  exec-out "screencap | tail -c +N | head -c M"  — обрезка потока, как на телефоне
+
+Переменные окружения:
+  FAKE_ADB_FRAMES — кадры через os.pathsep; по кругу, если задан FAKE_ADB_STATE
+  FAKE_ADB_STATE  — файл-счётчик выданных кадров
+  FAKE_ADB_HEADER — 12 (старый Android) или 16 байт заголовка (по умолчанию)
+"""
+import os
+import re
+import socketserver
+import struct
+import sys
+import threading
+from pathlib import Path
+
+import cv2
+
+
+def _next_frame_path() -> str:
+    frames = [p for p in os.environ.get("FAKE_ADB_FRAMES", "").split(os.pathsep) if p]
+    if not frames:
+        sys.exit("fake_adb: FAKE_ADB_FRAMES не задан")
+    state = os.environ.get("FAKE_ADB_STATE")
+    if not state:
+        return frames[0]
+    state_path = Path(state)
+    n = int(state_path.read_text()) if state_path.exists() else 0
+    state_path.write_text(str(n + 1))
+    return frames[n % len(frames)]
+
+
+def raw_screencap(img_bgr, header_size: int = 16) -> bytes:
+    """Кадр в формате `screencap` без -p: width, height, format=1 [, colorspace] + RGBA."""
+    h, w = img_bgr.shape[:2]
+    header = struct.pack("<III", w, h, 1)
+    if header_size == 16:
+        header += struct.pack("<I", 0)
+    return header + cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGBA).tobytes()
+
+
+def exec_out_response(shell_cmd: str) -> bytes:
+    """Вывод `exec-out <shell_cmd>` для текущего кадра (ValueError — кадра нет)."""
+    img = cv2.imread(_next_frame_path())
+    if img is None:
+        raise ValueError("fake_adb: кадр не читается")
+
+    if re.search(r"screencap\s+-p", shell_cmd):
+        return cv2.imencode(".png", img)[1].tobytes()
+    data = raw_screencap(img, int(os.environ.get("FAKE_ADB_HEADER", "16")))
+    tail = re.search(r"tail -c \+(\d+)", shell_cmd)
+    if tail:
+        data = data[int(tail.group(1)) - 1 :]
+    head = re.search(r"head -c (\d+)", shell_cmd)
+    if head:
+        data = data[: int(head.group(1))]
+    return data
+
+
+def _expand_echo(line: str) -> str:
+    """`echo ...` с $((a+b)) и $? (всегда 0) — как раскрыл бы shell."""
+    text = line[len("echo ") :]
+    text = re.sub(r"\$\(\((\d+)\+(\d+)\)\)", lambda m: str(int(m[1]) + int(m[2])), text)
+    return text.replace("$?", "0") + "\n"
+
+
+class _AdbHandler(socketserver.BaseRequestHandler):
+    def _read(self, n):
+        buf = b""
+        while len(buf) < n:
+            chunk = self.request.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError
+            buf += chunk
+        return buf
+
+    def _next_request(self) -> str:
+        length = int(self._read(4), 16)
+        return self._read(length).decode("utf-8")
+
+    def _fail(self, message: str):
+        data = message.encode("utf-8")
+        self.request.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+    def handle(self):
+        server = self.server
+        try:
+            service = self._next_request()
+            server.connections += 1
+            if service == "host:devices":
+                data = f"{server.serial}\tdevice\n".encode()
+                self.request.sendall(b"OKAY" + b"%04x" % len(data) + data)
+                return
+            if service not in ("host:transport-any", f"host:transport:{server.serial}"):
+                self._fail(f"device '{service}' not found")
+                return
+            self.request.sendall(b"OKAY")
+
+            service = self._next_request()
+            if service.startswith("exec:") and "; echo " in service:
+                cmd, _, echo = service[len("exec:") :].rpartition("; ")
+                server.record(cmd)
+                self.request.sendall(b"OKAY")
+                self.request.sendall(
+                    (server.outputs.get(cmd, "") + _expand_echo(echo)).encode("utf-8")
+                )
+            elif service.startswith("exec:"):
+                try:
+                    data = exec_out_response(service[len("exec:") :])
+                except ValueError as err:
+                    self._fail(str(err))
+                    return
+                self.request.sendall(b"OKAY")
+                self.request.sendall(data)
+            elif service == "shell:":
+                self.request.sendall(b"OKAY")
+                self._interactive_shell()
+            elif service.startswith("shell:"):
+                self.request.sendall(b"OKAY")
+                server.record(service[len("shell:") :])
+            else:
+                self._fail(f"unknown service {service}")
+        except ConnectionError:
+            pass
+
+    def _interactive_shell(self):
+        buf = b""
+        while True:
+            chunk = self.request.recv(1 << 16)
+            if not chunk:
+                return
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                line = line.decode("utf-8")
+                if line.startswith("echo "):
+                    self.request.sendall(_expand_echo(line).encode("utf-8"))
+                elif line:
+                    self.server.record(line)
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """Подменный adb-сервер на 127.0.0.1 (port=0 — свободный порт)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, serial: str = "fake"):
+        super().__init__(("127.0.0.1", port), _AdbHandler)
+        self.serial = serial
+        self.commands = []  # shell-команды в порядке прихода
+        self.outputs = {}  # exec-команда -> её вывод
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def record(self, cmd: str) -> None:
+        with self._lock:
+            self.commands.append(cmd)
+
+    def start(self) -> "FakeAdbServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv):
+    if argv[:1] == ["serve"]:
+        server = FakeAdbServer(int(argv[1]) if len(argv) > 1 else 5037)
+        print(f"fake adb server: 127.0.0.1:{server.port}")
+        server.serve_forever()
+        return 0
+    if argv[:1] == ["devices"]:
+        sys.stdout.write("List of devices attached\nfake\tdevice\n")
+        return 0
+    if argv[:1] != ["exec-out"]:
+        sys.stderr.write(f"fake_adb: не поддерживается: {argv}\n")
+        return 1
+
+    try:
+        data = exec_out_response(" ".join(argv[1:]))
+    except ValueError as err:
+        sys.stderr.write(f"{err}\n")
+        return 1
+
+    sys.stdout.buffer.write(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
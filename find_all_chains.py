@@ -1,54 +1,146 @@
 # find_all_chains.py
-import constants as const
-
-
-def find_all_chains(self):
-    directions = [
-        (0, 1),
-        (1, 0),
-        (0, -1),
-        (-1, 0),
-        (1, 1),
-        (1, -1),
-        (-1, 1),
-        (-1, -1),
-    ]
-
-    all_chains = []
-
-    for r in range(const.ROWS):
-        for c in range(const.COLS):
-            start_val = self.board[r][c]
-            if start_val <= 0:
-                continue
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from board_engine import CELL_COUNT, NEIGHBORS8, indices_to_chain
+
+# Лимит на число просмотренных путей за один перебор (защита от взрыва
+# на плотных досках с кучей одинаковых тайлов). None — без лимита.
+DEFAULT_MAX_PATHS = 20000
+
+# Соседи в порядке обхода старого DFS со стеком (последнее направление — первым),
+# чтобы порядок найденных цепочек не изменился
+_NEIGHBORS8_REV = tuple(tuple(reversed(n)) for n in NEIGHBORS8)
+
+# мемо полных переборов: (cells, max_paths, max_length) -> цепочки, LRU
+CHAIN_CACHE_SIZE = 4096
+_chain_cache: "OrderedDict[tuple, Tuple[Tuple[int, ...], ...]]" = OrderedDict()
+
+
+def clear_chain_cache() -> None:
+    """Сбросить мемо enumerate_chains (общий на процесс)."""
+    _chain_cache.clear()
+
 
-            stack = [([(r, c)], start_val, {(r, c)})]
+def enumerate_chains(
+    cells: bytes,
+    max_paths: Optional[int] = DEFAULT_MAX_PATHS,
+    max_length: Optional[int] = None,
+) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Все максимальные цепочки на упакованной доске (индексы клеток).
 
-            while stack:
-                current_path, current_val, visited = stack.pop()
+    - посещённые клетки — битовая маска, путь один и тот же список (push/pop);
+    - путь, начатый с удвоения (2 -> 4), никогда не станет валидной
+      цепочкой, поэтому такие ветки не перебираются вообще;
+    - цепочки с одинаковым набором клеток схлопываются по маске, остаются
+      только наборы, не вложенные в другой найденный набор;
+    - max_length ограничивает глубину (цепочки длиннее режутся до
+      префиксов — только для дешёвых политик вроде rollout'ов MCTS),
+      max_paths — число просмотренных путей.
 
-                if len(current_path) >= 2:
-                    if self.is_valid_chain(current_path):
-                        all_chains.append(current_path.copy())
+    Результат отсортирован по длине (по убыванию), при равной длине —
+    в порядке обхода. Мемоизируется по содержимому доски — только если
+    перебор закончился сам, а не упёрся в max_paths.
+    """
+    key = (cells, max_paths, max_length)
+    chains = _chain_cache.get(key)
+    if chains is not None:
+        _chain_cache.move_to_end(key)
+        return chains
+
+    chains, complete = _enumerate(cells, max_paths, max_length)
+    if complete:
+        _chain_cache[key] = chains
+        if len(_chain_cache) > CHAIN_CACHE_SIZE:
+            _chain_cache.popitem(last=False)
+    return chains
+
+
+def _enumerate(cells: bytes, max_paths: Optional[int], max_length: Optional[int]):
+    """Перебор enumerate_chains. -> (цепочки, перебор полный — бюджет не кончился)."""
+    limit_len = max_length if max_length else CELL_COUNT
+    budget = max_paths if max_paths is not None else -1
+
+    # маска -> первый найденный путь с таким набором клеток
+    leaves: dict = {}
+    path = []
+
+    def extend(last: int, exp: int, visited: int) -> None:
+        nonlocal budget
+        has_child = False
+        if len(path) < limit_len:
+            for nxt in _NEIGHBORS8_REV[last]:
+                if (visited >> nxt) & 1:
+                    continue
+                next_exp = cells[nxt]
+                if next_exp != exp and next_exp != exp + 1:
+                    continue
+                has_child = True
+                if budget == 0:
+                    return
+                budget -= 1
+                path.append(nxt)
+                extend(nxt, next_exp, visited | (1 << nxt))
+                path.pop()
+                if budget == 0:
+                    return
+
+        # лист: продлить нельзя — кандидат в максимальные
+        if not has_child and visited not in leaves:
+            leaves[visited] = tuple(path)
+
+    for start in range(CELL_COUNT):
+        start_exp = cells[start]
+        if not start_exp:
+            continue
+        path.append(start)
+        # вторая клетка обязана быть равной первой
+        for second in _NEIGHBORS8_REV[start]:
+            if cells[second] != start_exp:
+                continue
+            if budget == 0:
+                break
+            budget -= 1
+            path.append(second)
+            extend(second, start_exp, (1 << start) | (1 << second))
+            path.pop()
+        path.pop()
+        if budget == 0:
+            break
 
-                last_r, last_c = current_path[-1]
+    # убираем наборы, вложенные в более длинные (stable sort по длине);
+    # разные наборы одной длины друг в друга не вкладываются
+    ordered = sorted(leaves.items(), key=lambda item: -len(item[1]))
+    longer_masks = []
+    same_len_masks = []
+    current_len = None
+    result = []
+    for mask, chain in ordered:
+        if len(chain) != current_len:
+            longer_masks.extend(same_len_masks)
+            same_len_masks = []
+            current_len = len(chain)
+        if any(mask & ~other == 0 for other in longer_masks):
+            continue
+        same_len_masks.append(mask)
+        result.append(chain)
+    return tuple(result), budget != 0
 
-                for dr, dc in directions:
-                    nr, nc = last_r + dr, last_c + dc
 
-                    if not (0 <= nr < const.ROWS and 0 <= nc < const.COLS):
-                        continue
-                    if (nr, nc) in visited:
-                        continue
+def find_all_chains(self, board=None):
+    """
+    Все максимальные цепочки на доске.
 
-                    next_val = self.board[nr][nc]
-                    if next_val <= 0:
-                        continue
+    board — PackedBoard; если не передан, берётся текущая self.board.
+    Лимит путей берётся из self.max_chain_paths (если есть); длина цепочек
+    не ограничивается.
+    Возвращает список цепочек [(r, c), ...].
+    """
+    if board is None:
+        board = self.packed_board()
 
-                    if next_val == current_val or next_val == current_val * 2:
-                        new_path = current_path + [(nr, nc)]
-                        new_visited = visited.copy()
-                        new_visited.add((nr, nc))
-                        stack.append((new_path, next_val, new_visited))
-    print("ALL CHIANS")
-    return self._filter_chains(all_chains)
+    chains = enumerate_chains(
+        board.cells, getattr(self, "max_chain_paths", DEFAULT_MAX_PATHS)
+    )
+    return [indices_to_chain(chain) for chain in chains]
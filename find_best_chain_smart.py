@@ -1,91 +1,180 @@
 # find_best_chain_smart.py
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
 
+Chain = List[tuple]
 
-def find_best_chain_smart(
-    board,
+
+def chain_move_key(chain) -> str:
+    """Ключ хода цепочкой для блэклиста bad_moves."""
+    return (
+        f"chain_{len(chain)}_{chain[0][0]}_{chain[0][1]}_"
+        f"{chain[-1][0]}_{chain[-1][1]}"
+    )
+
+
+@dataclass
+class ScoredChain:
+    chain: Chain
+    score: float
+
+
+@dataclass
+class ChainRanking:
+    """
+    Итог ранжирования: каждая допустимая цепочка оценена ровно один раз.
+
+    candidates — оценённые цепочки по убыванию оценки (при равенстве —
+                 в порядке перебора);
+    best       — выбранная цепочка (или None);
+    bucket     — длина из optimal_lengths, по которой выбран ход;
+                 None — выбран запасным проходом по всем цепочкам.
+    """
+
+    candidates: List[ScoredChain] = field(default_factory=list)
+    best: Optional[ScoredChain] = None
+    bucket: Optional[int] = None
+
+    def score_of(self, chain) -> Optional[float]:
+        """Оценка цепочки из ранжирования (None — её не оценивали)."""
+        for item in self.candidates:
+            if item.chain == chain:
+                return item.score
+        return None
+
+
+def score_chains(chains, evaluate_chain_smart: Callable) -> List[ScoredChain]:
+    """Оценить каждую цепочку один раз; по убыванию оценки (сортировка стабильна)."""
+    scored = [ScoredChain(chain, evaluate_chain_smart(chain)) for chain in chains]
+    scored.sort(key=lambda item: item.score, reverse=True)
+    return scored
+
+
+def rank_chains(
     board_hash,
     is_move_blacklisted,
     evaluate_chain_smart,
     find_all_chains,
     optimal_lengths,
-):
+    verbose=True,
+    evaluate_batch=None,
+) -> ChainRanking:
     """
-    board                - текущая доска (матрица чисел)
-    board_hash           - Zobrist-хэш доски
-    is_move_blacklisted  - функция проверки блэклиста
-    evaluate_chain_smart - функция оценки цепочки
-    find_all_chains      - функция поиска всех цепочек
-    optimal_lengths      - ПОРЯДОК длин цепочек, приходит снаружи (из JSON)
+    Выбор хода как в find_best_chain_smart, но с полным результатом.
+    Цепочки оцениваются лениво — по корзинам длин в порядке optimal_lengths,
+    запасной проход доценивает только оставшиеся; каждая — один раз.
+    evaluate_batch(chains) -> [оценка, ...] — если задана, все допустимые
+    цепочки оцениваются сразу одним вызовом (пакетная оценка на NumPy).
     """
     # 1) ищем все цепочки
     chains = find_all_chains()
     if not chains:
-        return None
+        return ChainRanking()
+
+    # 2) допустимые (не в блэклисте), сгруппированные по длине
+    valid = [
+        chain
+        for chain in chains
+        if not is_move_blacklisted(board_hash, chain_move_key(chain))
+    ]
+    chains_by_length: Dict[int, List[int]] = {}
+    for k, chain in enumerate(valid):
+        chains_by_length.setdefault(len(chain), []).append(k)
+
+    scores: Dict[int, float] = {}
+    if evaluate_batch is not None and valid:
+        scores = dict(enumerate(evaluate_batch(valid)))
 
-    # 2) группируем по длине
-    chains_by_length: dict[int, list[list[tuple[int, int]]]] = {}
-    for chain in chains:
-        length = len(chain)
-        if length not in chains_by_length:
-            chains_by_length[length] = []
-        chains_by_length[length].append(chain)
+    def score(k: int) -> float:
+        if k not in scores:
+            scores[k] = evaluate_chain_smart(valid[k])
+        return scores[k]
+
+    def ranking(best_k: int, bucket: Optional[int]) -> ChainRanking:
+        candidates = [ScoredChain(valid[k], s) for k, s in scores.items()]
+        candidates.sort(key=lambda item: item.score, reverse=True)
+        return ChainRanking(
+            candidates, ScoredChain(valid[best_k], scores[best_k]), bucket
+        )
 
     # 3) перебор длин в порядке optimal_lengths
     for length in optimal_lengths:
-        if length not in chains_by_length:
+        bucket = chains_by_length.get(length)
+        if not bucket:
             continue
 
-        valid_chains: list[list[tuple[int, int]]] = []
-
-        for chain in chains_by_length[length]:
-            move_key = (
-                f"chain_{len(chain)}_{chain[0][0]}_{chain[0][1]}_"
-                f"{chain[-1][0]}_{chain[-1][1]}"
-            )
-            if is_move_blacklisted(board_hash, move_key):
-                continue
-
-            score = evaluate_chain_smart(chain)
-            print(
-                f"[FBC] len={len(chain)} score={score:.1f} "
-                f"[FBC] from {chain[0]} to {chain[-1]}"
-            )
-            valid_chains.append(chain)
+        best_k = None
+        for k in bucket:
+            s = score(k)
+            if verbose:
+                print(
+                    f"[FBC] len={length} score={s:.1f} "
+                    f"[FBC] from {valid[k][0]} to {valid[k][-1]}"
+                )
+            if best_k is None or s > scores[best_k]:
+                best_k = k
 
-        if valid_chains:
-            best_chain = max(valid_chains, key=lambda c: evaluate_chain_smart(c))
-            chain_score = evaluate_chain_smart(best_chain)
+        chain_score = scores[best_k]
+        if verbose:
             print(
                 f"[BEST] length={length} score={chain_score:.1f} "
-                f"chain={best_chain}"
+                f"chain={valid[best_k]}"
             )
 
-            # быстрая остановка
-            if chain_score > 100 or length <= 5:
-                return best_chain
+        # быстрая остановка
+        if chain_score > 100 or length <= 5:
+            return ranking(best_k, length)
 
     # 4) запасной проход по всем цепочкам, если выше ничего не вернулось
-    all_valid_chains: list[list[tuple[int, int]]] = []
-    for chain in chains:
-        move_key = (
-            f"chain_{len(chain)}_{chain[0][0]}_{chain[0][1]}_"
-            f"{chain[-1][0]}_{chain[-1][1]}"
-        )
-        if is_move_blacklisted(board_hash, move_key):
-            continue
+    if valid:
+        best_k = None
+        for k, chain in enumerate(valid):
+            s = score(k)
+            if verbose:
+                print(
+                    f"[EVAL-FB] len={len(chain)} score={s:.1f} "
+                    f"from {chain[0]} to {chain[-1]}"
+                )
+            if best_k is None or s > scores[best_k]:
+                best_k = k
+        if verbose:
+            print(f"[BEST-FB] score={scores[best_k]:.1f} chain={valid[best_k]}")
+        return ranking(best_k, None)
 
-        score = evaluate_chain_smart(chain)
-        print(
-            f"[EVAL-FB] len={len(chain)} score={score:.1f} "
-            f"from {chain[0]} to {chain[-1]}"
-        )
-        all_valid_chains.append(chain)
+    if verbose:
+        print("[FBC] return None")
+    return ChainRanking()
 
-    if all_valid_chains:
-        best_chain = max(all_valid_chains, key=lambda c: evaluate_chain_smart(c))
-        chain_score = evaluate_chain_smart(best_chain)
-        print(f"[BEST-FB] score={chain_score:.1f} chain={best_chain}")
-        return best_chain
 
-    print("[FBC] return None")
-    return None
+def find_best_chain_smart(
+    board,
+    board_hash,
+    is_move_blacklisted,
+    evaluate_chain_smart,
+    find_all_chains,
+    optimal_lengths,
+    verbose=True,
+    evaluate_batch=None,
+):
+    """
+    board                - текущая доска (матрица чисел)
+    board_hash           - Zobrist-хэш доски
+    is_move_blacklisted  - функция проверки блэклиста
+    evaluate_chain_smart - функция оценки цепочки
+    find_all_chains      - функция поиска всех цепочек
+    optimal_lengths      - ПОРЯДОК длин цепочек, приходит снаружи (из JSON)
+    verbose              - печатать ли отладку (False для офлайн-симуляции)
+    evaluate_batch       - пакетная оценка списка цепочек (необязательно)
+
+    Возвращает только цепочку; оценки и корзина — в rank_chains.
+    """
+    best = rank_chains(
+        board_hash,
+        is_move_blacklisted,
+        evaluate_chain_smart,
+        find_all_chains,
+        optimal_lengths,
+        verbose,
+        evaluate_batch,
+    ).best
+    return best.chain if best else None
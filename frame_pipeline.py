@@ -0,0 +1,105 @@
+# frame_pipeline.py
+"""
+Кадр экрана целиком в памяти: скриншот -> клетки -> цвета без PNG на диске.
+
+Раньше каждый ход: screencap в moves/moveN.png, 20 PNG клеток в cells/,
+и каждая клетка снова читалась cv2.imread — 42 кодирования/декодирования.
+Теперь клетки — это numpy-срезы (view) одного BGR-кадра, и цвет считается
+прямо по ним. На диск кадр и клетки пишутся только в режиме отладки/архива
+(config["save_frames"] = true) — в те же moves/ и cells/, что и раньше.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import constants as const
+
+
+def cell_roi(img: np.ndarray, x: int, y: int, pad: int) -> np.ndarray:
+    """
+    Квадрат (2*pad)x(2*pad) с центром (x, y).
+    Внутри кадра — view без копирования; у края — копия, дополненная
+    чёрным, как делал PIL Image.crop в crop_cells_from_screen.
+    """
+    h, w = img.shape[:2]
+    x0, y0, x1, y1 = x - pad, y - pad, x + pad, y + pad
+    if x0 >= 0 and y0 >= 0 and x1 <= w and y1 <= h:
+        return img[y0:y1, x0:x1]
+
+    roi = np.zeros((y1 - y0, x1 - x0) + img.shape[2:], dtype=img.dtype)
+    sx0, sy0 = max(x0, 0), max(y0, 0)
+    sx1, sy1 = min(x1, w), min(y1, h)
+    if sx0 < sx1 and sy0 < sy1:
+        roi[sy0 - y0 : sy1 - y0, sx0 - x0 : sx1 - x0] = img[sy0:sy1, sx0:sx1]
+    return roi
+
+
+def slice_cells(
+    img: np.ndarray, grid, pad: int = 150, origin=(0, 0)
+) -> List[List[np.ndarray]]:
+    """
+    Клетки доски по калиброванной сетке: cells[r][c] — BGR-срез кадра.
+    origin — экранные координаты левого верхнего угла img (если кадр обрезан).
+    """
+    ox, oy = origin
+    return [
+        [
+            cell_roi(img, int(x) - ox, int(y) - oy, pad)
+            for (x, y) in grid[r][: const.COLS]
+        ]
+        for r in range(const.ROWS)
+    ]
+
+
+@dataclass
+class Frame:
+    """Один скриншот (возможно, обрезанный до сетки) и срезы его клеток"""
+    image: np.ndarray
+    cells: List[List[np.ndarray]]
+    origin: Tuple[int, int] = (0, 0)
+    captured_at: float = field(default_factory=time.time)
+
+
+class FramePipeline:
+    def __init__(self, screen_processor, config: dict, pad: int = 150):
+        self.sp = screen_processor
+        self.config = config
+        self.pad = pad
+
+    @property
+    def save_frames(self) -> bool:
+        return bool(self.config.get("save_frames", False))
+
+    def capture(self, tag: Optional[str] = None) -> Optional[Frame]:
+        """
+        Снять экран в память и нарезать клетки.
+        tag — имя для архива (move12 -> moves/move12.png), если включён save_frames.
+        """
+        if not self.config.get("grid"):
+            print("❌ Сетка не откалибрована!")
+            return None
+
+        grid = self.config["grid"]
+        if self.config.get("capture_crop", True) and hasattr(self.sp, "grab_grid_region"):
+            # только полоса с сеткой — меньше данных с телефона и конвертации
+            img, origin = self.sp.grab_grid_region(self.pad)
+        else:
+            img, origin = self.sp.grab_screen_cv2(), (0, 0)
+        if img is None:
+            return None
+
+        frame = Frame(img, slice_cells(img, grid, self.pad, origin), origin)
+        if self.save_frames:
+            self.archive(frame, tag)
+        return frame
+
+    def archive(self, frame: Frame, tag: Optional[str] = None) -> None:
+        """Отладка: кадр в moves/, клетки в cells/ (как старый crop_cells_from_screen)."""
+        if tag:
+            cv2.imwrite(str(const.MOVES_DIR / f"{tag}.png"), frame.image)
+        for r, row in enumerate(frame.cells):
+            for c, cell in enumerate(row):
+                cv2.imwrite(str(const.CELLS_DIR / f"cell_{r}_{c}.png"), cell)
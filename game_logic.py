@@ -12,15 +12,29 @@ from constants import AD_BTN_X, AD_BTN_Y, AD_CLOSE_POINTS, ORDER_FILE
 from ad_detector_2248 import EndGameAdDetector2248, send_tap_like_mouse
 from end_game_handler import EndGameHandler
 from heuristics_2248 import Heuristics2248
-from find_best_chain_smart import find_best_chain_smart as find_best_chain_smart_fn
+from find_best_chain_smart import chain_move_key, rank_chains as rank_chains_fn
+from expectimax_2248 import Expectimax2248
+from mcts_2248 import MCTS2248
+from lookahead_2248 import Lookahead2248, beam_params
+from decision_cache import DecisionCache, search_strategy_version, weights_digest
 from remember_problem_cell import remember_problem_cell as remember_problem_cell_fn
-from find_all_chains import find_all_chains as find_all_chains_fn
+from find_all_chains import DEFAULT_MAX_PATHS, find_all_chains as find_all_chains_fn
 from evaluate_chain_smart import evaluate_chain_smart as evaluate_chain_smart_fn
+from batch_eval_2248 import evaluate_chains as evaluate_chains_fn
+from color_classifier import ColorClassifier
 from recognize_board_with_confidence import (
     recognize_board_with_confidence as recognize_board_with_confidence_fn,
 )
 from good_moves_manager import GoodMovesManager
 from position_memory import PositionMemory
+from best_moves_manager import BestMovesManager
+from board_engine import (
+    PackedBoard,
+    chain_to_indices,
+    cells_mask,
+    is_straight_chain,
+    simulate_after_clear,
+)
 
 
 class GameLogic:
@@ -33,6 +47,8 @@ class GameLogic:
         self.board = [[-1 for _ in range(const.COLS)] for _ in range(const.ROWS)]
         self.confidence_threshold = 0.7
         self.adaptive_threshold = self.config.get("threshold", 8000)
+        # образцы config["colors"], скомпилированные в матрицу
+        self.color_classifier = ColorClassifier()
 
         self.current_move_attempts = 0
         self.last_move_hash = None
@@ -48,23 +64,41 @@ class GameLogic:
         self.ad_detector = EndGameAdDetector2248()
         self.end_handler = None
 
-        # кэш цепочек по хешу доски
-        self.chain_cache: dict[int, list[tuple[int, int]]] = {}
+        # кэш решений: (хеш доски, версия стратегии) -> цепочка, LRU + диск
+        self.chain_cache = DecisionCache(
+            max_bytes=int(self.config.get("decision_cache_mb", 16) * (1 << 20))
+        )
+        loaded = self.chain_cache.load()
+        if loaded:
+            print(f"[DECISION-CACHE] Загружено решений: {loaded}")
+        # книга заранее посчитанных ходов (build_best_moves.py): хэш -> цепочка,
+        # в ход идут только записи той же версии стратегии
+        self.best_moves = BestMovesManager()
+        if self.config.get("use_best_moves", True):
+            loaded = self.best_moves.load()
+            if loaded:
+                print(f"[BEST-MOVES] Загружено позиций: {loaded}")
+        # ранжирование последнего поиска (smart): цепочки уже с оценками
+        self.last_ranking = None
 
         # ==== Порядки длин цепочек (для перебора стратегий) ====
         self.current_order_index: int = 0
-        self.optimal_lengths: list[int] = [
-            4,
-            5,
-            3,
-            6,
-            2,
-            7,
-            8,
-            9,
-        ]  # [8, 4, 2, 3, 6, 5, 7, 9]
+        self.optimal_lengths: list[int] = list(
+            const.DEFAULT_OPTIMAL_LENGTHS
+        )  # [8, 4, 2, 3, 6, 5, 7, 9]
         self.load_current_order()
 
+        # лимиты перебора цепочек (см. find_all_chains.enumerate_chains)
+        self.max_chain_paths = self.config.get("max_chain_paths", DEFAULT_MAX_PATHS)
+
+        # режим поиска хода: "smart" (порядок длин), "expectimax", "mcts" или "beam"
+        self.search_mode = self.config.get("search_mode", "smart")
+        self.expectimax = None
+        self.mcts = None
+        self.lookahead = None
+        # дайджест весов, с которыми создаются поисковики (для версии стратегии)
+        self._weights_digest = weights_digest()
+
     def load_current_order(self):
         """
         Загружает из ORDER_FILE (optimal_orders.json) текущий порядок длин.
@@ -106,10 +140,12 @@ class GameLogic:
             print("[POSITION] Уже видел такую конфигурацию (в т.ч. в прошлых играх)")
         else:
             print("[POSITION] Новая конфигурация доски")
-            self.position_memory.mark_seen(board_hash)
+        # содержимое доски — в корпус (для build_best_moves); уже сохранённую
+        # позицию mark_seen не перезаписывает
+        self.position_memory.mark_seen(board_hash, self.packed_board())
 
-    def recognize_board_with_confidence(self):
-        return recognize_board_with_confidence_fn(self)
+    def recognize_board_with_confidence(self, frame=None):
+        return recognize_board_with_confidence_fn(self, frame)
 
     def remember_problem_cell(
         self, cell_path, color, guessed_label, distance, confidence
@@ -121,21 +157,16 @@ class GameLogic:
     # ===== ХЕШ ДОСКИ =====
 
     def get_board_hash(self):
-        h = 0
-        for r in range(const.ROWS):
-            for c in range(const.COLS):
-                v = self.board[r][c]
-                if v < 0:
-                    v = 0
-                if v > const.MAX_VALUE:
-                    v = const.MAX_VALUE
-                h ^= const.ZOBRIST_TABLE[(r, c, v)]
-        return h
+        return self.packed_board().hash
+
+    def packed_board(self) -> PackedBoard:
+        """Текущая self.board в компактном виде для поиска/оценки."""
+        return PackedBoard.from_rows(self.board)
 
     # ===== ПОИСК ЦЕПОЧЕК =====
 
-    def find_all_chains(self):
-        return find_all_chains_fn(self)
+    def find_all_chains(self, board=None):
+        return find_all_chains_fn(self, board)
 
     def is_valid_chain(self, chain):
         if len(chain) < 2:
@@ -155,47 +186,14 @@ class GameLogic:
 
         return True
 
-    def _filter_chains(self, chains):
-        if not chains:
-            return []
-
-        chains.sort(key=len, reverse=True)
-        filtered = []
-        seen_cells = set()
-
-        for chain in chains:
-            chain_cells = frozenset(chain)
-            if chain_cells not in seen_cells:
-                is_maximal = True
-                for other_chain in filtered:
-                    if set(chain).issubset(set(other_chain)):
-                        is_maximal = False
-                        break
-
-                if is_maximal:
-                    filtered.append(chain)
-                    seen_cells.add(chain_cells)
-
-        return filtered
-
     def is_straight_chain(self, chain):
-        if len(chain) < 2:
-            return False
-
-        r1, c1 = chain[0]
-        r2, c2 = chain[1]
-        dr, dc = r2 - r1, c2 - c1
-
-        for i in range(2, len(chain)):
-            r_prev, c_prev = chain[i - 1]
-            r_curr, c_curr = chain[i]
-            if (r_curr - r_prev != dr) or (c_curr - c_prev != dc):
-                return False
+        return is_straight_chain(chain)
 
-        return True
+    def evaluate_chain_smart(self, chain, board=None):
+        return evaluate_chain_smart_fn(self, chain, board)
 
-    def evaluate_chain_smart(self, chain):
-        return evaluate_chain_smart_fn(self, chain)
+    def evaluate_chains(self, chains, board=None):
+        return evaluate_chains_fn(self, chains, board)
 
     def is_potential_pair(self, val1, val2):
         return val1 == val2 or val1 * 2 == val2 or val2 * 2 == val1
@@ -213,53 +211,166 @@ class GameLogic:
                     count += 1
         return count
 
-    def find_best_chain_smart(self, board_hash: int):
-        # пробуем достать из кэша
-
-        if board_hash in self.chain_cache:
-            print("[CACHE HIT]", board_hash)
-            return self.chain_cache[board_hash]
-
-        print("[CACHE MISS]", board_hash)
-        print("[ORDER-RUN] current optimal_lengths:", self.optimal_lengths)
-        # вызываем вынесенную функцию с порядком из JSON
-        best_chain = find_best_chain_smart_fn(
-            self.board,
-            board_hash,
-            self.is_move_blacklisted,
-            self.evaluate_chain_smart,
-            self.find_all_chains,
-            optimal_lengths=self.optimal_lengths,
+    def strategy_version(self) -> str:
+        """
+        Версия стратегии для ключа кэша решений: всё, от чего зависит
+        выбранный ход (режим, порядок длин, лимиты перебора, настройки
+        режима и веса эвристик).
+        """
+        return search_strategy_version(
+            self.search_mode, self.optimal_lengths, self.config, self._weights_digest
         )
 
-        # кладём в кэш, если нашли цепочку
-        if best_chain is not None:
-            self.chain_cache[board_hash] = best_chain
+    def reload_weights(self):
+        """
+        Перечитать heuristics_weights.json: поисковики с весами создаются
+        заново при следующем поиске, версия стратегии — по новым весам.
+        """
+        self.close()
+        self.expectimax = None
+        self.mcts = None
+        self.lookahead = None
+        self._weights_digest = weights_digest()
+
+    def save_decision_cache(self):
+        """Сохранить кэш решений на диск (при выходе)."""
+        self.chain_cache.save()
+        print(f"[DECISION-CACHE] Сохранено: {self.chain_cache.summary()}")
+
+    def close(self):
+        """Освободить ресурсы поиска (пул процессов MCTS) перед выходом."""
+        if self.mcts is not None:
+            self.mcts.close()
+
+    def find_best_chain_smart(self, board_hash: int, board=None, use_cache: bool = True):
+        """
+        board — PackedBoard, на которой искать (по умолчанию текущая self.board);
+        use_cache=False — без кэша решений и книги (спекулятивный поиск
+        конвейера по предсказанной доске, которой на экране ещё нет).
+        """
+        version = self.strategy_version()
+        self.last_ranking = None
+        if not use_cache:
+            return self._search_chain(board_hash, board, version, use_cache)
 
-        return best_chain
+        # пробуем достать из кэша
+        cached = self.chain_cache.get(board_hash, version)
+        if cached is not None:
+            if not self.is_move_blacklisted(board_hash, chain_move_key(cached)):
+                print("[CACHE HIT]", board_hash)
+                return cached
+            # ход с тех пор попал в bad_moves — ищем заново
+            self.chain_cache.discard(board_hash, version)
+
+        # известная позиция — ход из книги, без поиска
+        booked = self.best_moves.get(board_hash, version)
+        if booked is not None and not self.is_move_blacklisted(
+            board_hash, chain_move_key(booked)
+        ):
+            print("[BEST-MOVES HIT]", board_hash)
+            return booked
 
-    def simulate_board_after_move(self, chain):
-        simulated = [row[:] for row in self.board]
+        print("[CACHE MISS]", board_hash)
+        return self._search_chain(board_hash, board, version, use_cache)
+
+    def _search_chain(self, board_hash: int, board, version: str, use_cache: bool):
+        started = time.perf_counter()
+        # доску упаковываем один раз на весь поиск
+        if board is None:
+            board = self.packed_board()
+        if self.search_mode == "expectimax":
+            best_chain = self.find_best_chain_expectimax(board, board_hash)
+        elif self.search_mode == "mcts":
+            best_chain = self.find_best_chain_mcts(board, board_hash)
+        elif self.search_mode == "beam":
+            best_chain = self.find_best_chain_beam(board, board_hash)
+        else:
+            print("[ORDER-RUN] current optimal_lengths:", self.optimal_lengths)
+            # вызываем вынесенную функцию с порядком из JSON
+            self.last_ranking = rank_chains_fn(
+                board_hash,
+                self.is_move_blacklisted,
+                lambda chain: self.evaluate_chain_smart(chain, board),
+                lambda: self.find_all_chains(board),
+                optimal_lengths=self.optimal_lengths,
+                evaluate_batch=lambda chains: self.evaluate_chains(chains, board),
+            )
+            best = self.last_ranking.best
+            best_chain = best.chain if best else None
 
-        for r, c in chain:
-            simulated[r][c] = -1
+        self.chain_cache.record_search(time.perf_counter() - started)
 
-        useful_cells = 0
-        for r in range(const.ROWS):
-            for c in range(const.COLS):
-                if simulated[r][c] > 0:
-                    useful_cells += 1
+        # кладём в кэш, если нашли цепочку
+        if use_cache and best_chain is not None:
+            self.chain_cache.put(board_hash, version, best_chain)
 
-        neighbor_pairs = 0
-        for r in range(const.ROWS):
-            for c in range(const.COLS):
-                if simulated[r][c] > 0:
-                    if c + 1 < const.COLS and simulated[r][c] == simulated[r][c + 1]:
-                        neighbor_pairs += 1
-                    if r + 1 < const.ROWS and simulated[r][c] == simulated[r + 1][c]:
-                        neighbor_pairs += 1
+        return best_chain
 
-        return useful_cells, neighbor_pairs
+    def chain_score(self, chain, board=None):
+        """
+        Оценка цепочки на текущей доске: из ранжирования последнего поиска,
+        если цепочка там оценена, иначе — evaluate_chain_smart.
+        """
+        if self.last_ranking is not None:
+            score = self.last_ranking.score_of(chain)
+            if score is not None:
+                return score
+        return self.evaluate_chain_smart(chain, board)
+
+    def find_best_chain_expectimax(self, board: PackedBoard, board_hash: int):
+        """Ход по Expectimax2248 (настройки — config["expectimax"])."""
+        if self.expectimax is None:
+            self.expectimax = Expectimax2248.from_config(self, self.config)
+        chain, value = self.expectimax.search(
+            board,
+            lambda ch: not self.is_move_blacklisted(board_hash, chain_move_key(ch)),
+        )
+        print(
+            f"[EXPECTIMAX] глубина {self.expectimax.completed_depth}, "
+            f"узлов {self.expectimax.nodes}, TT-попаданий {self.expectimax.tt_hits}, "
+            f"ценность {value:.1f}"
+        )
+        return chain
+
+    def find_best_chain_mcts(self, board: PackedBoard, board_hash: int):
+        """Ход по MCTS2248 (настройки — config["mcts"])."""
+        if self.mcts is None:
+            self.mcts = MCTS2248.from_config(self, self.config)
+        chain, stats = self.mcts.search(
+            board,
+            lambda ch: not self.is_move_blacklisted(board_hash, chain_move_key(ch)),
+        )
+        print(
+            f"[MCTS] {self.mcts.simulations} rollout'ов, "
+            f"процессов {self.mcts.workers}"
+        )
+        for st in stats[:5]:
+            print(
+                f"   [MCTS] len={len(st['chain'])} {st['chain'][0]}->{st['chain'][-1]} "
+                f"визитов {st['visits']}, среднее {st['mean']:.1f}"
+            )
+        return chain
+
+    def find_best_chain_beam(self, board: PackedBoard, board_hash: int):
+        """Ход по beam-поиску Lookahead2248 (настройки — config["beam"])."""
+        if self.lookahead is None:
+            self.lookahead = Lookahead2248(self, Heuristics2248(self))
+        pv, value = self.lookahead.beam_search(
+            board,
+            root_filter=lambda ch: not self.is_move_blacklisted(
+                board_hash, chain_move_key(ch)
+            ),
+            **beam_params(self.config),
+        )
+        print(f"[BEAM] PV из {len(pv)} ходов, ценность {value:.1f}")
+        for ply, chain in enumerate(pv):
+            print(f"   [BEAM] {ply + 1}: len={len(chain)} {chain[0]}->{chain[-1]}")
+        return pv[0] if pv else None
+
+    def simulate_board_after_move(self, chain, board=None):
+        if board is None:
+            board = self.packed_board()
+        return simulate_after_clear(board, cells_mask(chain_to_indices(chain)))
 
     def is_move_blacklisted(self, board_hash, move_key):
         return move_key in self.config_manager.bad_moves.get(board_hash, [])
@@ -20,11 +20,13 @@ from find_best_chain_smart import find_best_chain_smart as find_best_chain_smart
 from remember_problem_cell import remember_problem_cell as remember_problem_cell_fn
 from find_all_chains import find_all_chains as find_all_chains_fn
 from evaluate_chain_smart import evaluate_chain_smart as evaluate_chain_smart_fn
+from color_classifier import ColorClassifier
 from recognize_board_with_confidence import (
     recognize_board_with_confidence as recognize_board_with_confidence_fn,
 )
 from good_moves_manager import GoodMovesManager
 from position_memory import PositionMemory
+from board_engine import PackedBoard
 from learning_engine import LearningEngine
 from game_state_recognition import GameStateRecognizer
 
@@ -39,6 +41,8 @@ class EnhancedGameLogic:
         self.board = [[-1 for _ in range(const.COLS)] for _ in range(const.ROWS)]
         self.confidence_threshold = 0.7
         self.adaptive_threshold = self.config.get("threshold", 8000)
+        # образцы config["colors"], скомпилированные в матрицу
+        self.color_classifier = ColorClassifier()
 
         self.current_move_attempts = 0
         self.last_move_hash = None
@@ -132,8 +136,8 @@ class EnhancedGameLogic:
             print("[POSITION] Новая конфигурация доски")
             self.position_memory.mark_seen(board_hash)
 
-    def recognize_board_with_confidence(self):
-        return recognize_board_with_confidence_fn(self)
+    def recognize_board_with_confidence(self, frame=None):
+        return recognize_board_with_confidence_fn(self, frame)
 
     def remember_problem_cell(
         self, cell_path, color, guessed_label, distance, confidence
@@ -145,16 +149,11 @@ class EnhancedGameLogic:
     # ===== ХЕШ ДОСКИ =====
 
     def get_board_hash(self):
-        h = 0
-        for r in range(const.ROWS):
-            for c in range(const.COLS):
-                v = self.board[r][c]
-                if v < 0:
-                    v = 0
-                if v > const.MAX_VALUE:
-                    v = const.MAX_VALUE
-                h ^= const.ZOBRIST_TABLE[(r, c, v)]
-        return h
+        return self.packed_board().hash
+
+    def packed_board(self) -> PackedBoard:
+        """Текущая self.board в компактном виде для поиска/оценки."""
+        return PackedBoard.from_rows(self.board)
 
     # ===== ПОИСК ЦЕПОЧЕК =====
 
@@ -1,12 +1,19 @@
 # game_runner.py
+import asyncio
 import time
 import signal
 import sys
 from typing import Optional, Tuple
 import constants as const
-from constants import AD_CLOSE_POINTS, MOVES_DIR, GOOD_MOVE_MIN_SCORE, WAIT
+from constants import AD_CLOSE_POINTS, GOOD_MOVE_MIN_SCORE, WAIT
 from ad_detector_2248 import send_tap_like_mouse
+from ad_monitor import AdMonitor
 from board_printer import print_board
+from find_best_chain_smart import score_chains
+from frame_pipeline import FramePipeline
+from move_pipeline import MovePipeline
+from persistence import store
+from settle_detector import SettleDetector
 
 
 class GameRunner:
@@ -29,8 +36,17 @@ class GameRunner:
         self.ads_this_game = 0
 
         self.config = config_manager.config
+        self.frames = FramePipeline(screen_processor, self.config)
+        # вместо пауз — ждём, пока экран не перестанет меняться
+        self.settle = SettleDetector.from_config(screen_processor, self.config)
+        # крестик / возврат доски по шаблонам ad_templates/ (если они есть)
+        self.ad_monitor = getattr(screen_processor, "ad_monitor", None) or (
+            AdMonitor.from_config(screen_processor, self.config)
+        )
         self.show_board_each_move = False
         self._stop_requested = False
+        # статистика порядков (optimal_orders.json["stats"]), пишется отложенно
+        self._order_stats = None
         
         # Register signal handler for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -40,6 +56,10 @@ class GameRunner:
         print("\n[SHUTDOWN] Получен сигнал остановки (Ctrl+C), завершаю работу...")
         self._stop_requested = True
         self.save_stats()
+        self.game_logic.save_decision_cache()
+        self.game_logic.close()
+        # всё, что ждёт отложенной записи, — на диск до выхода
+        store.flush()
         sys.exit(0)
 
     def save_stats(self):
@@ -52,6 +72,7 @@ class GameRunner:
         """
         Update statistics for the current order profile in optimal_orders.json.
         This prepares the system for future optimization based on performance.
+        Stats are kept in memory; the file is written by the write-behind store.
         """
         try:
             import json
@@ -59,33 +80,48 @@ class GameRunner:
             
             if not ORDERS_FILE.exists():
                 return
-                
-            data = json.loads(ORDERS_FILE.read_text(encoding="utf-8"))
+            
+            if self._order_stats is None:
+                data = json.loads(ORDERS_FILE.read_text(encoding="utf-8"))
+                self._order_stats = data.get("stats", {})
+                store.register(ORDERS_FILE, self._orders_data)
             
             # Get current order index from GameLogic if available
             current_index = getattr(self.game_logic, 'current_order_index', 0)
             
-            # Initialize stats if not exists
-            if "stats" not in data:
-                data["stats"] = {}
-                
             # Initialize current profile stats if not exists
             profile_key = str(current_index)
-            if profile_key not in data["stats"]:
-                data["stats"][profile_key] = {"games": 0, "total_score": 0.0}
+            if profile_key not in self._order_stats:
+                self._order_stats[profile_key] = {"games": 0, "total_score": 0.0}
             
             # Update stats
-            data["stats"][profile_key]["games"] += 1
-            data["stats"][profile_key]["total_score"] += game_result.get("score", 0)
+            self._order_stats[profile_key]["games"] += 1
+            self._order_stats[profile_key]["total_score"] += game_result.get("score", 0)
             
-            # Save back to file
-            ORDERS_FILE.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            store.mark_dirty(ORDERS_FILE)
             
         except Exception as e:
             print(f"[STATS] Ошибка обновления статистики: {e}")
 
+    def _orders_data(self) -> dict:
+        """
+        optimal_orders.json с нашей статистикой: файл перечитывается при
+        записи — порядки и current_index могли поменять другие инструменты
+        (order_tournament), "stats" ведём только мы.
+        """
+        import json
+        from constants import ORDERS_FILE
+
+        data = json.loads(ORDERS_FILE.read_text(encoding="utf-8"))
+        data.setdefault("stats", {}).update(
+            {k: dict(v) for k, v in list(self._order_stats.items())}
+        )
+        return data
+
     def _handle_advertisement(self) -> bool:
         """Handle advertisement display and return success status."""
+        # кадр до рекламы — образец «доска вернулась», даже без ad_templates/board
+        board_frame = self.screen_processor.grab_screen_cv2()
         print("▶️ Жму кнопку просмотра рекламы через ad_end_detector...")
         try:
             ok = self.ad_detector.tap_ad_button(
@@ -96,16 +132,30 @@ class GameRunner:
             ok = False
 
         if ok:
-            print(f"⏳ Жду окончания рекламы {WAIT} секунд...")
-            remaining = WAIT
-            while remaining > 0 and not self._stop_requested:
-                print(f"   Ожидание: {remaining} сек... ", end="\r")
-                time.sleep(1)
-                remaining -= 1
-                if self._stop_requested:
-                    break
-            print("\n⏱ Ожидание рекламы завершено.")
-            
+            if self.ad_monitor.enabled or self.ad_monitor.board_template(board_frame) is not None:
+                print(f"⏳ Слежу за рекламой (не дольше {WAIT} секунд)...")
+                if self.ad_monitor.dismiss(
+                    self._tap_pixels,
+                    WAIT,
+                    should_stop=lambda: self._stop_requested,
+                    board_frame=board_frame,
+                ):
+                    self.settle.wait()
+                    return True
+                if self.ad_monitor.last_outcome == "stopped":
+                    return False
+                # крестик не нашёлся или реклама не видна — тапаем, как раньше
+            else:
+                # конец рекламы узнавать не по чему: замерший экран — ещё не
+                # конец (статичные кадры ролика), ждём полные WAIT
+                print(f"⏳ Жду окончания рекламы {WAIT} секунд...")
+                remaining = WAIT
+                while remaining > 0 and not self._stop_requested:
+                    print(f"   Ожидание: {remaining} сек... ", end="\r")
+                    time.sleep(1)
+                    remaining -= 1
+                print("\n⏱ Ожидание рекламы завершено.")
+
             print("▶️ Пытаюсь закрыть рекламу (крестик)...")
             res_close = False
             for cx, cy in AD_CLOSE_POINTS:
@@ -120,13 +170,16 @@ class GameRunner:
                     break
             
             if res_close:
-                time.sleep(0.05)
+                self.settle.wait()
                 return True
         else:
             print("❌ Не удалось нажать кнопку рекламы.")
         
         return False
 
+    def _tap_pixels(self, x, y):
+        return self.screen_processor.adb_command(f"adb shell input tap {x} {y}")
+
     def _handle_no_valid_moves(self) -> bool:
         """Handle situation when no valid moves are available."""
         print("⚠️ Вообще нет валидных ходов. Похоже, реклама или конец раунда.")
@@ -166,10 +219,13 @@ class GameRunner:
         if not candidate_pairs:
             return self._handle_no_valid_moves()
 
-        best_pair = max(
+        # каждую пару оцениваем один раз на одной упакованной доске
+        packed = self.game_logic.packed_board()
+        ranked_pairs = score_chains(
             candidate_pairs,
-            key=lambda ch: self.game_logic.evaluate_chain_smart(ch),
+            lambda ch: self.game_logic.evaluate_chain_smart(ch, packed),
         )
+        best_pair, pair_score = ranked_pairs[0].chain, ranked_pairs[0].score
 
         self.game_logic.last_move_type = "fallback_pair"
         self.game_logic.last_move_direction = (
@@ -181,7 +237,6 @@ class GameRunner:
             self.config, best_pair, self.game_logic.board, steps=1
         ):
             print("✅ Выполнен резервный короткий ход вместо рандома")
-            pair_score = self.game_logic.evaluate_chain_smart(best_pair)
             if pair_score >= GOOD_MOVE_MIN_SCORE:
                 self.game_logic.remember_good_move(
                     board_before,
@@ -200,6 +255,70 @@ class GameRunner:
             print("❌ Ошибка выполнения резервного хода")
             return False
 
+    # ===== Шаги хода (общие для run_auto_game и MovePipeline) =====
+
+    def _register_attempt(self, board_before):
+        """Счёт попыток на одной доске; вторая подряд — ход в bad_moves."""
+        if self.game_logic.last_move_hash == board_before:
+            self.game_logic.current_move_attempts += 1
+            print(
+                f"⚠️ Повторная попытка того же хода ({self.game_logic.current_move_attempts}/2)"
+            )
+        else:
+            self.game_logic.current_move_attempts = 1
+            self.game_logic.last_move_hash = board_before
+
+        if self.game_logic.current_move_attempts >= 2:
+            print("🚫 Две неудачные попытки! Выбираю другой ход...")
+            if self.game_logic.last_move_type:
+                self.game_logic.remember_bad_move(
+                    {
+                        "board_state": board_before,
+                        "move_type": self.game_logic.last_move_type,
+                        "direction": self.game_logic.last_move_direction,
+                    }
+                )
+            self.game_logic.current_move_attempts = 0
+
+    def _plan_chain_move(self, best_chain):
+        """Прогноз и оценка выбранной цепочки; запоминает её как последний ход."""
+        useful_cells, neighbor_pairs = (
+            self.game_logic.simulate_board_after_move(best_chain)
+        )
+        chain_score = self.game_logic.chain_score(best_chain)
+
+        print(
+            f"🔗 Умная цепочка из {len(best_chain)} клеток (оценка: {chain_score})"
+        )
+        print(
+            f"   Прогноз: останется {useful_cells} полезных клеток, {neighbor_pairs} потенциальных пар"
+        )
+
+        self.game_logic.last_move_type = "chain"
+        self.game_logic.last_move_direction = (
+            f"{best_chain[0][0]}_{best_chain[0][1]}_"
+            f"{best_chain[-1][0]}_{best_chain[-1][1]}"
+        )
+        return chain_score
+
+    def _on_chain_done(self, board_before, chain_score):
+        """Свайп прошёл: хороший ход — в good_moves, счётчик попыток — сброс."""
+        print("✅ Ход выполнен (MT)")
+        # сохраняем только реально хорошие ходы
+        if chain_score >= GOOD_MOVE_MIN_SCORE:
+            self.game_logic.remember_good_move(
+                board_before,
+                move_type="chain",
+                direction=self.game_logic.last_move_direction,
+                score=chain_score,
+            )
+        else:
+            print(
+                f"ℹ️ Ход с оценкой {chain_score:.1f} не сохраняю как хороший."
+            )
+        self.game_logic.current_move_attempts = 0
+        self.game_logic.last_move_hash = None
+
     def run_auto_game(self, max_moves=100):
         print("\n" + "=" * 60)
         print("🤖 ЗАПУСК АВТОМАТИЧЕСКОЙ ИГРЫ 2248 С ОБУЧЕНИЕМ")
@@ -209,20 +328,38 @@ class GameRunner:
             print("❌ Бот не готов к игре!")
             return
 
+        if self.config.get("move_pipeline", "sync") == "async":
+            # захват, поиск и ввод внахлёст (move_pipeline.MovePipeline)
+            self.run_auto_game_async(max_moves)
+        else:
+            self._run_moves(max_moves)
+
+        print("\n" + "=" * 60)
+        print("🏁 АВТОМАТИЧЕСКАЯ ИГРА ЗАВЕРШЕНА!")
+        print("=" * 60)
+
+    def run_auto_game_async(self, max_moves=100) -> dict:
+        """Ходы через асинхронный конвейер. -> статистика (ходов в минуту и т.д.)."""
+        return asyncio.run(MovePipeline(self).run(max_moves))
+
+    def _run_moves(self, max_moves):
         for move in range(1, max_moves + 1):
             if self._stop_requested:
                 print("\n[SHUTDOWN] Остановлено пользователем.")
                 break
                 
-            move_path = MOVES_DIR / f"move{move}.png"
             print(f"\n🎯 Ход #{move}/{max_moves}")
 
-            # 1. Скриншот
-            self.screen_processor.take_screenshot(str(move_path))
+            # 1. Скриншот в память (на диск — только при config["save_frames"])
+            frame = self.frames.capture(f"move{move}")
+            if frame is None:
+                print("❌ Не удалось получить скриншот")
+                break
 
-            # 2. Обрезка клеток и распознавание
-            self.screen_processor.crop_cells_from_screen(str(move_path))
-            board, confidence_board = self.game_logic.recognize_board_with_confidence()
+            # 2. Клетки — срезы кадра, распознавание без PNG
+            board, confidence_board = self.game_logic.recognize_board_with_confidence(
+                frame
+            )
             if board is None:
                 print("❌ Не удалось распознать доску")
                 break
@@ -233,68 +370,18 @@ class GameRunner:
             
             # 3. Логика хода
             board_before = self.game_logic.get_board_hash()
-
-            if self.game_logic.last_move_hash == board_before:
-                self.game_logic.current_move_attempts += 1
-                print(
-                    f"⚠️ Повторная попытка того же хода ({self.game_logic.current_move_attempts}/2)"
-                )
-            else:
-                self.game_logic.current_move_attempts = 1
-                self.game_logic.last_move_hash = board_before
-
-            if self.game_logic.current_move_attempts >= 2:
-                print("🚫 Две неудачные попытки! Выбираю другой ход...")
-                if self.game_logic.last_move_type:
-                    self.game_logic.remember_bad_move(
-                        {
-                            "board_state": board_before,
-                            "move_type": self.game_logic.last_move_type,
-                            "direction": self.game_logic.last_move_direction,
-                        }
-                    )
-                self.game_logic.current_move_attempts = 0
+            self._register_attempt(board_before)
 
             # 4. УМНЫЙ поиск цепочки
             best_chain = self.game_logic.find_best_chain_smart(board_before)
 
             if best_chain:
-                useful_cells, neighbor_pairs = (
-                    self.game_logic.simulate_board_after_move(best_chain)
-                )
-                chain_score = self.game_logic.evaluate_chain_smart(best_chain)
-
-                print(
-                    f"🔗 Умная цепочка из {len(best_chain)} клеток (оценка: {chain_score})"
-                )
-                print(
-                    f"   Прогноз: останется {useful_cells} полезных клеток, {neighbor_pairs} потенциальных пар"
-                )
-
-                self.game_logic.last_move_type = "chain"
-                self.game_logic.last_move_direction = (
-                    f"{best_chain[0][0]}_{best_chain[0][1]}_"
-                    f"{best_chain[-1][0]}_{best_chain[-1][1]}"
-                )
+                chain_score = self._plan_chain_move(best_chain)
 
                 if self.input.perform_chain_swipe_mt(
                     self.config, best_chain, self.game_logic.board, steps=1
                 ):
-                    print("✅ Ход выполнен (MT)")
-                    # сохраняем только реально хорошие ходы
-                    if chain_score >= GOOD_MOVE_MIN_SCORE:
-                        self.game_logic.remember_good_move(
-                            board_before,
-                            move_type="chain",
-                            direction=self.game_logic.last_move_direction,
-                            score=chain_score,
-                        )
-                    else:
-                        print(
-                            f"ℹ️ Ход с оценкой {chain_score:.1f} не сохраняю как хороший."
-                        )
-                    self.game_logic.current_move_attempts = 0
-                    self.game_logic.last_move_hash = None
+                    self._on_chain_done(board_before, chain_score)
                 else:
                     print("❌ Ошибка выполнения хода (MT)")
                     break
@@ -305,15 +392,12 @@ class GameRunner:
                 if not success:
                     break
 
+            # анимация хода доиграла — тогда и проверяем конец игры
+            self.settle.wait()
+
             # Single check_and_restart call instead of double
             state = self.end_handler.check_and_restart()
             if state in ("win", "lose"):
                 self.game_logic.current_move_attempts = 0
                 self.game_logic.last_move_hash = None
                 continue
-
-            time.sleep(0.01)
-
-        print("\n" + "=" * 60)
-        print("🏁 АВТОМАТИЧЕСКАЯ ИГРА ЗАВЕРШЕНА!")
-        print("=" * 60)
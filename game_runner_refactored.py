@@ -4,9 +4,10 @@ import signal
 import sys
 from typing import Optional, Tuple
 import constants as const
-from constants import AD_CLOSE_POINTS, MOVES_DIR, GOOD_MOVE_MIN_SCORE, WAIT
+from constants import AD_CLOSE_POINTS, GOOD_MOVE_MIN_SCORE, WAIT
 from ad_detector_2248 import send_tap_like_mouse
 from board_printer import print_board
+from frame_pipeline import FramePipeline
 
 
 class GameRunner:
@@ -29,6 +30,7 @@ class GameRunner:
         self.ads_this_game = 0
 
         self.config = config_manager.config
+        self.frames = FramePipeline(screen_processor, self.config)
         self.show_board_each_move = False
         self._stop_requested = False
         
@@ -178,15 +180,18 @@ class GameRunner:
                 print("\n[SHUTDOWN] Остановлено пользователем.")
                 break
                 
-            move_path = MOVES_DIR / f"move{move}.png"
             print(f"\n🎯 Ход #{move}/{max_moves}")
 
-            # 1. Скриншот
-            self.screen_processor.take_screenshot(str(move_path))
+            # 1. Скриншот в память (на диск — только при config["save_frames"])
+            frame = self.frames.capture(f"move{move}")
+            if frame is None:
+                print("❌ Не удалось получить скриншот")
+                break
 
-            # 2. Обрезка клеток и распознавание
-            self.screen_processor.crop_cells_from_screen(str(move_path))
-            board, confidence_board = self.game_logic.recognize_board_with_confidence()
+            # 2. Клетки — срезы кадра, распознавание без PNG
+            board, confidence_board = self.game_logic.recognize_board_with_confidence(
+                frame
+            )
             if board is None:
                 print("❌ Не удалось распознать доску")
                 break
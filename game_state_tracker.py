@@ -10,6 +10,8 @@ from dataclasses import dataclass
 from collections import defaultdict, deque
 import numpy as np
 
+from persistence import store
+
 
 @dataclass
 class GameState:
@@ -83,6 +85,9 @@ class GameStateTracker:
         
         # Load existing data if available
         self.load_stats()
+
+        # save_stats() only marks the file dirty; a background thread writes it
+        store.register(self.stats_file, self._stats_data)
     
     def start_new_game(self, board: List[List[int]], profile_idx: int = 0) -> GameState:
         """Start tracking a new game"""
@@ -329,9 +334,9 @@ class GameStateTracker:
         
         return best_profile
     
-    def save_stats(self):
-        """Save statistics to file"""
-        stats_data = {
+    def _stats_data(self) -> Dict[str, Any]:
+        """Snapshot of the statistics in the stats file format"""
+        return {
             'total_games': self.total_games,
             'total_wins': self.total_wins,
             'total_score': self.total_score,
@@ -356,12 +361,10 @@ class GameStateTracker:
                 for s in list(self.session_history)[-20:]  # Save last 20 sessions
             ]
         }
-        
-        try:
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving game stats: {e}")
+    
+    def save_stats(self):
+        """Schedule a write of the statistics file (write-behind, see persistence)"""
+        store.mark_dirty(self.stats_file)
     
     def load_stats(self):
         """Load statistics from file"""
@@ -0,0 +1,224 @@
+# gesture_compiler.py
+"""
+Компилятор жестов: цепочка клеток -> готовая adb-команда свайпа.
+
+Раньше свайп был строкой из десятков `sendevent` — на телефоне каждый
+из них отдельный процесс, да ещё to_abs_coords пересчитывался на каждый
+отрезок. Теперь:
+- таблица клетка -> (ABS_MT_POSITION_X, ABS_MT_POSITION_Y) строится один
+  раз по config["grid"] (перестраивается, если сетку откалибровали заново);
+- жест собирается в поток struct input_event
+      struct timeval (tv_sec, tv_usec), __u16 type, __u16 code, __s32 value
+  (24 байта на 64-битном ядре, 16 — на 32-битном; время ядро
+  проставляет само) — те же события, что давал sendevent;
+- поток режется по кадрам (события до SYN_REPORT включительно) и пишется
+  в EVENT_DEV одной shell-командой на телефоне, кадр за кадром:
+      echo <кадр1> | base64 -d > /dev/input/eventN; sleep 0.008; echo <кадр2> ...
+  ("printf" — восьмеричные \\ooo, если на телефоне нет base64).
+  Пауза frame_pause между кадрами — как естественный темп sendevent-
+  скрипта: приложение, читающее касания раз в кадр, не увидит DOWN и UP
+  в одном кадре. Кусок кратен размеру события и не больше MAX_WRITE —
+  base64/printf отдают его одним write(), и evdev не получает обрывок
+  события;
+- готовые команды кэшируются по (цепочка, steps, pressure) — повторный
+  свайп стоит одного обращения к adb.
+
+Пока режим не проверен на устройстве, по умолчанию InputController
+шлёт старый sendevent-скрипт; поток событий — config["gesture_mode"] = "events".
+"""
+import base64
+import struct
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import constants as const
+
+EV_SYN, EV_KEY, EV_ABS = 0, 1, 3
+SYN_REPORT = 0
+BTN_TOUCH = 330
+ABS_MT_POSITION_X = 53
+ABS_MT_POSITION_Y = 54
+ABS_MT_TRACKING_ID = 57
+ABS_MT_PRESSURE = 58
+
+# struct input_event: 64-битное ядро (long = 8 байт) и 32-битное
+_EVENT_STRUCTS = {24: struct.Struct("<qqHHi"), 16: struct.Struct("<llHHi")}
+
+MAX_WRITE = 4096  # байт: меньше буфера stdio — на телефоне один write()
+DEFAULT_FRAME_PAUSE = 0.008  # с между кадрами жеста (~кадр при 120 Гц)
+
+Event = Tuple[int, int, int]
+
+
+def chain_events(points: Sequence[Tuple[int, int]], pressure: int = 1024) -> List[Event]:
+    """События свайпа по точкам — порядок как у sendevent-скрипта."""
+    x0, y0 = points[0]
+    events = [
+        (EV_ABS, ABS_MT_TRACKING_ID, 0),
+        (EV_ABS, ABS_MT_POSITION_X, x0),
+        (EV_ABS, ABS_MT_POSITION_Y, y0),
+        (EV_ABS, ABS_MT_PRESSURE, pressure),
+        (EV_KEY, BTN_TOUCH, 1),
+        (EV_SYN, SYN_REPORT, 0),
+    ]
+    for x, y in points[1:]:
+        events += [
+            (EV_ABS, ABS_MT_POSITION_X, x),
+            (EV_ABS, ABS_MT_POSITION_Y, y),
+            (EV_ABS, ABS_MT_PRESSURE, pressure),
+            (EV_SYN, SYN_REPORT, 0),
+        ]
+    events += [
+        (EV_ABS, ABS_MT_PRESSURE, 0),
+        (EV_ABS, ABS_MT_TRACKING_ID, -1),
+        (EV_KEY, BTN_TOUCH, 0),
+        (EV_SYN, SYN_REPORT, 0),
+    ]
+    return events
+
+
+def pack_events(events: Sequence[Event], event_size: int = 24) -> bytes:
+    """События -> байты struct input_event (нулевое время)."""
+    fmt = _EVENT_STRUCTS[event_size]
+    return b"".join(fmt.pack(0, 0, t, c, v) for t, c, v in events)
+
+
+def frame_chunks(
+    events: Sequence[Event], event_size: int = 24, max_bytes: int = MAX_WRITE
+) -> List[bytes]:
+    """
+    Поток событий по кадрам: кусок заканчивается SYN_REPORT, кратен
+    event_size и не длиннее max_bytes (длинный кадр режется по событиям).
+    """
+    per_write = max(1, max_bytes // event_size)
+    chunks: List[bytes] = []
+    group: List[Event] = []
+    for event in events:
+        group.append(event)
+        if (event[0], event[1]) == (EV_SYN, SYN_REPORT) or len(group) == per_write:
+            chunks.append(pack_events(group, event_size))
+            group = []
+    if group:
+        chunks.append(pack_events(group, event_size))
+    return chunks
+
+
+def _write_one(payload: bytes, device: str, encoding: str) -> str:
+    if encoding == "printf":
+        escaped = "".join(f"\\\\{b:03o}" for b in payload)
+        return f"printf '{escaped}' > {device}"
+    data = base64.b64encode(payload).decode("ascii")
+    return f"echo {data} | base64 -d > {device}"
+
+
+def write_command(
+    payloads: Union[bytes, Sequence[bytes]],
+    device: str,
+    encoding: str = "base64",
+    pause: float = 0.0,
+) -> str:
+    """
+    adb-команда: каждый кусок — отдельной записью в device,
+    между записями sleep pause (0 — без пауз).
+    """
+    if isinstance(payloads, (bytes, bytearray)):
+        payloads = [payloads]
+    sep = f"; sleep {pause:g}; " if pause > 0 else "; "
+    script = sep.join(_write_one(p, device, encoding) for p in payloads)
+    return f'adb shell "{script}"'
+
+
+class GestureCompiler:
+    def __init__(
+        self,
+        to_abs_coords,
+        device: str = const.EVENT_DEV,
+        event_size: int = 24,
+        encoding: str = "base64",
+        cache_size: int = 4096,
+        frame_pause: float = DEFAULT_FRAME_PAUSE,
+    ):
+        """
+        to_abs_coords(config, x_px, y_px) -> (x_abs, y_abs) — как у InputController.
+        frame_pause — секунд между кадрами жеста на телефоне.
+        """
+        self.to_abs_coords = to_abs_coords
+        self.device = device
+        self.event_size = event_size
+        self.encoding = encoding
+        self.frame_pause = frame_pause
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self.table: Optional[List[List[Tuple[int, int]]]] = None
+        self._grid_key = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, to_abs_coords, config: Optional[dict]) -> "GestureCompiler":
+        """
+        config["input_event_size"] (24/16), config["gesture_encoding"],
+        config["gesture_frame_sec"] (пауза между кадрами).
+        """
+        config = config or {}
+        return cls(
+            to_abs_coords,
+            event_size=int(config.get("input_event_size", 24)),
+            encoding=config.get("gesture_encoding", "base64"),
+            frame_pause=float(config.get("gesture_frame_sec", DEFAULT_FRAME_PAUSE)),
+        )
+
+    # ===== Таблица координат =====
+
+    def abs_table(self, config) -> List[List[Tuple[int, int]]]:
+        """Клетка (r, c) -> ABS-координаты; пересчёт только при смене сетки."""
+        grid_key = tuple(tuple(map(tuple, row)) for row in config["grid"])
+        if grid_key != self._grid_key:
+            self.table = [
+                [self.to_abs_coords(config, x, y) for x, y in row]
+                for row in config["grid"]
+            ]
+            self._grid_key = grid_key
+            self.cache.clear()
+        return self.table
+
+    def chain_points(self, config, chain, steps: int = 1) -> List[Tuple[int, int]]:
+        """Точки свайпа: steps шагов на отрезок, подряд идущие дубли убраны."""
+        table = self.abs_table(config)
+        points: List[Tuple[int, int]] = []
+        for (sr, sc), (er, ec) in zip(chain, chain[1:]):
+            start_x, start_y = table[sr][sc]
+            end_x, end_y = table[er][ec]
+            for s in range(steps + 1):
+                t = 0 if steps == 0 else s / steps
+                x = int(start_x + (end_x - start_x) * t)
+                y = int(start_y + (end_y - start_y) * t)
+                if not points or (x, y) != points[-1]:
+                    points.append((x, y))
+        return points
+
+    # ===== Компиляция =====
+
+    def compile(self, config, chain, steps: int = 1, pressure: int = 1024) -> Optional[str]:
+        """Цепочка -> adb-команда свайпа (из кэша, если уже собиралась)."""
+        self.abs_table(config)  # сетка сменилась — кэш сбрасывается
+        key = (tuple(map(tuple, chain)), steps, pressure)
+        cmd = self.cache.get(key)
+        if cmd is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return cmd
+
+        self.misses += 1
+        points = self.chain_points(config, chain, steps)
+        if not points:
+            return None
+        chunks = frame_chunks(chain_events(points, pressure), self.event_size)
+        cmd = write_command(chunks, self.device, self.encoding, self.frame_pause)
+        self.cache[key] = cmd
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return cmd
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self.cache), "hits": self.hits, "misses": self.misses}
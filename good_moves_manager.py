@@ -4,12 +4,15 @@ from collections import defaultdict
 from pathlib import Path
 
 from constants import GOOD_MOVES_FILE
+from persistence import store
 
 
 class GoodMovesManager:
     def __init__(self):
         self._moves = defaultdict(list)
         self._loaded = False
+        # _save() только помечает файл — пишет фоновый поток (persistence)
+        store.register(GOOD_MOVES_FILE, self._data)
 
     # ===== ВНУТРЕННЕЕ =====
 
@@ -32,11 +35,11 @@ class GoodMovesManager:
                 print(f"⚠️ Не удалось загрузить good_moves: {e}")
                 self._moves = defaultdict(list)
 
+    def _data(self):
+        return {str(k): list(v) for k, v in list(self._moves.items())}
+
     def _save(self):
-        GOOD_MOVES_FILE.parent.mkdir(exist_ok=True, parents=True)
-        data = {str(k): v for k, v in self._moves.items()}
-        with open(GOOD_MOVES_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        store.mark_dirty(GOOD_MOVES_FILE)
         # можно без принта, чтобы не заспамить
 
     # ===== ПУБЛИЧНОЕ API =====
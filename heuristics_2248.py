@@ -2,6 +2,22 @@
 import json
 from pathlib import Path
 import constants as const
+from board_engine import (
+    CELL_RC,
+    NEIGHBORS4,
+    cells_mask,
+    is_straight_chain,
+    simulate_after_clear,
+)
+from evaluate_chain_smart import POSITION_WEIGHT
+from batch_eval_2248 import BATCH_MIN_CHAINS, evaluate_chains_heuristics
+
+# клетки на расстоянии <= 1 от центра (штраф за крупные числа в центре)
+_CENTER_CELLS = tuple(
+    i
+    for i, (r, c) in enumerate(CELL_RC)
+    if abs(r - const.ROWS // 2) + abs(c - const.COLS // 2) <= 1
+)
 
 
 class Heuristics2248:
@@ -10,6 +26,8 @@ class Heuristics2248:
         self.gl = game_logic
         self.weights_path = Path(weights_path)
         self.weights = self._load_weights()
+        # отладочный вывод каждой оценки (выключается в офлайн-симуляции)
+        self.verbose = True
 
     def _load_weights(self):
         if self.weights_path.exists():
@@ -31,25 +49,34 @@ class Heuristics2248:
         with open(self.weights_path, "w", encoding="utf-8") as f:
             json.dump(self.weights, f, ensure_ascii=False, indent=2)
 
-    def evaluate_chain(self, chain):
+    def evaluate_chain(self, chain, board=None):
         """
         Основная оценка цепочки. Здесь вся эвристика.
+        board — PackedBoard; если не передан, берётся текущая доска GameLogic.
         """
         if not chain:
             return -999999
 
         w = self.weights  # все коэффициенты берём из конфига
-        board = self.gl.board
+        if board is None:
+            board = self.gl.packed_board()
+        cells = board.cells
+        values = board.values
+        # таблицы доски строятся один раз; дальше всё за O(длина цепочки)
+        f = board.features
+
+        idx = [r * const.COLS + c for r, c in chain]
+        chain_mask = cells_mask(idx)
+        chain_exps = [cells[i] for i in idx]
 
         # 1. Базовая ценность
-        base_value = sum(board[r][c] for r, c in chain)
+        base_value = sum(values[i] for i in idx)
         length_bonus = len(chain) * w["length_bonus"]
 
         # 1.1 Бонус за очистку мелких чисел (2,4,8,16)
         small_bonus = 0
-        for r, c in chain:
-            val = board[r][c]
-            if val in (2, 4, 8, 16):
+        for i in idx:
+            if 1 <= cells[i] <= 4:
                 small_bonus += w["small_bonus"]
 
         # 2. Штраф за слишком длинные цепочки
@@ -59,89 +86,55 @@ class Heuristics2248:
             length_penalty = 0
 
         # 3. Бонус за центр
-        center_r, center_c = const.ROWS // 2, const.COLS // 2
-        position_weight = 0
-        for r, c in chain:
-            distance = abs(r - center_r) + abs(c - center_c)
-            position_weight += max(0, 10 - distance * 2)
-        position_bonus = position_weight * 3
+        position_bonus = sum(POSITION_WEIGHT[i] for i in idx) * 3
 
         # 4. Штраф за разрушение мостов
         bridge_penalty = 0
-        for r, c in chain:
-            cell_value = board[r][c]
-            for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < const.ROWS and 0 <= nc < const.COLS:
-                    if (nr, nc) not in chain:
-                        neighbor_value = board[nr][nc]
-                        if neighbor_value > 0 and self.gl.is_potential_pair(
-                            cell_value, neighbor_value
-                        ):
-                            penalty = w["bridge_penalty_base"] * max(
-                                1, cell_value // 64
-                            )
-                            if self.gl.count_potential_pairs(nr, nc) == 1:
-                                penalty *= 2
-                            bridge_penalty += penalty
+        for i in idx:
+            e = cells[i]
+            if not e:
+                continue
+            for j in NEIGHBORS4[i]:
+                if (chain_mask >> j) & 1:
+                    continue
+                ej = cells[j]
+                if ej and -1 <= ej - e <= 1:
+                    penalty = w["bridge_penalty_base"] * max(1, values[i] // 64)
+                    if f.potential_pairs[j] == 1:
+                        penalty *= 2
+                    bridge_penalty += penalty
 
         # 5. Бонус за очистку мусора вокруг
         cleanup_bonus = 0
-        for r, c in chain:
-            for dr, dc in [
-                (0, 1),
-                (1, 0),
-                (0, -1),
-                (-1, 0),
-                (1, 1),
-                (1, -1),
-                (-1, 1),
-                (-1, -1),
-            ]:
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < const.ROWS and 0 <= nc < const.COLS:
-                    if board[nr][nc] == -1:
-                        cleanup_bonus += 5
+        for i in idx:
+            cleanup_bonus += 5 * f.empty8[i]
 
         # 6. Изоляция крупных чисел
         isolation_penalty = 0
-        chain_values = [board[r][c] for r, c in chain]
-        for value in chain_values:
-            if value >= 128:
-                same_values_left = False
-                for r in range(const.ROWS):
-                    for c in range(const.COLS):
-                        if (r, c) not in chain and board[r][c] == value:
-                            same_values_left = True
-                            break
-                    if same_values_left:
-                        break
-                if not same_values_left:
-                    isolation_penalty += w["isolation_penalty_base"] * max(
-                        1, value // 128
-                    )
+        for i in idx:
+            e = cells[i]
+            if e >= 7 and not f.same_left(e, chain_exps):  # >= 128
+                isolation_penalty += w["isolation_penalty_base"] * max(
+                    1, values[i] // 128
+                )
 
         # 7. Мелкий бонус за прямую цепочку
         straight_bonus = (
-            w["straight_bonus"] if self.gl.is_straight_chain(chain) else 0
+            w["straight_bonus"] if is_straight_chain(chain) else 0
         )
 
         # 8. Взгляд вперёд: используем симуляцию
-        useful_cells, neighbor_pairs = self.gl.simulate_board_after_move(chain)
+        useful_cells, neighbor_pairs = simulate_after_clear(board, chain_mask)
         open_cells_bonus = useful_cells * w["open_cell_coef"]
         pair_bonus = neighbor_pairs * w["pair_coef"]
 
         # 9. Штраф за очень крупные числа в центре
         center_penalty = 0
-        for r in range(const.ROWS):
-            for c in range(const.COLS):
-                val = board[r][c]
-                if val >= 256:
-                    dist = abs(r - center_r) + abs(c - center_c)
-                    if dist <= 1:
-                        center_penalty += w["center_penalty_base"] * max(
-                            1, val // 256
-                        )
+        for k in _CENTER_CELLS:
+            if cells[k] >= 8:  # >= 256
+                center_penalty += w["center_penalty_base"] * max(
+                    1, values[k] // 256
+                )
 
         total_score = (
             base_value
@@ -158,6 +151,20 @@ class Heuristics2248:
             - center_penalty
         )
 
-        print(f"HEUR: len={len(chain)} base={base_value} score={total_score}")
+        if self.verbose:
+            print(f"HEUR: len={len(chain)} base={base_value} score={total_score}")
 
         return total_score
+
+    def evaluate_batch(self, chains, board=None):
+        """
+        Оценки evaluate_chain для списка цепочек: от BATCH_MIN_CHAINS —
+        одним пакетом NumPy (веса — вектор, признаки — матрица), иначе скалярно.
+        """
+        if board is None:
+            board = self.gl.packed_board()
+        if len(chains) < BATCH_MIN_CHAINS:
+            return [self.evaluate_chain(chain, board) for chain in chains]
+        return evaluate_chains_heuristics(
+            board, chains, self.weights, _CENTER_CELLS
+        ).tolist()
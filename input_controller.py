@@ -1,10 +1,16 @@
 # input_controller.py
 import constants as const
+from gesture_compiler import GestureCompiler
 
 
 class InputController:
     def __init__(self, screen_processor):
         self.sp = screen_processor
+        # config["gesture_mode"] = "events" — свайп потоком input_event по кадрам
+        # в EVENT_DEV (команды в кэше); по умолчанию — sendevent-скрипт
+        self.gestures = GestureCompiler.from_config(
+            self.to_abs_coords, getattr(screen_processor, "config", None)
+        )
 
     def to_abs_coords(self, config, x_px, y_px):
         if not config.get("grid"):
@@ -35,24 +41,13 @@ class InputController:
         for i, (r, c) in enumerate(chain):
             print(f" {i+1}: [{r},{c}] = {board[r][c]}")
 
-        all_points = []
-        for i in range(len(chain) - 1):
-            start_r, start_c = chain[i]
-            end_r, end_c = chain[i + 1]
-
-            sx_px, sy_px = config["grid"][start_r][start_c]
-            ex_px, ey_px = config["grid"][end_r][end_c]
-
-            start_x, start_y = self.to_abs_coords(config, sx_px, sy_px)
-            end_x, end_y = self.to_abs_coords(config, ex_px, ey_px)
-
-            for s in range(steps + 1):
-                t = 0 if steps == 0 else s / steps
-                x = int(start_x + (end_x - start_x) * t)
-                y = int(start_y + (end_y - start_y) * t)
-                if not all_points or (x, y) != all_points[-1]:
-                    all_points.append((x, y))
+        if config.get("gesture_mode", "sendevent") == "events":
+            cmd = self.gestures.compile(config, chain, steps, pressure)
+            if cmd is None:
+                return False
+            return self.sp.adb_command(cmd) is not None
 
+        all_points = self.gestures.chain_points(config, chain, steps)
         if not all_points:
             return False
 
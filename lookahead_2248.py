@@ -1,61 +1,92 @@
 # lookahead_2248.py
-import copy
+from typing import Callable, List, Optional, Tuple
+
 import constants as const
+from board_engine import PackedBoard, chain_to_indices
+from find_best_chain_smart import ScoredChain
+from simulator_2248 import Simulator2248, SmartPolicy
+
+# Настройки beam-поиска по умолчанию (config["beam"] поверх них)
+DEFAULT_BEAM = {
+    "depth": 4,
+    "width": 8,
+    "discount": 0.9,
+    "dead_end_penalty": 5000.0,
+    "scorer": "smart",  # "smart" — evaluate_chain_smart, "heuristics" — Heuristics2248
+}
+
+
+def beam_params(config: Optional[dict] = None) -> dict:
+    """Настройки из config["beam"] поверх DEFAULT_BEAM."""
+    params = dict(DEFAULT_BEAM)
+    if config:
+        params.update(config.get("beam", {}))
+    return params
 
 
 class Lookahead2248:
-    def __init__(self, game_logic, heuristics):
+    def __init__(self, game_logic, heuristics, simulator=None):
         """
         game_logic — чтобы уметь находить цепочки и симулировать ходы.
         heuristics — чтобы оценивать цепочки.
+        simulator  — Simulator2248 (слияние и падение тайлов).
         """
         self.gl = game_logic
         self.heur = heuristics
+        self.sim = simulator or Simulator2248.from_config(
+            getattr(game_logic, "config", None)
+        )
 
     def clone_board(self, board):
-        return [row[:] for row in board]
+        """
+        PackedBoard неизменяем — клонирование бесплатное.
+        list-of-lists доску сразу упаковываем.
+        """
+        if isinstance(board, PackedBoard):
+            return board.clone()
+        return PackedBoard.from_rows(board)
 
     def simulate_chain_on_board(self, board, chain):
         """
-        Простейшая симуляция: удаляем клетки цепочки.
-        (Можно доработать, если у тебя есть более точная модель падения/спавна.)
+        Слияние цепочки в последней клетке и падение тайлов (Simulator2248).
+        Спавн не моделируем: какие тайлы выпадут, заранее неизвестно,
+        поэтому новые клетки сверху остаются пустыми.
         """
-        new_board = self.clone_board(board)
-        for r, c in chain:
-            new_board[r][c] = -1
-        return new_board
+        board_after, _ = self.sim.apply_chain(
+            self.clone_board(board), chain_to_indices(chain)
+        )
+        return board_after
 
     def find_all_chains_on_board(self, board_state):
         """
-        Используем существующий find_all_chains, но подсовываем свою доску.
+        Используем существующий find_all_chains, но на переданной доске.
         """
-        original = self.gl.board
-        self.gl.board = self.clone_board(board_state)
-        chains = self.gl.find_all_chains()
-        self.gl.board = original
-        return chains
+        return self.gl.find_all_chains(self.clone_board(board_state))
 
-    def evaluate_with_lookahead(self, chain, depth=2):
+    def evaluate_with_lookahead(self, chain, depth=2, board=None, base_score=None):
         """
         Оценка цепочки с простым lookahead до depth ходов.
         depth=1  — как обычная эвристика.
         depth=2+ — смотрим лучший ответ на следующем ходе.
+        board, base_score — уже упакованная доска и уже посчитанная оценка
+        хода (из ранжирования), чтобы не считать их заново.
         """
         if not chain:
             return -999999
 
         # текущая доска
-        board_now = self.clone_board(self.gl.board)
-
-        # шаг 1: применяем цепочку к доске
-        board_after = self.simulate_chain_on_board(board_now, chain)
+        board_now = board if board is not None else self.gl.packed_board()
 
         # базовая оценка первого хода
-        base_score = self.heur.evaluate_chain(chain)
+        if base_score is None:
+            base_score = self.heur.evaluate_chain(chain, board_now)
 
         if depth <= 1:
             return base_score
 
+        # шаг 1: применяем цепочку к доске
+        board_after = self.simulate_chain_on_board(board_now, chain)
+
         # шаг 2: ищем цепочки на следующем ходе
         next_chains = self.find_all_chains_on_board(board_after)
         if not next_chains:
@@ -63,16 +94,7 @@ class Lookahead2248:
             return base_score - 500
 
         # считаем максимальную оценку лучшего следующего хода
-        best_next = -999999
-        for ch2 in next_chains:
-            # подменяем board в game_logic временно
-            original = self.gl.board
-            self.gl.board = self.clone_board(board_after)
-            s2 = self.heur.evaluate_chain(ch2)
-            self.gl.board = original
-
-            if s2 > best_next:
-                best_next = s2
+        best_next = max(self.heur.evaluate_batch(next_chains, board_after))
 
         # комбинируем: текущий ход + доля следующего
         # 0.5 — вес влияния следующего хода, можно крутить
@@ -83,3 +105,110 @@ class Lookahead2248:
         )
 
         return total
+
+    def rank_with_lookahead(self, chains, depth=2):
+        """
+        Ранжирование кандидатов (например, цепочек из ChainRanking.candidates)
+        по lookahead-оценке: доска упаковывается один раз, каждый кандидат
+        оценивается один раз. -> [ScoredChain, ...] по убыванию.
+        """
+        board_now = self.gl.packed_board()
+        ranked = [
+            ScoredChain(
+                chain, self.evaluate_with_lookahead(chain, depth, board=board_now)
+            )
+            for chain in chains
+        ]
+        ranked.sort(key=lambda item: item.score, reverse=True)
+        return ranked
+
+    # ===== Beam-поиск =====
+
+    def score_chains_on_board(self, chains, board, scorer="smart"):
+        """Пакетная оценка цепочек: evaluate_chain_smart или Heuristics2248."""
+        if scorer == "heuristics":
+            return self.heur.evaluate_batch(chains, board)
+        return self.gl.evaluate_chains(chains, board)
+
+    def beam_search(
+        self,
+        board=None,
+        depth: int = 4,
+        width: int = 8,
+        discount: float = 0.9,
+        dead_end_penalty: float = 5000.0,
+        scorer: str = "smart",
+        root_filter: Optional[Callable[[list], bool]] = None,
+    ) -> Tuple[List[list], float]:
+        """
+        Beam-поиск на depth ходов вперёд: на каждом уровне все цепочки всех
+        досок луча оцениваются пакетно, ценность пути —
+            sum_k discount^k * оценка(k-го хода),
+        и дальше идут только width лучших путей (доски-дубликаты по
+        Zobrist-хэшу схлопываются). Ход применяется Simulator2248 (слияние
+        и падение, без спавна). Тупик до конца глубины — минус
+        dead_end_penalty (со скидкой уровня).
+
+        Возвращает (principal variation — список цепочек, его ценность);
+        первый ход — pv[0]. root_filter(chain) -> False исключает ход в корне.
+        """
+        board = self.clone_board(board if board is not None else self.gl.packed_board())
+        beam = [(0.0, board, [])]
+        best_value, best_pv = float("-inf"), []
+
+        for ply in range(depth):
+            weight = discount ** ply
+            children = []
+            for value, node, pv in beam:
+                chains = self.find_all_chains_on_board(node)
+                if ply == 0 and root_filter is not None:
+                    chains = [ch for ch in chains if root_filter(ch)]
+                if not chains:
+                    if ply and value - weight * dead_end_penalty > best_value:
+                        best_value, best_pv = value - weight * dead_end_penalty, pv
+                    continue
+                scores = self.score_chains_on_board(chains, node, scorer)
+                children.extend(
+                    (value + weight * score, node, chain, pv)
+                    for score, chain in zip(scores, chains)
+                )
+            if not children:
+                beam = []
+                break
+
+            # применяем ходы только тем, кто попадает в луч
+            children.sort(key=lambda item: item[0], reverse=True)
+            beam = []
+            seen = set()
+            for value, node, chain, pv in children:
+                after = self.simulate_chain_on_board(node, chain)
+                if after.hash in seen:
+                    continue
+                seen.add(after.hash)
+                beam.append((value, after, pv + [chain]))
+                if len(beam) >= width:
+                    break
+
+        for value, _, pv in beam:
+            if value > best_value:
+                best_value, best_pv = value, pv
+        if not best_pv:
+            return [], -dead_end_penalty
+        return best_pv, best_value
+
+
+class BeamPolicy(SmartPolicy):
+    """Политика для Simulator2248/benchmark_2248: ход — первый в PV beam-поиска."""
+
+    def __init__(self, optimal_lengths, beam_config=None, sim_config=None, **kwargs):
+        from heuristics_2248 import Heuristics2248
+
+        super().__init__(optimal_lengths, **kwargs)
+        heur = Heuristics2248(None)
+        heur.verbose = False
+        self.params = beam_params({"beam": beam_config or {}})
+        self.lookahead = Lookahead2248(self, heur, Simulator2248.from_config(sim_config))
+
+    def __call__(self, board: PackedBoard):
+        pv, _ = self.lookahead.beam_search(board, **self.params)
+        return pv[0] if pv else None
@@ -0,0 +1,383 @@
+# mcts_2248.py
+"""
+MCTS-поиск хода на PackedBoard.
+
+Дерево:
+  узел  — доска (после спавна), рёбра — цепочки-кандидаты;
+  в корне кандидаты — лучшие root_candidates цепочек по
+  evaluate_chain_smart (порядок = приоритет первого посещения),
+  во внутренних узлах — лучшие branching по Heuristics2248;
+  спавн после хода семплируется при спуске, разные исходы — разные
+  дети ребра (ключ — Zobrist-хэш доски).
+
+Выбор ребра — UCT:
+    Q(a) + exploration * sqrt(ln N / n(a)),
+где Q — средний возврат, нормированный в [0, 1] по min/max уже виденных.
+Возврат — очки по пути в дереве + очки жадного rollout'а
+(rollout_depth ходов, на каждом — лучшая цепочка по весам Heuristics2248;
+тупик — минус dead_end_penalty).
+
+Rollout'ы считаются пачками по batch_size в пуле из workers процессов
+(виртуальная потеря: посещение ребра засчитывается при спуске, возврат —
+когда пачка посчитана). workers=0 — всё в текущем процессе.
+Бюджет — iterations rollout'ов и/или time_limit секунд; итог — ребро корня
+с наибольшим числом посещений.
+
+Перебор и оценка цепочек в корне берутся у game_logic: нужны
+find_all_chains(board) и evaluate_chains(chains, board) (пакетная
+evaluate_chain_smart) — это GameLogic или SmartPolicy.
+"""
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from board_engine import PackedBoard, chain_to_indices, indices_to_chain
+from find_all_chains import enumerate_chains
+from heuristics_2248 import Heuristics2248
+from simulator_2248 import Simulator2248, SmartPolicy
+
+DEFAULT_MCTS = {
+    "iterations": 400,
+    "time_limit": 0.5,
+    "workers": None,  # None — все ядра, кроме одного (ADB-цикл)
+    "batch_size": None,  # None — 2 rollout'а на процесс
+    "exploration": 1.4,
+    "root_candidates": 12,
+    "branching": 6,
+    "max_tree_depth": 4,
+    "rollout_depth": 6,
+    "rollout_max_paths": 500,
+    "rollout_max_length": 5,
+    "rollout_candidates": 12,
+    "dead_end_penalty": 2000.0,
+    "weights_path": "heuristics_weights.json",
+    "seed": None,
+}
+
+
+class GreedyRollout:
+    """
+    Жадная партия на rollout_depth ходов: на каждом ходу лучшая цепочка
+    по Heuristics2248 среди урезанного перебора (max_paths, max_length);
+    оцениваются только первые candidates цепочек (самые длинные).
+    """
+
+    def __init__(
+        self,
+        sim_config: Optional[dict] = None,
+        weights_path: str = "heuristics_weights.json",
+        depth: int = 6,
+        max_paths: int = 500,
+        max_length: Optional[int] = 5,
+        candidates: int = 12,
+        dead_end_penalty: float = 2000.0,
+    ):
+        self.sim = Simulator2248.from_config(sim_config)
+        self.heur = Heuristics2248(None, weights_path)
+        self.heur.verbose = False
+        self.depth = depth
+        self.max_paths = max_paths
+        self.max_length = max_length
+        self.candidates = candidates
+        self.dead_end_penalty = dead_end_penalty
+
+    def best_chain(self, board: PackedBoard) -> Optional[Tuple[int, ...]]:
+        chains = enumerate_chains(board.cells, self.max_paths, self.max_length)
+        chains = chains[: self.candidates]
+        if not chains:
+            return None
+        scores = self.heur.evaluate_batch([indices_to_chain(ch) for ch in chains], board)
+        return chains[scores.index(max(scores))]
+
+    def __call__(self, task: Tuple[bytes, int]) -> float:
+        """task = (клетки доски до спавна, сид) -> набранные очки"""
+        cells, seed = task
+        self.sim.rng.seed(seed)
+        board = self.sim.spawn(PackedBoard(cells))
+        total = 0.0
+        for _ in range(self.depth):
+            chain = self.best_chain(board)
+            if chain is None:
+                return total - self.dead_end_penalty
+            board, gained = self.sim.step(board, chain)
+            total += gained
+        return total
+
+
+# Rollout воркера создаётся один раз через initializer пула
+_worker_rollout: Optional[GreedyRollout] = None
+
+
+def _init_worker(rollout_params: dict) -> None:
+    global _worker_rollout
+    _worker_rollout = GreedyRollout(**rollout_params)
+
+
+def _run_rollout(task: Tuple[bytes, int]) -> float:
+    return _worker_rollout(task)
+
+
+class _Node:
+    """Доска + статистика рёбер (moves[i] = (chain, indices))."""
+
+    __slots__ = ("board", "moves", "visits", "value", "children", "total_visits")
+
+    def __init__(self, board: PackedBoard):
+        self.board = board
+        self.moves: Optional[List[Tuple[list, List[int]]]] = None
+        self.visits: List[int] = []
+        self.value: List[float] = []
+        self.children: List[Dict[int, "_Node"]] = []
+        self.total_visits = 0
+
+    def set_moves(self, chains: List[list]) -> None:
+        self.moves = [(chain, chain_to_indices(chain)) for chain in chains]
+        self.visits = [0] * len(chains)
+        self.value = [0.0] * len(chains)
+        self.children = [{} for _ in chains]
+
+
+class MCTS2248:
+    def __init__(
+        self,
+        game_logic,
+        simulator: Optional[Simulator2248] = None,
+        sim_config: Optional[dict] = None,
+        iterations: Optional[int] = 400,
+        time_limit: Optional[float] = 0.5,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        exploration: float = 1.4,
+        root_candidates: int = 12,
+        branching: int = 6,
+        max_tree_depth: int = 4,
+        rollout_depth: int = 6,
+        rollout_max_paths: int = 500,
+        rollout_max_length: Optional[int] = 5,
+        rollout_candidates: int = 12,
+        dead_end_penalty: float = 2000.0,
+        weights_path: str = "heuristics_weights.json",
+        seed=None,
+    ):
+        if not iterations and not time_limit:
+            raise ValueError("MCTS2248: нужен iterations или time_limit")
+        self.gl = game_logic
+        if sim_config is None:
+            sim_config = getattr(game_logic, "config", None) or {}
+        # спавн при спуске по дереву — от сида, как и сиды rollout'ов
+        self.sim = simulator or Simulator2248.from_config(sim_config, seed=seed)
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.workers = max(0, (os.cpu_count() or 1) - 1) if workers is None else workers
+        self.batch_size = batch_size or max(1, 2 * self.workers)
+        self.exploration = exploration
+        self.root_candidates = root_candidates
+        self.branching = branching
+        self.max_tree_depth = max_tree_depth
+        self.rng = random.Random(seed)
+
+        self.rollout_params = {
+            "sim_config": sim_config,
+            "weights_path": weights_path,
+            "depth": rollout_depth,
+            "max_paths": rollout_max_paths,
+            "max_length": rollout_max_length,
+            "candidates": rollout_candidates,
+            "dead_end_penalty": dead_end_penalty,
+        }
+        # та же жадная политика в главном процессе: ранжирование внутренних
+        # узлов и rollout'ы при workers=0
+        self.rollout = GreedyRollout(**self.rollout_params)
+        self.dead_end_penalty = dead_end_penalty
+        self._pool = None
+
+        self.simulations = 0
+        self.root_stats: List[dict] = []
+        # min/max виденных возвратов — для нормировки Q
+        self._lo: Optional[float] = None
+        self._hi: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, game_logic, config: Optional[dict] = None, simulator=None):
+        """Настройки из config["mcts"] поверх DEFAULT_MCTS."""
+        params = dict(DEFAULT_MCTS)
+        if config:
+            params.update(config.get("mcts", {}))
+        return cls(game_logic, simulator, config, **params)
+
+    # ===== Пул =====
+
+    def _map(self, tasks: List[Tuple[bytes, int]]) -> List[float]:
+        if not self.workers:
+            return [self.rollout(task) for task in tasks]
+        if self._pool is None:
+            self._pool = Pool(
+                self.workers, initializer=_init_worker, initargs=(self.rollout_params,)
+            )
+        return self._pool.map(_run_rollout, tasks)
+
+    def close(self) -> None:
+        """Остановить пул rollout'ов (создаётся заново при следующем поиске)."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    # ===== Поиск =====
+
+    def search(
+        self, board: PackedBoard, root_filter: Optional[Callable[[list], bool]] = None
+    ) -> Tuple[Optional[list], List[dict]]:
+        """
+        Лучшая цепочка [(r, c), ...] и статистика корня:
+        [{"chain", "visits", "mean"}, ...] по убыванию посещений.
+        root_filter(chain) -> False исключает ход в корне (блэклист).
+        """
+        chains = [
+            chain
+            for chain in self.gl.find_all_chains(board)
+            if root_filter is None or root_filter(chain)
+        ]
+        ranked = sorted(
+            zip(self.gl.evaluate_chains(chains, board), chains),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        self.simulations = 0
+        self.root_stats = []
+        if not ranked:
+            return None, []
+
+        root = _Node(board)
+        root.set_moves([chain for _, chain in ranked[: self.root_candidates]])
+        if len(root.moves) > 1:
+            self._run(root)
+
+        self.root_stats = sorted(
+            (
+                {
+                    "chain": chain,
+                    "visits": root.visits[a],
+                    "mean": root.value[a] / root.visits[a] if root.visits[a] else 0.0,
+                }
+                for a, (chain, _) in enumerate(root.moves)
+            ),
+            key=lambda st: st["visits"],
+            reverse=True,
+        )
+        return self.root_stats[0]["chain"], self.root_stats
+
+    def _run(self, root: _Node) -> None:
+        deadline = (
+            time.perf_counter() + self.time_limit if self.time_limit else None
+        )
+        self._lo = self._hi = None
+        while True:
+            if self.iterations and self.simulations >= self.iterations:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            size = self.batch_size
+            if self.iterations:
+                size = min(size, self.iterations - self.simulations)
+
+            paths, tasks, gains = [], [], []
+            for _ in range(size):
+                path, leaf, gained = self._descend(root)
+                paths.append(path)
+                gains.append(gained)
+                if leaf is None:
+                    tasks.append(None)
+                else:
+                    tasks.append((leaf.cells, self.rng.getrandbits(32)))
+
+            results = self._map([t for t in tasks if t is not None])
+            results.reverse()
+            for path, task, gained in zip(paths, tasks, gains):
+                if task is None:
+                    self._backup(path, gained - self.dead_end_penalty)
+                else:
+                    self._backup(path, gained + results.pop())
+            self.simulations += size
+
+    def _descend(self, root: _Node):
+        """
+        Спуск по UCT до нового ребра. Посещения засчитываются сразу
+        (виртуальная потеря). -> (путь, доска для rollout'а или None, очки)
+        """
+        node = root
+        path = []
+        gained_total = 0.0
+        for depth in range(self.max_tree_depth):
+            if node.moves is None:
+                node.set_moves(self._inner_chains(node.board))
+            if not node.moves:
+                return path, None, gained_total
+
+            a = self._select(node)
+            path.append((node, a))
+            node.visits[a] += 1
+            node.total_visits += 1
+
+            after, gained = self.sim.apply_chain(node.board, node.moves[a][1])
+            gained_total += gained
+            if node.visits[a] == 1 or depth == self.max_tree_depth - 1:
+                return path, after, gained_total
+
+            child = self.sim.spawn(after)
+            node = node.children[a].setdefault(child.hash, _Node(child))
+        return path, node.board, gained_total
+
+    def _select(self, node: _Node) -> int:
+        # непосещённые рёбра — по порядку приоритета
+        for a, n in enumerate(node.visits):
+            if n == 0:
+                return a
+        lo = self._lo or 0.0
+        span = ((self._hi or 0.0) - lo) or 1.0
+        log_n = math.log(node.total_visits)
+        best_a, best_u = 0, float("-inf")
+        for a, n in enumerate(node.visits):
+            q = (node.value[a] / n - lo) / span
+            u = q + self.exploration * math.sqrt(log_n / n)
+            if u > best_u:
+                best_a, best_u = a, u
+        return best_a
+
+    def _backup(self, path, ret: float) -> None:
+        if self._lo is None:
+            self._lo = self._hi = ret
+        else:
+            self._lo = min(self._lo, ret)
+            self._hi = max(self._hi, ret)
+        for node, a in path:
+            node.value[a] += ret
+
+    def _inner_chains(self, board: PackedBoard) -> List[list]:
+        """Лучшие branching цепочек внутреннего узла по Heuristics2248."""
+        chains = [
+            indices_to_chain(chain)
+            for chain in enumerate_chains(
+                board.cells, self.rollout.max_paths, self.rollout.max_length
+            )
+        ]
+        scores = self.rollout.heur.evaluate_batch(chains, board)
+        order = sorted(range(len(chains)), key=lambda k: scores[k], reverse=True)
+        return [chains[k] for k in order[: self.branching]]
+
+
+class MCTSPolicy(SmartPolicy):
+    """Политика для Simulator2248/benchmark_2248: ход выбирает MCTS2248."""
+
+    def __init__(self, optimal_lengths, mcts_config=None, sim_config=None, **kwargs):
+        super().__init__(optimal_lengths, **kwargs)
+        self.engine = MCTS2248.from_config(
+            self, dict(sim_config or {}, mcts=mcts_config or {})
+        )
+
+    def __call__(self, board: PackedBoard):
+        chain, _ = self.engine.search(board)
+        return chain
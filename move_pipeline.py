@@ -0,0 +1,260 @@
+# move_pipeline.py
+"""
+Асинхронный конвейер ходов: захват, распознавание, поиск и ввод внахлёст.
+
+run_auto_game делает всё строго по очереди: скриншот, распознавание,
+поиск, свайп, второй скриншот для проверки конца игры, пауза. Здесь
+те же шаги разложены по стадиям asyncio, связанным очередями размера 1:
+
+    capture --frames--> decide --moves--> input
+       ^                                    |
+       +------------- settled --------------+
+
+- capture: ждёт, пока доска успокоится после свайпа (SettleDetector
+  по всему экрану), и берёт последний кадр ожидания — он же идёт и на
+  проверку win/lose, и на клетки (отдельных скриншотов на ход нет);
+- decide: проверка конца игры, распознавание и поиск хода — в отдельном
+  однопоточном executor'е (GameLogic не потокобезопасен, а так все его
+  вызовы идут строго по очереди и не держат цикл событий);
+- input: свайп, затем спекуляция: доска после хода предсказывается
+  симулятором (слияние + падение, без спавна), и поиск по ней идёт,
+  пока на экране играет анимация. Если распознанная следующая доска
+  совпадает с предсказанной во всех предсказанных непустых клетках
+  (новые тайлы появляются только в пустых), ход берётся готовым.
+
+Включается config["move_pipeline"] = "async"; ожидание анимации —
+config["settle"], спекуляция — config["pipeline_speculate"].
+Метрика — ходов в минуту на устройство (stats()["moves_per_minute"]).
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from board_engine import PackedBoard, chain_to_indices
+from board_printer import print_board
+from find_best_chain_smart import chain_move_key
+from frame_pipeline import Frame, slice_cells
+from settle_detector import SettleDetector
+from simulator_2248 import Simulator2248
+
+
+class Move(NamedTuple):
+    """Решение стадии decide для стадии input."""
+    board_hash: int
+    board: PackedBoard
+    rows: list  # снимок gl.board для лога свайпа
+    chain: Optional[list]
+
+
+def prediction_holds(predicted: PackedBoard, actual: PackedBoard) -> bool:
+    """Все непустые клетки предсказания на месте (спавн — только в пустые)."""
+    return all(p == 0 or p == a for p, a in zip(predicted.cells, actual.cells))
+
+
+class MovePipeline:
+    def __init__(self, runner, settle: Optional[SettleDetector] = None, speculate=None, pad: int = 150):
+        """
+        runner — GameRunner: его screen_processor, game_logic, end_handler,
+        input и шаги хода (_register_attempt, _plan_chain_move, _on_chain_done).
+        settle — ожидание анимации; по умолчанию по всему экрану из config["settle"].
+        """
+        self.runner = runner
+        self.gl = runner.game_logic
+        self.config = runner.config
+        self.settle = settle or SettleDetector.from_config(
+            runner.screen_processor, self.config, region="screen"
+        )
+        self.speculate = bool(
+            self.config.get("pipeline_speculate", True) if speculate is None else speculate
+        )
+        self.pad = pad
+        self.sim = Simulator2248.from_config(self.config)
+        self.device = self.config.get("adb_serial") or "default"
+
+        self.moves = 0
+        self.restarts = 0
+        self.speculative_hits = 0
+        self.speculative_misses = 0
+        self.elapsed = 0.0
+
+    # ===== Запуск =====
+
+    async def run(self, max_moves: int = 100) -> dict:
+        """Сыграть до max_moves кадров (как итерации run_auto_game). -> stats()."""
+        loop = asyncio.get_running_loop()
+        self._io = ThreadPoolExecutor(2, thread_name_prefix="pipeline-io")
+        self._logic = ThreadPoolExecutor(1, thread_name_prefix="pipeline-logic")
+        self._frames: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._moves: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._settled = asyncio.Event()
+        self._settled.set()
+        self._stopped = False
+        self._speculation = None
+        self._ready_frame = None  # кадр, на котором экран успокоился
+
+        started = time.perf_counter()
+        tasks = [
+            loop.create_task(self._capture_stage(max_moves)),
+            loop.create_task(self._decide_stage()),
+            loop.create_task(self._input_stage()),
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()  # исключение стадии — наружу
+        finally:
+            self.elapsed += time.perf_counter() - started
+            self._io.shutdown(wait=False)
+            self._logic.shutdown(wait=True)
+
+        stats = self.stats()
+        print(
+            f"[PIPELINE] {self.device}: {stats['moves']} ходов за {stats['elapsed']:.1f}с "
+            f"— {stats['moves_per_minute']:.1f} ходов/мин, спекуляция "
+            f"{self.speculative_hits}/{self.speculative_hits + self.speculative_misses}"
+        )
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "device": self.device,
+            "moves": self.moves,
+            "restarts": self.restarts,
+            "elapsed": self.elapsed,
+            "moves_per_minute": 60.0 * self.moves / self.elapsed if self.elapsed else 0.0,
+            "speculative_hits": self.speculative_hits,
+            "speculative_misses": self.speculative_misses,
+        }
+
+    def _in_io(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    def _in_logic(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._logic, fn, *args)
+
+    def _finish(self) -> None:
+        """Остановить конвейер: capture увидит флаг и закроет очереди."""
+        self._stopped = True
+        self._settled.set()
+
+    # ===== Стадии =====
+
+    async def _capture_stage(self, max_moves: int) -> None:
+        for move in range(1, max_moves + 1):
+            await self._settled.wait()
+            self._settled.clear()
+            if self._stopped or self.runner._stop_requested:
+                break
+            print(f"\n🎯 Ход #{move}/{max_moves}")
+            img, self._ready_frame = self._ready_frame, None
+            if img is None:
+                img = await self._in_io(self.runner.screen_processor.grab_screen_cv2)
+            if img is None:
+                print("❌ Не удалось получить скриншот")
+                break
+            await self._frames.put(img)
+        else:
+            # последний ход должен доиграть, прежде чем закрывать очередь
+            await self._settled.wait()
+        self._stopped = True
+        await self._frames.put(None)
+
+    async def _decide_stage(self) -> None:
+        gl = self.gl
+        while True:
+            img = await self._frames.get()
+            if img is None:
+                break
+
+            label = await self._in_logic(self.runner.end_handler.classify_image, img)
+            if label in ("win", "lose"):
+                print(f"🏁 Обнаружен конец игры: {label}, перезапускаю...")
+                await self._in_io(self.runner.end_handler._tap_restart)
+                gl.current_move_attempts = 0
+                gl.last_move_hash = None
+                self._speculation = None
+                self.restarts += 1
+                self._settled.set()
+                continue
+
+            frame = Frame(img, slice_cells(img, self.config["grid"], self.pad))
+            board, confidence_board = await self._in_logic(
+                gl.recognize_board_with_confidence, frame
+            )
+            if board is None:
+                print("❌ Не удалось распознать доску")
+                self._finish()
+                break
+            if gl.show_board_each_move:
+                print_board(board, confidence_board)
+            await self._in_logic(gl.on_new_board)
+
+            packed = gl.packed_board()
+            board_before = packed.hash
+            self.runner._register_attempt(board_before)
+            chain = await self._decide_chain(board_before, packed)
+            await self._moves.put(Move(board_before, packed, [row[:] for row in gl.board], chain))
+
+        await self._moves.put(None)
+
+    async def _decide_chain(self, board_hash: int, packed: PackedBoard):
+        """Готовый спекулятивный ход, если предсказание сбылось, иначе поиск."""
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None:
+            predicted, pending = speculation
+            chain = await pending
+            if (
+                chain
+                and prediction_holds(predicted, packed)
+                and not self.gl.is_move_blacklisted(board_hash, chain_move_key(chain))
+            ):
+                self.speculative_hits += 1
+                print("[PIPELINE] Ход посчитан заранее, пока шла анимация")
+                self.gl.last_ranking = None  # оценка — уже по настоящей доске
+                return chain
+            self.speculative_misses += 1
+        return await self._in_logic(self.gl.find_best_chain_smart, board_hash, packed)
+
+    async def _input_stage(self) -> None:
+        runner = self.runner
+        while True:
+            move = await self._moves.get()
+            if move is None:
+                break
+
+            if move.chain:
+                chain_score = runner._plan_chain_move(move.chain)
+                ok = await self._in_io(
+                    runner.input.perform_chain_swipe_mt,
+                    self.config, move.chain, move.rows, 1,
+                )
+                if not ok:
+                    print("❌ Ошибка выполнения хода (MT)")
+                    self._finish()
+                    break
+                runner._on_chain_done(move.board_hash, chain_score)
+                self._speculate(move.board, move.chain)
+            else:
+                print("⚠️ Цепочки не найдены! Пробую короткий осмысленный ход...")
+                ok = await self._in_logic(runner._execute_fallback_move, move.board_hash)
+                if not ok:
+                    self._finish()
+                    break
+
+            self.moves += 1
+            await self._in_io(self.settle.wait)
+            self._ready_frame = self.settle.last_frame
+            self._settled.set()
+
+    def _speculate(self, board: PackedBoard, chain) -> None:
+        """Поиск по предсказанной доске — пока играет анимация свайпа."""
+        if not self.speculate:
+            return
+        predicted, _ = self.sim.apply_chain(board, chain_to_indices(chain))
+        pending = self._in_logic(
+            self.gl.find_best_chain_smart, predicted.hash, predicted, False
+        )
+        self._speculation = (predicted, pending)
@@ -0,0 +1,221 @@
+# order_tournament.py
+"""
+Турнир порядков длин из optimal_orders.json на офлайн-симуляторе.
+
+Все 40 320 перестановок BASE_LENGTHS по одной реальной партии не проверить,
+поэтому играем их на Simulator2248 в пуле процессов и отсеиваем слабые
+методом successive halving:
+  раунд 0 — каждый порядок играет --games партий;
+  после раунда остаётся лучшая 1/eta часть (по среднему счёту за все
+  сыгранные партии), а число новых партий на порядок растёт в eta раз;
+  так до одного порядка (или --min-candidates).
+
+Все порядки играют одни и те же сиды, так что сравнение честное.
+Итог пишется в optimal_orders.json:
+  "sim_stats"   — {индекс: {games, total_score, avg_score, avg_max_tile, round}}
+  "sim_ranking" — индексы порядков, от лучшего к худшему (дошедшие дальше — выше)
+Реальная статистика "stats" (из GameRunner.update_order_stats) не трогается.
+
+Пример:
+    python order_tournament.py --games 4 --eta 3 --workers 8 --set-current
+"""
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import constants as const
+from simulator_2248 import Simulator2248, SmartPolicy
+
+# Настройки симулятора передаются в воркеры один раз через initializer
+_worker_sim_config: dict = {}
+_worker_max_moves: int = 300
+
+
+def _init_worker(sim_config: dict, max_moves: int) -> None:
+    global _worker_sim_config, _worker_max_moves
+    _worker_sim_config = sim_config
+    _worker_max_moves = max_moves
+
+
+def _play_order(task: Tuple[int, List[int], List[int]]) -> Tuple[int, List[int], List[int]]:
+    """Воркер: сыграть партии одним порядком. -> (индекс, очки, макс. тайлы)"""
+    index, order, seeds = task
+    policy = SmartPolicy(order)
+    scores = []
+    tiles = []
+    for seed in seeds:
+        sim = Simulator2248.from_config(_worker_sim_config, seed=seed)
+        result = sim.play_game(policy, max_moves=_worker_max_moves)
+        scores.append(result.score)
+        tiles.append(result.max_tile)
+    return index, scores, tiles
+
+
+def successive_halving(
+    orders: List[List[int]],
+    candidates: List[int],
+    games: int,
+    eta: int,
+    seed: int,
+    workers: int,
+    sim_config: dict,
+    max_moves: int,
+    min_candidates: int = 1,
+    on_round=None,
+) -> Dict[int, dict]:
+    """
+    Возвращает статистику по всем сыгравшим порядкам:
+    {index: {"games", "total_score", "total_max_tile", "round"}}.
+    on_round(round_no, stats, survivors) вызывается после каждого раунда.
+    """
+    stats: Dict[int, dict] = {
+        i: {"games": 0, "total_score": 0, "total_max_tile": 0, "round": 0}
+        for i in candidates
+    }
+    survivors = list(candidates)
+    played_seeds = 0
+    games_this_round = games
+    round_no = 0
+
+    with Pool(workers, initializer=_init_worker, initargs=(sim_config, max_moves)) as pool:
+        while survivors:
+            seeds = list(range(seed + played_seeds, seed + played_seeds + games_this_round))
+            tasks = [(i, orders[i], seeds) for i in survivors]
+            chunksize = max(1, len(tasks) // (workers * 8))
+
+            started = time.perf_counter()
+            for done, (index, scores, tiles) in enumerate(
+                pool.imap_unordered(_play_order, tasks, chunksize=chunksize), 1
+            ):
+                st = stats[index]
+                st["games"] += len(scores)
+                st["total_score"] += sum(scores)
+                st["total_max_tile"] += sum(tiles)
+                st["round"] = round_no
+                if done % 1000 == 0:
+                    print(f"   [TOUR] раунд {round_no}: {done}/{len(tasks)}")
+            elapsed = time.perf_counter() - started
+
+            played_seeds += games_this_round
+            survivors.sort(
+                key=lambda i: stats[i]["total_score"] / stats[i]["games"], reverse=True
+            )
+            best = survivors[0]
+            print(
+                f"[TOUR] раунд {round_no}: {len(survivors)} порядков x "
+                f"{games_this_round} партий за {elapsed:.1f} с, лучший #{best} "
+                f"{orders[best]} avg={stats[best]['total_score'] / stats[best]['games']:.1f}"
+            )
+
+            survivors = survivors[: max(min_candidates, len(survivors) // eta)]
+            if on_round:
+                on_round(round_no, stats, survivors)
+            if len(survivors) <= min_candidates:
+                break
+            games_this_round *= eta
+            round_no += 1
+
+    return stats
+
+
+def write_results(data: dict, stats: Dict[int, dict], set_current: bool) -> List[int]:
+    """Сохранить sim_stats и sim_ranking в optimal_orders.json."""
+    ranking = sorted(
+        stats,
+        key=lambda i: (stats[i]["round"], stats[i]["total_score"] / max(1, stats[i]["games"])),
+        reverse=True,
+    )
+    sim_stats = data.setdefault("sim_stats", {})
+    for i, st in stats.items():
+        g = max(1, st["games"])
+        sim_stats[str(i)] = {
+            "games": st["games"],
+            "total_score": st["total_score"],
+            "avg_score": round(st["total_score"] / g, 2),
+            "avg_max_tile": round(st["total_max_tile"] / g, 2),
+            "round": st["round"],
+        }
+    data["sim_ranking"] = ranking
+    if set_current and ranking:
+        data["current_index"] = ranking[0]
+
+    tmp = const.ORDERS_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, const.ORDERS_FILE)
+    return ranking
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Турнир порядков длин 2248")
+    parser.add_argument("--games", type=int, default=4, help="партий на порядок в 1-м раунде")
+    parser.add_argument("--eta", type=int, default=3, help="во сколько раз режем поле за раунд")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=2248)
+    parser.add_argument("--max-moves", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=None, help="взять только первые N порядков")
+    parser.add_argument("--min-candidates", type=int, default=1)
+    parser.add_argument("--set-current", action="store_true",
+                        help="сделать победителя current_index")
+    args = parser.parse_args(argv)
+    if args.eta < 2:
+        # eta = 1 не режет поле, и раунды с растущим числом партий не кончаются
+        parser.error("--eta должно быть не меньше 2")
+
+    if not const.ORDERS_FILE.exists():
+        print(f"❌ {const.ORDERS_FILE} не найден — сначала запусти generate_orders.py")
+        return 1
+    data = json.loads(const.ORDERS_FILE.read_text(encoding="utf-8"))
+    orders = data.get("orders", [])
+    if not orders:
+        print("❌ В JSON нет orders")
+        return 1
+
+    candidates = list(range(len(orders)))[: args.limit]
+    sim_config = {}
+    if const.CONFIG_FILE.exists():
+        try:
+            sim_config = json.loads(const.CONFIG_FILE.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            pass
+
+    print(
+        f"[TOUR] {len(candidates)} порядков, {args.workers} процессов, "
+        f"{args.games} партий в 1-м раунде, eta={args.eta}"
+    )
+
+    # промежуточные итоги пишем после каждого раунда — длинный прогон не пропадёт
+    def checkpoint(round_no, stats, survivors):
+        write_results(data, stats, set_current=False)
+
+    stats = successive_halving(
+        orders,
+        candidates,
+        args.games,
+        args.eta,
+        args.seed,
+        args.workers,
+        sim_config,
+        args.max_moves,
+        args.min_candidates,
+        on_round=checkpoint,
+    )
+    ranking = write_results(data, stats, args.set_current)
+
+    print("\n[TOUR] Топ-10:")
+    for place, i in enumerate(ranking[:10], 1):
+        st = data["sim_stats"][str(i)]
+        print(
+            f"  {place:2d}. #{i} {orders[i]} avg={st['avg_score']} "
+            f"max_tile={st['avg_max_tile']} games={st['games']}"
+        )
+    print(f"✅ Результаты записаны в {const.ORDERS_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
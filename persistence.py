@@ -0,0 +1,155 @@
+# persistence.py
+"""
+Отложенная запись JSON-файлов (write-behind) для ходового цикла.
+
+Раньше каждый save_* синхронно переписывал целый JSON прямо в цикле
+ходов. Теперь:
+- владелец файла один раз регистрирует его: register(path, producer),
+  producer() -> данные для json.dump;
+- save_* только помечает файл грязным: mark_dirty(path) — O(1);
+- фоновый поток сбрасывает грязные файлы пачкой раз в interval секунд
+  или сразу, когда пометок набралось max_pending;
+- запись атомарная: временный файл рядом + os.replace, при обрыве
+  остаётся либо старый, либо новый файл целиком;
+- flush() — синхронный сброс (выход, SIGINT); close() регистрируется
+  в atexit, так что sys.exit() из обработчика сигнала тоже всё сбросит.
+
+producer вызывается в фоновом потоке. Если данные поменялись прямо во
+время сериализации (RuntimeError: dict changed size...), файл остаётся
+грязным и пишется на следующем тике.
+"""
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+DEFAULT_FLUSH_INTERVAL = 2.0  # с
+DEFAULT_MAX_PENDING = 20  # пометок до внеочередного сброса
+
+
+class _Entry:
+    def __init__(self, path: Path, producer: Callable, indent, default):
+        self.path = path
+        self.producer = producer
+        self.indent = indent
+        self.default = default
+
+
+def atomic_write_json(path: Path, data, indent=2, default=None) -> None:
+    """json.dump во временный файл рядом и os.replace поверх path."""
+    text = json.dumps(data, ensure_ascii=False, indent=indent, default=default)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class WriteBehindStore:
+    def __init__(
+        self,
+        interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.entries: Dict[Path, _Entry] = {}
+        self.dirty: Dict[Path, int] = {}  # путь -> пометок с прошлого сброса
+        self.writes = 0
+        self.marks = 0
+
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()  # один сброс за раз
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ===== Регистрация и пометки =====
+
+    def register(
+        self,
+        path: Union[str, Path],
+        producer: Callable,
+        indent: Optional[int] = 2,
+        default: Optional[Callable] = None,
+    ) -> None:
+        """Файл path пишется из producer() (повторная регистрация заменяет)."""
+        path = Path(path)
+        with self._lock:
+            self.entries[path] = _Entry(path, producer, indent, default)
+
+    def mark_dirty(self, path: Union[str, Path]) -> None:
+        """Файл поменялся — записать при ближайшем сбросе."""
+        path = Path(path)
+        with self._lock:
+            self.dirty[path] = self.dirty.get(path, 0) + 1
+            self.marks += 1
+            pending = sum(self.dirty.values())
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    # ===== Сброс =====
+
+    def flush(self) -> int:
+        """Записать все грязные файлы сейчас. -> сколько записано."""
+        with self._io_lock:
+            with self._lock:
+                dirty, self.dirty = self.dirty, {}
+            written = 0
+            for path, count in dirty.items():
+                entry = self.entries.get(path)
+                if entry is None:
+                    continue
+                try:
+                    atomic_write_json(path, entry.producer(), entry.indent, entry.default)
+                    written += 1
+                except RuntimeError:
+                    # данные менялись во время сериализации — следующим тиком
+                    with self._lock:
+                        self.dirty[path] = self.dirty.get(path, 0) + count
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"[PERSIST] Не удалось записать {path}: {e}")
+            self.writes += written
+            return written
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None or self._stop.is_set():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self.dirty:
+                self.flush()
+
+    def close(self) -> None:
+        """Остановить фоновый поток и сбросить всё (выход, SIGINT)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self.entries),
+            "marks": self.marks,
+            "writes": self.writes,
+            "dirty": len(self.dirty),
+        }
+
+
+# Общее хранилище процесса: ConfigManager, GoodMovesManager, статистика
+store = WriteBehindStore()
+atexit.register(store.close)
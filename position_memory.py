@@ -1,50 +1,275 @@
 # position_memory.py
-from typing import Set
-from pathlib import Path
+"""
+Память позиций по Zobrist-хэшу — бинарное хранилище, заодно корпус досок
+(для каждой позиции — её упакованное содержимое, 20 байт показателей,
+чтобы build_best_moves мог восстановить доску по хэшу).
+
+Два файла:
+  seen_positions.dat — сжатый массив, отсортированный по хэшу:
+      заголовок 32 байта (MAGIC, count, байт фильтра Блума, k),
+      count x uint64 хэшей (little-endian, по возрастанию),
+      count x 20 байт клеток,
+      биты фильтра Блума;
+    открывается через mmap, поиск — np.searchsorted, старт не зависит
+    от числа позиций;
+  seen_positions.log — журнал новых позиций, только дописывается:
+      записи по 28 байт (uint64 хэш + 20 байт клеток);
+    вставка — одна запись в конец файла, без перезаписи истории.
+
+Клетки NO_BOARD (0xFF...) — хэш без содержимого доски (из старого
+seen_boards.json). Когда журнал дорастает до порога (compact_every,
+но не меньше 1/8 массива), он сливается со сжатым массивом в новый файл
+(через временный файл) и обнуляется. Перед поиском в массиве — фильтр Блума: для новых
+позиций (почти каждый ход) бинарный поиск по mmap не нужен.
+
+Старый seen_boards.json импортируется один раз при первом запуске.
+"""
 import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
 
+from board_engine import CELL_COUNT, PackedBoard
+
+SEEN_POSITIONS_FILE = Path("seen_positions.dat")
+# старый формат: {"seen_hashes": [...], "boards": {...}} — только импорт
 SEEN_BOARDS_FILE = Path("seen_boards.json")
 
+MAGIC = b"POS2248\x01"
+_HEADER = struct.Struct("<8sQQQ")  # MAGIC, count, байт фильтра Блума, k
+_RECORD = struct.Struct(f"<Q{CELL_COUNT}s")
+NO_BOARD = b"\xff" * CELL_COUNT
 
-class PositionMemory:
+
+class BloomFilter:
     """
-    Память позиций по Zobrist-хэшу в JSON.
-    Формат файла:
-    {
-      "seen_hashes": ["0000ab12...", "00ff34..."]
-    }
+    Фильтр Блума по 64-битным Zobrist-хэшам. Хэши и так равномерны,
+    поэтому k позиций берутся двойным хэшированием из двух половин хэша.
+    Биты строятся при сжатии и лежат в том же файле (mmap) — на старте
+    ничего не пересчитывается.
     """
 
-    def __init__(self) -> None:
-        self.seen_hashes: Set[int] = set()
-        self._load_from_file()
+    def __init__(self, bits, k: int):
+        self.bits = bits  # упакованные биты (little-endian по байтам)
+        self.size = len(bits) * 8
+        self.k = k
+
+    @staticmethod
+    def build(hashes: np.ndarray, bits_per_key: int) -> Tuple[bytes, int]:
+        """-> (упакованные биты, k) для массива хэшей."""
+        size = max(64, -(-len(hashes) * bits_per_key // 8) * 8)
+        k = max(1, round(bits_per_key * 0.69))
+        hashes = hashes.astype(np.uint64)
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(k, dtype=np.uint64)[:, None]
+        positions = (low[None, :] + steps * high[None, :]) % np.uint64(size)
+        bits = np.zeros(size, dtype=bool)
+        bits[positions.ravel()] = True
+        return np.packbits(bits, bitorder="little").tobytes(), k
+
+    def might_contain(self, board_hash: int) -> bool:
+        low = board_hash & 0xFFFFFFFF
+        high = (board_hash >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.k):
+            pos = (low + i * high) % size
+            if not (bits[pos >> 3] >> (pos & 7)) & 1:
+                return False
+        return True
+
+
+class PositionMemory:
+    def __init__(
+        self,
+        path: Path = SEEN_POSITIONS_FILE,
+        legacy_path: Optional[Path] = SEEN_BOARDS_FILE,
+        compact_every: int = 4096,
+        bloom_bits_per_key: int = 10,
+    ) -> None:
+        self.path = Path(path)
+        self.log_path = self.path.with_suffix(".log")
+        self.compact_every = compact_every
+        self.bloom_bits_per_key = bloom_bits_per_key
+
+        # сжатый массив (mmap) и журнал, ещё не слитый с ним
+        self._mm: Optional[mmap.mmap] = None
+        self._hashes = np.zeros(0, dtype="<u8")
+        self._cells = np.zeros((0, CELL_COUNT), dtype=np.uint8)
+        self._bloom: Optional[BloomFilter] = None
+        self.pending: Dict[int, bytes] = {}
+        self._log = None
+
+        self._open_array()
+        self._replay_log()
+        if legacy_path is not None and not self.path.exists() and not self.pending:
+            self._import_legacy(Path(legacy_path))
+        if self._should_compact():
+            self.compact()
+
+    # ====== Работа с файлами ======
+
+    def _open_array(self) -> None:
+        if not self.path.exists() or self.path.stat().st_size < _HEADER.size:
+            return
+        with open(self.path, "rb") as f:
+            magic, count, bloom_bytes, k = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                print(f"[POSITION] {self.path}: неизвестный формат, игнорирую")
+                return
+            if count:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not count:
+            return
+        cells_at = _HEADER.size + 8 * count
+        bloom_at = cells_at + CELL_COUNT * count
+        self._hashes = np.frombuffer(self._mm, dtype="<u8", count=count, offset=_HEADER.size)
+        self._cells = np.frombuffer(
+            self._mm, dtype=np.uint8, count=count * CELL_COUNT, offset=cells_at
+        ).reshape(count, CELL_COUNT)
+        if bloom_bytes:
+            self._bloom = BloomFilter(
+                memoryview(self._mm)[bloom_at : bloom_at + bloom_bytes], k
+            )
+
+    def _close_array(self) -> None:
+        # numpy-представления держат буфер mmap — отпускаем их до close()
+        self._hashes = np.zeros(0, dtype="<u8")
+        self._cells = np.zeros((0, CELL_COUNT), dtype=np.uint8)
+        if self._bloom is not None:
+            self._bloom.bits.release()
+            self._bloom = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
 
-    # ====== Работа с файлом ======
+    def _replay_log(self) -> None:
+        if not self.log_path.exists():
+            return
+        data = self.log_path.read_bytes()
+        # недописанная хвостовая запись (обрыв) отбрасывается — и из файла,
+        # иначе следующие дописанные записи съедут со своих 28-байтных границ
+        usable = len(data) - len(data) % _RECORD.size
+        if usable != len(data):
+            print(f"[POSITION] Обрезан недописанный хвост журнала: {len(data) - usable} байт")
+            os.truncate(self.log_path, usable)
+        for board_hash, cells in _RECORD.iter_unpack(data[:usable]):
+            self._remember(board_hash, cells)
 
-    def _load_from_file(self) -> None:
-        if not SEEN_BOARDS_FILE.exists():
+    def _import_legacy(self, legacy_path: Path) -> None:
+        if not legacy_path.exists():
             return
         try:
-            data = json.loads(SEEN_BOARDS_FILE.read_text(encoding="utf-8"))
+            data = json.loads(legacy_path.read_text(encoding="utf-8"))
         except json.JSONDecodeError:
             return
 
-        hashes = data.get("seen_hashes", [])
-        for h_str in hashes:
+        for h_str in data.get("seen_hashes", []):
+            try:
+                self._remember(int(h_str, 16), NO_BOARD)
+            except ValueError:
+                continue
+        for h_str, cells_hex in data.get("boards", {}).items():
             try:
-                h = int(h_str, 16)
-                self.seen_hashes.add(h)
+                h, cells = int(h_str, 16), bytes.fromhex(cells_hex)
             except ValueError:
                 continue
+            if len(cells) == CELL_COUNT:
+                self._remember(h, cells)
+        if self.pending:
+            print(f"[POSITION] Импортировано из {legacy_path}: {len(self.pending)}")
+            self.compact()
+
+    def _remember(self, board_hash: int, cells: bytes) -> None:
+        """В pending; запись с доской вытесняет запись без доски."""
+        if cells != NO_BOARD or board_hash not in self.pending:
+            self.pending[board_hash] = cells
 
-    def _save_to_file(self) -> None:
-        data = {
-            "seen_hashes": [f"{h:016x}" for h in self.seen_hashes],
-        }
-        SEEN_BOARDS_FILE.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+    def _append(self, board_hash: int, cells: bytes) -> None:
+        if self._log is None:
+            self._log = open(self.log_path, "ab")
+        self._log.write(_RECORD.pack(board_hash, cells))
+        self._log.flush()
+        self._remember(board_hash, cells)
+        if self._should_compact():
+            self.compact()
+
+    def _should_compact(self) -> bool:
+        """
+        Журнал сливается, когда он не меньше compact_every и 1/8 массива:
+        слияние переписывает весь массив, поэтому порог растёт вместе с ним
+        и цена вставки в среднем остаётся постоянной.
+        """
+        return len(self.pending) >= max(self.compact_every, len(self._hashes) // 8)
+
+    def _find(self, board_hash: int) -> int:
+        """Индекс хэша в сжатом массиве или -1."""
+        if not len(self._hashes):
+            return -1
+        if self._bloom is not None and not self._bloom.might_contain(board_hash):
+            return -1
+        key = np.uint64(board_hash)
+        i = int(np.searchsorted(self._hashes, key))
+        return i if i < len(self._hashes) and self._hashes[i] == key else -1
+
+    def _stored_cells(self, board_hash: int) -> Optional[bytes]:
+        """Клетки позиции (NO_BOARD — без доски) или None, если не видели."""
+        cells = self.pending.get(board_hash)
+        if cells is not None and cells != NO_BOARD:
+            return cells
+        i = self._find(board_hash)
+        if i >= 0:
+            stored = self._cells[i].tobytes()
+            if stored != NO_BOARD:
+                return stored
+        if cells is not None or i >= 0:
+            return NO_BOARD
+        return None
+
+    def compact(self) -> None:
+        """Слить журнал со сжатым массивом в новый файл и обнулить журнал."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if not self.pending and self.path.exists():
+            self.log_path.unlink(missing_ok=True)
+            return
+
+        new_hashes = np.fromiter(self.pending.keys(), dtype="<u8", count=len(self.pending))
+        new_cells = np.frombuffer(b"".join(self.pending.values()), dtype=np.uint8)
+        new_cells = new_cells.reshape(len(self.pending), CELL_COUNT)
+
+        # старые записи, которые журнал не перекрывает (журнал свежее)
+        keep = ~np.isin(self._hashes, new_hashes)
+        hashes = np.concatenate([self._hashes[keep], new_hashes])
+        cells = np.concatenate([self._cells[keep], new_cells])
+        order = np.argsort(hashes, kind="stable")
+        hashes, cells = hashes[order], cells[order]
+
+        bloom, k = b"", 0
+        if self.bloom_bits_per_key and len(hashes):
+            bloom, k = BloomFilter.build(hashes, self.bloom_bits_per_key)
+
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(hashes), len(bloom), k))
+            f.write(hashes.astype("<u8").tobytes())
+            f.write(cells.tobytes())
+            f.write(bloom)
+        self._close_array()
+        os.replace(tmp, self.path)
+        self.log_path.unlink(missing_ok=True)
+        self.pending.clear()
+        self._open_array()
+
+    def close(self) -> None:
+        """Слить журнал и отпустить файлы (при выходе)."""
+        self.compact()
+        self._close_array()
 
     # ====== Публичный API ======
 
@@ -52,13 +277,41 @@ class PositionMemory:
         """
         Проверить, видели ли уже такую доску.
         """
-        return board_hash in self.seen_hashes
+        return board_hash in self.pending or self._find(board_hash) >= 0
 
-    def mark_seen(self, board_hash: int) -> None:
+    def mark_seen(self, board_hash: int, board: Optional[PackedBoard] = None) -> None:
         """
-        Отметить доску как виденную и сохранить в JSON.
+        Отметить доску как виденную: одна запись в конец журнала.
+        board — упакованная доска: кладётся в корпус (и дописывается
+        к уже виденному хэшу, если доски для него ещё нет).
         """
-        if board_hash in self.seen_hashes:
+        stored = self._stored_cells(board_hash)
+        if stored is not None and (board is None or stored != NO_BOARD):
             return
-        self.seen_hashes.add(board_hash)
-        self._save_to_file()
+        self._append(board_hash, bytes(board.cells) if board is not None else NO_BOARD)
+
+    def board_of(self, board_hash: int) -> Optional[PackedBoard]:
+        """Доска по хэшу из корпуса (None — содержимое не сохранено)."""
+        cells = self._stored_cells(board_hash)
+        if cells is None or cells == NO_BOARD:
+            return None
+        return PackedBoard(cells, board_hash)
+
+    def positions(self) -> Iterator[Tuple[int, PackedBoard]]:
+        """Все позиции корпуса с сохранённой доской: (хэш, доска)."""
+        for board_hash, cells in list(self.pending.items()):
+            if cells != NO_BOARD:
+                yield board_hash, PackedBoard(cells, board_hash)
+        has_board = (self._cells != 0xFF).any(axis=1)
+        for i in np.flatnonzero(has_board):
+            board_hash = int(self._hashes[i])
+            if self.pending.get(board_hash, NO_BOARD) == NO_BOARD:
+                yield board_hash, PackedBoard(self._cells[i].tobytes(), board_hash)
+
+    def board_count(self) -> int:
+        """Сколько позиций с сохранённой доской."""
+        return sum(1 for _ in self.positions())
+
+    def __len__(self) -> int:
+        fresh = sum(1 for board_hash in self.pending if self._find(board_hash) < 0)
+        return len(self._hashes) + fresh
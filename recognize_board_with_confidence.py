@@ -1,9 +1,13 @@
 # recognize_board_with_confidence.py
-import numpy as np
 import constants as const
+from color_classifier import ColorClassifier
 
 
-def recognize_board_with_confidence(self):
+def recognize_board_with_confidence(self, frame=None):
+    """
+    frame — Frame из frame_pipeline: цвета считаются по срезам кадра в памяти.
+    Без frame клетки читаются из cells/ (старый путь через crop_cells_from_screen).
+    """
     if not self.config.get("calibrated", False):
         print("❌ Бот не обучен!")
         return None, None
@@ -13,75 +17,61 @@ def recognize_board_with_confidence(self):
 
     colors_map = self.config.setdefault("colors", {})
 
+    # образцы компилируются в матрицу один раз и пересобираются,
+    # только когда config["colors"] поменялся
+    classifier = getattr(self, "color_classifier", None)
+    if classifier is None:
+        classifier = self.color_classifier = ColorClassifier()
+    classifier.ensure_compiled(colors_map)
+
+    cells = []
+    cell_colors = []
     for r in range(const.ROWS):
         for c in range(const.COLS):
-            cell_path = const.CELLS_DIR / f"cell_{r}_{c}.png"
-            if not cell_path.exists():
-                continue
-
-            color = self.screen_processor.extract_color_from_cell(cell_path)
+            if frame is not None:
+                color = self.screen_processor.extract_color_from_image(
+                    frame.cells[r][c]
+                )
+            else:
+                cell_path = const.CELLS_DIR / f"cell_{r}_{c}.png"
+                if not cell_path.exists():
+                    continue
+                color = self.screen_processor.extract_color_from_cell(cell_path)
             if color is None:
                 continue
-
-            best_label = None
-            best_distance = float("inf")
-            second_best_distance = float("inf")
-
-            for label, learned_colors in self.config["colors"].items():
-                if not learned_colors:
-                    continue
-
-                distances = []
-                for sample_color in learned_colors:
-                    color_arr = np.array(color, dtype=np.float32)
-                    sample_arr = np.array(sample_color, dtype=np.float32)
-                    distance = np.sqrt(np.sum((color_arr - sample_arr) ** 2))
-                    distances.append(distance)
-
-                min_dist = min(distances) if distances else float("inf")
-
-                if min_dist < best_distance:
-                    second_best_distance = best_distance
-                    best_distance = min_dist
-                    best_label = label
-                elif min_dist < second_best_distance:
-                    second_best_distance = min_dist
-
-            if best_distance < float("inf") and second_best_distance < float("inf"):
-                if best_distance + second_best_distance > 0:
-                    confidence = 1.0 - (
-                        best_distance / (best_distance + second_best_distance)
-                    )
-                else:
-                    confidence = 1.0
+            cells.append((r, c, color))
+            cell_colors.append(color)
+
+    results = classifier.classify(cell_colors)
+
+    for (r, c, color), (best_label, best_distance, confidence) in zip(
+        cells, results
+    ):
+        threshold = self.adaptive_threshold
+
+        if (
+            best_distance < threshold
+            and confidence > self.confidence_threshold
+            and best_label
+        ):
+            if best_label == "adv":
+                self.board[r][c] = -1
+                continue
             else:
-                confidence = 0.0
-
-            threshold = self.adaptive_threshold
-
-            if (
-                best_distance < threshold
-                and confidence > self.confidence_threshold
-                and best_label
-            ):
-                if best_label == "adv":
-                    self.board[r][c] = -1
-                    continue
-                else:
-                    value = int(best_label)
-                    self.board[r][c] = value
-                    confidence_board[r][c] = confidence
-
-                    # авто-добавление цвета для крупных/новых чисел
-                    if value > 512:
-                        key = str(value)
-                        if key not in colors_map:
-                            colors_map[key] = []
-
-                        auto_color = self.screen_processor.extract_color_from_cell(
-                            cell_path
-                        )
-                        if auto_color is not None:
-                            samples = colors_map[key]
-                            samples.append
+                value = int(best_label)
+                self.board[r][c] = value
+                confidence_board[r][c] = confidence
+
+                # авто-добавление цвета для крупных/новых чисел
+                if value > 512:
+                    key = str(value)
+                    if key not in colors_map:
+                        colors_map[key] = []
+
+                    # цвет клетки уже посчитан выше — второй kmeans не нужен;
+                    # образцов не больше max_samples, дальше классификатор
+                    # не перекомпилируется
+                    samples = colors_map[key]
+                    if len(samples) < self.config.get("max_samples", 20):
+                        samples.append([int(v) for v in color])
     return self.board, confidence_board
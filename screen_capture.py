@@ -0,0 +1,182 @@
+# screen_capture.py
+"""
+Захват экрана через adb без PNG.
+
+`adb exec-out screencap -p` заставляет телефон кодировать весь кадр в PNG,
+а нас — декодировать его обратно. `screencap` без -p отдаёт сырой буфер:
+
+    заголовок: width, height, format (uint32 LE) [+ colorspace на Android 9+]
+    пиксели:   width * height * 4 байт RGBA_8888 / RGBX_8888 (format 1/2)
+
+Буфер разбирается np.frombuffer без копирования. Для кадра хода можно
+обрезать поток прямо на телефоне до полосы строк с сеткой
+(`screencap | tail -c +N | head -c M`) — по USB идёт в разы меньше данных,
+столбцы режутся уже локально view-срезом.
+
+Если сырой режим не разобрался (другой формат), один раз откатываемся на PNG.
+Команду adb можно подменить (adb_cmd) — тесты гоняют fake_adb.py.
+С transport (adb_transport.AdbTransport) кадр идёт сокетом adb-сервера без
+запуска процесса; сервер недоступен — этот кадр снимается через subprocess.
+"""
+import subprocess
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from adb_transport import AdbError, AdbUnavailable
+
+RAW_FORMATS_RGBA = (1, 2)  # RGBA_8888, RGBX_8888
+RAW_FORMAT_BGRA = 5  # BGRA_8888
+BYTES_PER_PIXEL = 4
+
+
+class RawFrameError(ValueError):
+    pass
+
+
+def parse_raw_header(raw: bytes) -> Tuple[int, int, int, int]:
+    """-> (width, height, format, header_size) по полному выводу screencap."""
+    if len(raw) < 12:
+        raise RawFrameError(f"слишком короткий вывод screencap: {len(raw)} байт")
+    width, height, fmt = np.frombuffer(raw, dtype="<u4", count=3)
+    payload = int(width) * int(height) * BYTES_PER_PIXEL
+    for header_size in (16, 12):
+        if len(raw) == header_size + payload:
+            return int(width), int(height), int(fmt), header_size
+    raise RawFrameError(
+        f"размер {len(raw)} не сходится с {width}x{height} (format {fmt})"
+    )
+
+
+def raw_to_bgr(
+    raw: bytes, width: int, fmt: int, offset: int = 0, x_range=None
+) -> np.ndarray:
+    """
+    Пиксели RGBA/BGRA из raw[offset:] -> BGR.
+    np.frombuffer — без копирования; x_range=(x0, x1) режет столбцы view-срезом,
+    так что в cvtColor идёт только нужная часть кадра.
+    """
+    if fmt not in RAW_FORMATS_RGBA and fmt != RAW_FORMAT_BGRA:
+        raise RawFrameError(f"неподдерживаемый формат screencap: {fmt}")
+    pixels = np.frombuffer(raw, dtype=np.uint8, offset=offset)
+    rows = len(pixels) // (width * BYTES_PER_PIXEL)
+    rgba = pixels[: rows * width * BYTES_PER_PIXEL].reshape(rows, width, BYTES_PER_PIXEL)
+    if x_range is not None:
+        rgba = rgba[:, x_range[0] : x_range[1]]
+    code = cv2.COLOR_BGRA2BGR if fmt == RAW_FORMAT_BGRA else cv2.COLOR_RGBA2BGR
+    return cv2.cvtColor(rgba, code)
+
+
+def grid_bounds(grid, pad: int) -> Tuple[int, int, int, int]:
+    """Прямоугольник (x0, y0, x1, y1), покрывающий все клетки сетки с отступом pad."""
+    xs = [int(x) for row in grid for x, _ in row]
+    ys = [int(y) for row in grid for _, y in row]
+    return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+
+
+class ScreenCapture:
+    def __init__(
+        self, adb_cmd: Sequence[str] = ("adb",), mode: str = "raw", timeout=10, transport=None
+    ):
+        """
+        adb_cmd   — префикс команды adb (["adb", "-s", serial] или fake_adb для тестов);
+        mode      — "raw" (сырой буфер) или "png" (старый screencap -p);
+        transport — AdbTransport (сокет adb-сервера) или None — subprocess.
+        """
+        self.adb_cmd = list(adb_cmd)
+        self.mode = mode
+        self.timeout = timeout
+        self.transport = transport
+        # геометрия сырого кадра, узнаём по первому полному снимку
+        self.width = None
+        self.height = None
+        self.format = None
+        self.header_size = None
+
+    def _exec_out(self, shell_cmd: str) -> Optional[bytes]:
+        if self.transport is not None:
+            try:
+                return self.transport.exec_out(shell_cmd) or None
+            except AdbUnavailable:
+                pass  # сервер не запущен — subprocess (adb сам его поднимет)
+            except (AdbError, OSError):
+                return None
+        try:
+            result = subprocess.run(
+                self.adb_cmd + ["exec-out", shell_cmd],
+                capture_output=True,
+                timeout=self.timeout,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return result.stdout
+
+    def _grab_png(self) -> Optional[np.ndarray]:
+        raw = self._exec_out("screencap -p")
+        if raw is None:
+            return None
+        return cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def _fallback_to_png(self, err: Exception) -> None:
+        print(f"⚠️ Сырой screencap не разобран ({err}), перехожу на PNG")
+        self.mode = "png"
+
+    def grab(self) -> Optional[np.ndarray]:
+        """Полный кадр BGR."""
+        if self.mode != "raw":
+            return self._grab_png()
+
+        raw = self._exec_out("screencap")
+        if raw is None:
+            return None
+        try:
+            width, height, fmt, header_size = parse_raw_header(raw)
+            img = raw_to_bgr(raw, width, fmt, header_size)
+        except RawFrameError as err:
+            self._fallback_to_png(err)
+            return self._grab_png()
+        self.width, self.height, self.format, self.header_size = (
+            width, height, fmt, header_size
+        )
+        return img
+
+    def grab_region(self, box) -> Tuple[Optional[np.ndarray], Tuple[int, int]]:
+        """
+        Кадр, обрезанный до box=(x0, y0, x1, y1) (зажимается в границы экрана).
+        Строки режутся на телефоне, столбцы — локально.
+        -> (BGR-изображение, (x0, y0) его левого верхнего угла на экране).
+        """
+        if self.mode != "raw":
+            return self._crop_local(self._grab_png(), box)
+        if self.width is None:
+            # геометрию ещё не знаем — первый кадр снимаем целиком
+            return self._crop_local(self.grab(), box)
+
+        x0, y0, x1, y1 = box
+        x0, x1 = max(0, x0), min(self.width, x1)
+        y0, y1 = max(0, y0), min(self.height, y1)
+        row_bytes = self.width * BYTES_PER_PIXEL
+        start = self.header_size + y0 * row_bytes
+        length = (y1 - y0) * row_bytes
+
+        raw = self._exec_out(f"screencap | tail -c +{start + 1} | head -c {length}")
+        if raw is None:
+            return None, (x0, y0)
+        if len(raw) != length:
+            # экран повернули / сменилось разрешение — переснимаем целиком
+            self.width = None
+            return self._crop_local(self.grab(), box)
+        return raw_to_bgr(raw, self.width, self.format, 0, (x0, x1)), (x0, y0)
+
+    @staticmethod
+    def _crop_local(img, box):
+        if img is None:
+            return None, (0, 0)
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = box
+        x0, x1 = max(0, x0), min(w, x1)
+        y0, y1 = max(0, y0), min(h, y1)
+        return img[y0:y1, x0:x1], (x0, y0)
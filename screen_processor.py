@@ -7,6 +7,11 @@ from PIL import Image
 import time
 import constants as const
 from ad_detector_2248 import EndGameAdDetector2248
+from dominant_color import DEFAULT_ESTIMATOR, estimate_dominant_color
+from adb_transport import AdbError, AdbTransport, AdbUnavailable
+from screen_capture import ScreenCapture, grid_bounds
+from ad_monitor import AdMonitor
+from settle_detector import SettleDetector
 
 
 class ScreenProcessor:
@@ -20,6 +25,16 @@ class ScreenProcessor:
         self.last_screen_hash = None
         self.static_frame_count = 0
         self._init_grid_bounds()
+        # сокет adb-сервера вместо процесса на каждую команду
+        # (config["adb_transport"] = "subprocess" — старый путь)
+        self.adb = AdbTransport.from_config(self.config)
+        self.capture = ScreenCapture(
+            mode=self.config.get("capture_mode", "raw"), transport=self.adb
+        )
+        # ожидание после тапов — пока экран не перестанет меняться
+        self.settle = SettleDetector.from_config(self, self.config, region="screen")
+        # состояние рекламы по шаблонам на миниатюрах (ad_templates/)
+        self.ad_monitor = AdMonitor.from_config(self, self.config)
 
         # детектор попапа конца игры / рекламы (можно использовать здесь при желании)
         self.ad_detector = EndGameAdDetector2248()
@@ -66,6 +81,14 @@ class ScreenProcessor:
         return True
 
     def adb_command(self, cmd, capture_output=False):
+        if self.adb is not None:
+            try:
+                return self.adb.adb_command(cmd, capture_output)
+            except (ValueError, AdbUnavailable):
+                pass  # строка не разобрана / сервер не запущен — через subprocess
+            except (AdbError, OSError):
+                # команда могла уже выполниться — второй раз не отправляем
+                return None
         try:
             if capture_output:
                 result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
@@ -96,18 +119,19 @@ class ScreenProcessor:
     def grab_screen_cv2(self):
         """
         Возвращает BGR-изображение экрана как cv2-матрицу без записи PNG на диск.
+        По умолчанию — сырой буфер screencap (config["capture_mode"] = "raw"),
+        "png" — старый screencap -p.
         """
-        try:
-            raw = subprocess.check_output(
-                "adb exec-out screencap -p",
-                shell=True,
-            )
-        except subprocess.CalledProcessError:
-            return None
+        return self.capture.grab()
 
-        img_array = np.frombuffer(raw, dtype=np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        return img
+    def grab_grid_region(self, pad=150):
+        """
+        Только область сетки (строки режутся на телефоне).
+        -> (BGR-изображение, (x0, y0) его угла на экране)
+        """
+        if not self.config.get("grid"):
+            return self.grab_screen_cv2(), (0, 0)
+        return self.capture.grab_region(grid_bounds(self.config["grid"], pad))
 
     def show_image(self, image_path, title="Изображение"):
         img = cv2.imread(str(image_path))
@@ -175,20 +199,13 @@ class ScreenProcessor:
         img = cv2.imread(str(cell_image))
         if img is None:
             return None
+        return self.extract_color_from_image(img)
 
-        img_small = cv2.resize(img, (50, 50))
-        img_rgb = cv2.cvtColor(img_small, cv2.COLOR_BGR2RGB)
-        pixels = img_rgb.reshape(-1, 3)
-        pixels_float = np.float32(pixels)
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-        _, labels, centers = cv2.kmeans(
-            pixels_float, 3, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS
+    def extract_color_from_image(self, img):
+        """Доминирующий цвет клетки по BGR-массиву (в т.ч. срезу кадра)."""
+        return estimate_dominant_color(
+            img, self.config.get("color_estimator", DEFAULT_ESTIMATOR)
         )
-        centers = np.uint8(centers)
-        unique, counts = np.unique(labels, return_counts=True)
-        dominant_idx = np.argmax(counts)
-        dominant_color = centers[dominant_idx]
-        return [int(dominant_color[0]), int(dominant_color[1]), int(dominant_color[2])]
 
     # Старый детектор — по файлу (можно уже не использовать)
     def detect_advertisement(self, screenshot_path="screen.png"):
@@ -197,67 +214,37 @@ class ScreenProcessor:
             return False
         return self.detect_advertisement_img(img)
 
-    # Новый быстрый детектор — по cv2-изображению (эвристики, можно выкинуть)
+    # Быстрый детектор — по cv2-изображению (шаблоны AdMonitor)
     def detect_advertisement_img(self, img):
-        return False
-        if img is None:
-            return False
-
-        h, w = img.shape[:2]
-
-        top_band = img[0:50, :]
-        bottom_band = img[h - 50 : h, :]
-
-        if np.mean(top_band) < 30 and np.mean(bottom_band) < 30:
-            return False
-
-        current_hash = self.image_hash(img)
-        if self.last_screen_hash is not None:
-            if current_hash == self.last_screen_hash:
-                self.static_frame_count += 1
-                if self.static_frame_count > 5:
-                    return False
-            else:
-                self.static_frame_count = 0
-        else:
-            self.static_frame_count = 0
-
-        self.last_screen_hash = current_hash
-        return False
+        """Реклама на экране? По шаблонам AdMonitor (без шаблонов — False)."""
+        return self.ad_monitor.is_advertisement(img)
 
     def image_hash(self, img):
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         resized = cv2.resize(gray, (8, 8))
         return hash(resized.tobytes())
 
-    def wait_for_advertisement(self, ad_timeout=35):
+    def wait_for_advertisement(self, ad_timeout=35, should_stop=None):
         print("🎬 Обнаружена реклама. Ожидаю...")
-        ad_start_time = time.time()
         max_wait = self.config.get("ad_timeout", ad_timeout)
+        if not self.ad_monitor.enabled:
+            # замерший экран ещё не значит конец рекламы — ждём весь таймаут,
+            # но короткими шагами, чтобы остановка не ждала минуту
+            print(f"ℹ️ Нет шаблонов ad_templates/ — жду {max_wait} с.")
+            deadline = time.monotonic() + max_wait
+            while time.monotonic() < deadline:
+                if should_stop is not None and should_stop():
+                    print("⏹️ Ожидание рекламы прервано.")
+                    return False
+                time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+            return True
 
-        while time.time() - ad_start_time < max_wait:
-            time.sleep(3)
-            self.take_screenshot("check_ad.png")
-            img = cv2.imread("check_ad.png")
-
-            # если реклама исчезла — выходим
-            if not self.detect_advertisement_img(img):
-                print("✅ Реклама закончилась, продолжаем.")
-                return True
+        def tap(x, y):
+            return self.adb_command(f"adb shell input tap {x} {y}")
 
-            # периодически пытаемся нажать кнопку
-            if int(time.time() - ad_start_time) % 15 == 0:
-                print("⚠️ Пытаюсь нажать кнопку рекламы...")
-
-                is_popup, bx, by = self.ad_detector.detect_endgame_popup(img)
-                if is_popup and bx is not None and by is not None:
-                    self.adb_command(f"adb shell input tap {bx} {by}")
-                else:
-                    if hasattr(const, "AD_BTN_X") and hasattr(const, "AD_BTN_Y"):
-                        self.adb_command(
-                            f"adb shell input tap {const.AD_BTN_X} {const.AD_BTN_Y}"
-                        )
-                time.sleep(2)
+        if self.ad_monitor.dismiss(tap, max_wait, should_stop=should_stop):
+            print("✅ Реклама закончилась, продолжаем.")
+            return True
 
         print("❌ Реклама не исчезла, перезапускаю игру...")
         return False
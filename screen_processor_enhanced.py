@@ -10,6 +10,10 @@ from PIL import Image
 import time
 import constants as const
 from ad_detector_2248 import EndGameAdDetector2248
+from dominant_color import DEFAULT_ESTIMATOR, estimate_dominant_color
+from adb_transport import AdbError, AdbTransport, AdbUnavailable
+from ad_monitor import AdMonitor
+from settle_detector import SettleDetector
 from functools import lru_cache
 import hashlib
 
@@ -39,6 +43,13 @@ class EnhancedScreenProcessor:
         self.max_retries = 3
         self.retry_delay = 0.5
 
+        # Persistent ADB transport (adb server socket) instead of a process per command
+        self.adb = AdbTransport.from_config(self.config)
+        # Wait after taps until the screen stops changing, not a fixed sleep
+        self.settle = SettleDetector.from_config(self, self.config, region="screen")
+        # Ad state by template matching on thumbnails (ad_templates/)
+        self.ad_monitor = AdMonitor.from_config(self, self.config)
+
     def _init_grid_bounds(self):
         """Границы поля в пикселях по текущей grid."""
         if self.config.get("grid"):
@@ -84,6 +95,27 @@ class EnhancedScreenProcessor:
             retries = self.max_retries
             
         for attempt in range(retries + 1):
+            if self.adb is not None:
+                try:
+                    result = self.adb.adb_command(cmd, capture_output)
+                    if result is not None or attempt == retries:
+                        return result
+                    time.sleep(self.retry_delay)
+                    continue
+                except (ValueError, AdbUnavailable):
+                    pass  # unsupported command string / server not running: use subprocess
+                except AdbError as e:
+                    # server refused the request: nothing ran on the device
+                    print(f"❌ ADB command failed (attempt {attempt + 1}/{retries + 1}): {e}")
+                    if attempt < retries:
+                        time.sleep(self.retry_delay)
+                        continue
+                    return None
+                except OSError as e:
+                    # connection dropped or timed out after the command went out:
+                    # it may already have run, so never send it again
+                    print(f"❌ ADB command failed after sending, not retrying: {e}")
+                    return None
             try:
                 if capture_output:
                     result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
@@ -214,20 +246,13 @@ class EnhancedScreenProcessor:
         img = cv2.imread(str(cell_image))
         if img is None:
             return None
+        return self.extract_color_from_image(img)
 
-        img_small = cv2.resize(img, (50, 50))
-        img_rgb = cv2.cvtColor(img_small, cv2.COLOR_BGR2RGB)
-        pixels = img_rgb.reshape(-1, 3)
-        pixels_float = np.float32(pixels)
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-        _, labels, centers = cv2.kmeans(
-            pixels_float, 3, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS
+    def extract_color_from_image(self, img):
+        """Доминирующий цвет клетки по BGR-массиву (в т.ч. срезу кадра)."""
+        return estimate_dominant_color(
+            img, self.config.get("color_estimator", DEFAULT_ESTIMATOR)
         )
-        centers = np.uint8(centers)
-        unique, counts = np.unique(labels, return_counts=True)
-        dominant_idx = np.argmax(counts)
-        dominant_color = centers[dominant_idx]
-        return [int(dominant_color[0]), int(dominant_color[1]), int(dominant_color[2])]
 
     # Старый детектор — по файлу (можно уже не использовать)
     def detect_advertisement(self, screenshot_path="screen.png"):
@@ -236,69 +261,37 @@ class EnhancedScreenProcessor:
             return False
         return self.detect_advertisement_img(img)
 
-    # Новый быстрый детектор — по cv2-изображению (эвристики, можно выкинуть)
+    # Detector on a cv2 image: AdMonitor templates
     def detect_advertisement_img(self, img):
-        return False
-        if img is None:
-            return False
-
-        h, w = img.shape[:2]
-
-        top_band = img[0:50, :]
-        bottom_band = img[h - 50 : h, :]
-
-        if np.mean(top_band) < 30 and np.mean(bottom_band) < 30:
-            return False
-
-        current_hash = self.image_hash(img)
-        if self.last_screen_hash is not None:
-            if current_hash == self.last_screen_hash:
-                self.static_frame_count += 1
-                if self.static_frame_count > 5:
-                    return False
-            else:
-                self.static_frame_count = 0
-        else:
-            self.static_frame_count = 0
-
-        self.static_frame_count = 0
-
-        self.last_screen_hash = current_hash
-        return False
+        """Is an ad on screen? Uses AdMonitor templates (False without templates)."""
+        return self.ad_monitor.is_advertisement(img)
 
     def image_hash(self, img):
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         resized = cv2.resize(gray, (8, 8))
         return hash(resized.tobytes())
 
-    def wait_for_advertisement(self, ad_timeout=35):
+    def wait_for_advertisement(self, ad_timeout=35, should_stop=None):
         print("🎬 Обнаружена реклама. Ожидаю...")
-        ad_start_time = time.time()
         max_wait = self.config.get("ad_timeout", ad_timeout)
+        if not self.ad_monitor.enabled:
+            # замерший экран ещё не значит конец рекламы — ждём весь таймаут,
+            # но короткими шагами, чтобы остановка не ждала минуту
+            print(f"ℹ️ Нет шаблонов ad_templates/ — жду {max_wait} с.")
+            deadline = time.monotonic() + max_wait
+            while time.monotonic() < deadline:
+                if should_stop is not None and should_stop():
+                    print("⏹️ Ожидание рекламы прервано.")
+                    return False
+                time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+            return True
 
-        while time.time() - ad_start_time < max_wait:
-            time.sleep(3)
-            self.take_screenshot("check_ad.png")
-            img = cv2.imread("check_ad.png")
-
-            # если реклама исчезла — выходим
-            if not self.detect_advertisement_img(img):
-                print("✅ Реклама закончилась, продолжаем.")
-                return True
-
-            # периодически пытаемся нажать кнопку
-            if int(time.time() - ad_start_time) % 15 == 0:
-                print("⚠️ Пытаюсь нажать кнопку рекламы...")
+        def tap(x, y):
+            return self.adb_command(f"adb shell input tap {x} {y}")
 
-                is_popup, bx, by = self.ad_detector.detect_endgame_popup(img)
-                if is_popup and bx is not None and by is not None:
-                    self.adb_command(f"adb shell input tap {bx} {by}")
-                else:
-                    if hasattr(const, "AD_BTN_X") and hasattr(const, "AD_BTN_Y"):
-                        self.adb_command(
-                            f"adb shell input tap {const.AD_BTN_X} {const.AD_BTN_Y}"
-                        )
-                time.sleep(2)
+        if self.ad_monitor.dismiss(tap, max_wait, should_stop=should_stop):
+            print("✅ Реклама закончилась, продолжаем.")
+            return True
 
         print("❌ Реклама не исчезла, перезапускаю игру...")
         return False
@@ -0,0 +1,149 @@
+# settle_detector.py
+"""
+Ожидание, пока экран успокоится, вместо фиксированных пауз.
+
+Раньше после каждого действия бот спал наугад: 2 с после рестарта,
+35 с на рекламу, доли секунды между ходами — независимо от того, когда
+анимация на самом деле закончилась. SettleDetector опрашивает экран
+(по умолчанию — только область сетки, screencap режется на телефоне),
+сжимает кадр в серую миниатюру (32x24, INTER_AREA) и сравнивает её
+с предыдущей: средняя абсолютная разница ниже threshold stable_frames
+раз подряд — экран стоит, ждать больше нечего. Не успокоился за
+timeout — ожидание заканчивается с False, как и прежняя пауза.
+
+min_wait — нижняя граница: тап ещё не дошёл до телефона, а два
+одинаковых кадра «до анимации» иначе сошли бы за спокойный экран.
+
+Настройки — config["settle"] (см. DEFAULT_SETTLE); у каждого вызова
+wait() свои timeout/min_wait.
+"""
+import time
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_SETTLE = {
+    "interval": 0.03,  # с между опросами (сам screencap тоже занимает время)
+    "timeout": 2.0,  # с, дольше не ждём
+    "min_wait": 0.05,  # с, раньше не отпускаем
+    "stable_frames": 2,  # столько сравнений подряд без изменений
+    "threshold": 1.5,  # средняя |разница| миниатюр (0..255)
+    "thumb_size": [32, 24],  # ширина, высота миниатюры
+    "pad": 150,  # отступ области сетки, как у FramePipeline
+}
+
+
+def settle_params(config: Optional[dict]) -> dict:
+    """DEFAULT_SETTLE, перекрытый config["settle"]."""
+    params = dict(DEFAULT_SETTLE)
+    params.update((config or {}).get("settle", {}))
+    return params
+
+
+def thumbnail(img: np.ndarray, size: Tuple[int, int] = (32, 24)) -> np.ndarray:
+    """Серая миниатюра кадра (float32) для сравнения соседних кадров."""
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(img, tuple(size), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def frame_delta(a: np.ndarray, b: np.ndarray) -> float:
+    """Средняя абсолютная разница двух миниатюр."""
+    return float(np.mean(np.abs(a - b)))
+
+
+class SettleDetector:
+    def __init__(
+        self,
+        grab: Callable[[], Optional[np.ndarray]],
+        interval: float = DEFAULT_SETTLE["interval"],
+        timeout: float = DEFAULT_SETTLE["timeout"],
+        min_wait: float = DEFAULT_SETTLE["min_wait"],
+        stable_frames: int = DEFAULT_SETTLE["stable_frames"],
+        threshold: float = DEFAULT_SETTLE["threshold"],
+        thumb_size=DEFAULT_SETTLE["thumb_size"],
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """grab() -> BGR-кадр или None (кадр не снялся — опрос продолжается)."""
+        self.grab = grab
+        self.interval = interval
+        self.timeout = timeout
+        self.min_wait = min_wait
+        self.stable_frames = stable_frames
+        self.threshold = threshold
+        self.thumb_size = tuple(thumb_size)
+        self.clock = clock
+        self.sleep = sleep
+
+        self.last_frame: Optional[np.ndarray] = None  # последний снятый кадр
+        self.last_wait = 0.0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+
+    @classmethod
+    def from_config(cls, screen_processor, config: Optional[dict], region: str = "grid", **overrides):
+        """
+        Опрос через screen_processor: region="grid" — только полоса сетки
+        (grab_grid_region), "screen" — экран целиком (кадр пригоден и для
+        проверки конца игры, см. last_frame).
+        """
+        params = settle_params(config)
+        params.update(overrides)
+        pad = int(params.pop("pad"))
+        if region == "grid" and hasattr(screen_processor, "grab_grid_region"):
+            def grab():
+                return screen_processor.grab_grid_region(pad)[0]
+        else:
+            grab = screen_processor.grab_screen_cv2
+        return cls(grab, **params)
+
+    def wait(self, timeout: Optional[float] = None, min_wait: Optional[float] = None) -> bool:
+        """
+        Ждать, пока кадры не перестанут меняться.
+        -> True — экран успокоился, False — вышел timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        min_wait = self.min_wait if min_wait is None else min_wait
+        started = self.clock()
+        self.last_frame = None
+        if min_wait > 0:
+            self.sleep(min_wait)
+
+        previous = None
+        stable = 0
+        settled = False
+        while True:
+            img = self.grab()
+            if img is not None:
+                self.last_frame = img
+                thumb = thumbnail(img, self.thumb_size)
+                if previous is not None and thumb.shape == previous.shape:
+                    if frame_delta(thumb, previous) < self.threshold:
+                        stable += 1
+                    else:
+                        stable = 0
+                previous = thumb
+                if stable >= self.stable_frames:
+                    settled = True
+                    break
+            if self.clock() - started >= timeout:
+                break
+            self.sleep(self.interval)
+
+        self.last_wait = self.clock() - started
+        self.waits += 1
+        self.total_wait += self.last_wait
+        if not settled:
+            self.timeouts += 1
+        return settled
+
+    def stats(self) -> dict:
+        return {
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "total_wait": self.total_wait,
+            "avg_wait": self.total_wait / self.waits if self.waits else 0.0,
+        }
@@ -0,0 +1,263 @@
+# simulator_2248.py
+"""
+Офлайн-движок 2248: слияние цепочки, падение тайлов и спавн новых.
+
+Нужен, чтобы гонять стратегию (порядки optimal_lengths, веса эвристик)
+тысячами партий без телефона и ADB.
+
+Правила:
+  - цепочка сливается в один тайл в ПОСЛЕДНЕЙ клетке цепочки;
+  - значение — сумма тайлов цепочки, округлённая до степени двойки
+    (вверх по умолчанию, см. merge_rounding);
+  - остальные клетки цепочки пустеют, тайлы в каждом столбце падают вниз;
+  - освободившиеся клетки сверху заполняются новыми тайлами из SpawnModel.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import constants as const
+from board_engine import (
+    CELL_COUNT,
+    EXP_VALUE,
+    NEIGHBOR8_MASK,
+    PackedBoard,
+    chain_to_indices,
+)
+from constants import MAX_EXP
+from batch_eval_2248 import evaluate_chains
+from evaluate_chain_smart import evaluate_chain_smart
+from find_all_chains import DEFAULT_MAX_PATHS, find_all_chains
+from find_best_chain_smart import find_best_chain_smart
+from heuristics_2248 import Heuristics2248
+
+# Веса показателей степени для новых тайлов по умолчанию (2, 4, 8, 16, 32)
+DEFAULT_SPAWN_WEIGHTS = {1: 30, 2: 30, 3: 20, 4: 12, 5: 8}
+
+
+class SpawnModel:
+    """
+    Распределение новых тайлов.
+
+    weights     — {показатель: вес}, показатели относительно базы (1 = "2");
+    spawn_window — если задан, база сдвигается вместе с максимумом доски:
+                   база = max(1, max_exp - spawn_window) (в игре мелочь со
+                   временем перестаёт выпадать).
+    """
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, spawn_window=None):
+        weights = weights or DEFAULT_SPAWN_WEIGHTS
+        self.exps = [int(e) for e in weights]
+        self.weights = [float(w) for w in weights.values()]
+        self.spawn_window = spawn_window
+
+    def base_shift(self, board: PackedBoard) -> int:
+        if not self.spawn_window:
+            return 0
+        return max(0, board.max_exp() - self.spawn_window - 1)
+
+    def sample(self, rng: random.Random, count: int, shift: int = 0) -> List[int]:
+        return [
+            min(e + shift, MAX_EXP)
+            for e in rng.choices(self.exps, weights=self.weights, k=count)
+        ]
+
+
+@dataclass
+class SimGameResult:
+    """Итог одной офлайн-партии"""
+    score: int
+    moves: int
+    max_tile: int
+    final_board: List[List[int]]
+    chain_lengths: Dict[int, int] = field(default_factory=dict)
+
+
+def merge_exp(values_sum: int, rounding: str = "up") -> int:
+    """Показатель тайла, получаемого из цепочки с суммой values_sum."""
+    if rounding == "down":
+        e = values_sum.bit_length() - 1
+    else:
+        e = (values_sum - 1).bit_length()
+    return min(e, MAX_EXP)
+
+
+def is_valid_chain(board: PackedBoard, chain: Sequence[int]) -> bool:
+    """Цепочка (индексы) допустима на доске: соседство, без повторов, x1/x2."""
+    if len(chain) < 2 or len(set(chain)) != len(chain):
+        return False
+    cells = board.cells
+    if not cells[chain[0]] or cells[chain[0]] != cells[chain[1]]:
+        return False
+    for prev, cur in zip(chain, chain[1:]):
+        if not (NEIGHBOR8_MASK[prev] >> cur) & 1:
+            return False
+        if cells[cur] != cells[prev] and cells[cur] != cells[prev] + 1:
+            return False
+    return True
+
+
+class Simulator2248:
+    def __init__(
+        self,
+        spawn_model: Optional[SpawnModel] = None,
+        merge_rounding: str = "up",
+        seed=None,
+    ):
+        self.spawn_model = spawn_model or SpawnModel()
+        self.merge_rounding = merge_rounding
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, config: dict, seed=None) -> "Simulator2248":
+        """
+        Настройки из config["simulator"]:
+        {"spawn_weights": {"1": 30, ...}, "spawn_window": 9, "merge_rounding": "up"}
+        """
+        sim_cfg = config.get("simulator", {}) if config else {}
+        weights = sim_cfg.get("spawn_weights")
+        if weights:
+            weights = {int(k): float(v) for k, v in weights.items()}
+        return cls(
+            SpawnModel(weights, sim_cfg.get("spawn_window")),
+            sim_cfg.get("merge_rounding", "up"),
+            seed,
+        )
+
+    # ===== Механика =====
+
+    def apply_chain(self, board: PackedBoard, chain: Sequence[int]):
+        """
+        Слияние + падение, без спавна (пустые клетки остаются сверху).
+        chain — индексы клеток. Возвращает (новая доска, значение нового тайла).
+        """
+        cells = bytearray(board.cells)
+        total = 0
+        for i in chain:
+            total += 1 << cells[i]
+            cells[i] = 0
+        result = merge_exp(total, self.merge_rounding)
+        cells[chain[-1]] = result
+
+        cols = const.COLS
+        for c in range(cols):
+            column = [
+                cells[r * cols + c]
+                for r in range(const.ROWS - 1, -1, -1)
+                if cells[r * cols + c]
+            ]
+            column += [0] * (const.ROWS - len(column))
+            for k, r in enumerate(range(const.ROWS - 1, -1, -1)):
+                cells[r * cols + c] = column[k]
+
+        old = board.cells
+        changes = [(i, cells[i]) for i in range(CELL_COUNT) if cells[i] != old[i]]
+        return board.with_cells(changes), EXP_VALUE[result]
+
+    def spawn(self, board: PackedBoard) -> PackedBoard:
+        """Заполнить все пустые клетки новыми тайлами."""
+        empties = [i for i, e in enumerate(board.cells) if not e]
+        if not empties:
+            return board
+        shift = self.spawn_model.base_shift(board)
+        new_exps = self.spawn_model.sample(self.rng, len(empties), shift)
+        return board.with_cells(zip(empties, new_exps))
+
+    def step(self, board: PackedBoard, chain: Sequence[int]):
+        """Полный ход: слияние, падение, спавн. Возвращает (доска, очки)."""
+        after, gained = self.apply_chain(board, chain)
+        return self.spawn(after), gained
+
+    def new_board(self) -> PackedBoard:
+        return self.spawn(PackedBoard(bytes(CELL_COUNT)))
+
+    # ===== Партия =====
+
+    def play_game(
+        self,
+        policy: Callable[[PackedBoard], Optional[list]],
+        max_moves: int = 1000,
+        board: Optional[PackedBoard] = None,
+    ) -> SimGameResult:
+        """
+        Играет партию до конца ходов или max_moves.
+        policy(board) -> цепочка [(r, c), ...] или None (ходов нет).
+        """
+        if board is None:
+            board = self.new_board()
+        score = 0
+        moves = 0
+        chain_lengths: Dict[int, int] = {}
+
+        while moves < max_moves:
+            chain = policy(board)
+            if not chain:
+                break
+            idx = chain_to_indices(chain)
+            if not is_valid_chain(board, idx):
+                print(f"[SIM] policy вернула недопустимую цепочку: {chain}")
+                break
+            board, gained = self.step(board, idx)
+            score += gained
+            moves += 1
+            chain_lengths[len(idx)] = chain_lengths.get(len(idx), 0) + 1
+
+        return SimGameResult(
+            score=score,
+            moves=moves,
+            max_tile=EXP_VALUE[board.max_exp()] if board.max_exp() else 0,
+            final_board=board.to_rows(),
+            chain_lengths=chain_lengths,
+        )
+
+
+class SmartPolicy:
+    """
+    Политика бота без GameLogic/ADB: find_all_chains + evaluate_chain_smart
+    + порядок длин optimal_lengths, как в GameLogic.find_best_chain_smart.
+    """
+
+    def __init__(self, optimal_lengths, max_chain_paths=None):
+        self.optimal_lengths = list(optimal_lengths)
+        self.max_chain_paths = (
+            DEFAULT_MAX_PATHS if max_chain_paths is None else max_chain_paths
+        )
+
+    def find_all_chains(self, board):
+        return find_all_chains(self, board)
+
+    def evaluate_chain_smart(self, chain, board):
+        return evaluate_chain_smart(self, chain, board)
+
+    def evaluate_chains(self, chains, board):
+        return evaluate_chains(self, chains, board)
+
+    def __call__(self, board: PackedBoard):
+        return find_best_chain_smart(
+            board,
+            board.hash,
+            lambda board_hash, move_key: False,
+            lambda chain: self.evaluate_chain_smart(chain, board),
+            lambda: self.find_all_chains(board),
+            optimal_lengths=self.optimal_lengths,
+            verbose=False,
+            evaluate_batch=lambda chains: self.evaluate_chains(chains, board),
+        )
+
+
+class HeuristicsPolicy(SmartPolicy):
+    """
+    То же, что SmartPolicy, но цепочки оцениваются Heuristics2248
+    с весами из weights_path (вариант heuristics_weights.json).
+    """
+
+    def __init__(self, weights_path, optimal_lengths, **kwargs):
+        super().__init__(optimal_lengths, **kwargs)
+        self.heur = Heuristics2248(None, weights_path)
+        self.heur.verbose = False
+
+    def evaluate_chain_smart(self, chain, board):
+        return self.heur.evaluate_chain(chain, board)
+
+    def evaluate_chains(self, chains, board):
+        return self.heur.evaluate_batch(chains, board)
@@ -0,0 +1,189 @@
+# test_ad_monitor.py
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from ad_monitor import AdMonitor
+from game_runner import GameRunner
+from screen_processor import ScreenProcessor
+
+RNG = np.random.default_rng(7)
+H, W = 480, 320
+
+
+def blocky(h, w, block=8):
+    """Случайная «картинка» из крупных блоков — переживает сжатие в 4 раза."""
+    small = RNG.integers(0, 256, (h // block, w // block, 3), dtype=np.uint8)
+    return np.kron(small, np.ones((block, block, 1), dtype=np.uint8))
+
+
+BOARD = blocky(H, W)  # экран игры
+CLOSE = blocky(48, 48)  # крестик рекламы
+
+
+def ad_frame(with_close=False):
+    img = blocky(H, W)  # ролик: каждый кадр другой
+    if with_close:
+        img[16:64, 256:304] = CLOSE
+    return img
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_monitor(frames, clock, board=True):
+    return AdMonitor(
+        lambda: next(frames),
+        close_templates=[CLOSE],
+        board_templates=[BOARD[0:96, 0:W]] if board else [],
+        interval=0.5,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+
+def test_classify_states():
+    monitor = make_monitor(iter([]), FakeClock())
+    assert monitor.classify(BOARD).state == "board"
+    assert monitor.classify(ad_frame()).state == "playing"
+
+    state = monitor.classify(ad_frame(with_close=True))
+    assert state.state == "closable"
+    # центр крестика в пикселях экрана (с точностью до сжатия)
+    assert abs(state.point[0] - 280) <= 4 and abs(state.point[1] - 40) <= 4
+    assert monitor.is_advertisement(ad_frame()) and not monitor.is_advertisement(BOARD)
+
+
+def test_dismiss_taps_close_as_soon_as_it_appears():
+    clock = FakeClock()
+    frames = iter(
+        [BOARD]  # ещё до начала рекламы
+        + [ad_frame() for _ in range(6)]
+        + [ad_frame(with_close=True)]
+        + [BOARD] * 5
+    )
+    monitor = make_monitor(frames, clock)
+    taps = []
+
+    assert monitor.dismiss(lambda x, y: taps.append((x, y)), timeout=35)
+    assert len(taps) == 1
+    # крестик на 8-м кадре: 7 пауз по 0.5 с, а не 35 с ожидания
+    assert clock.now < 5
+
+
+def test_dismiss_times_out_without_close_button():
+    clock = FakeClock()
+    frames = (ad_frame() for _ in range(1000))
+    monitor = make_monitor(frames, clock)
+    taps = []
+    assert not monitor.dismiss(lambda x, y: taps.append((x, y)), timeout=10)
+    assert taps == [] and 10 <= clock.now < 11
+
+
+def test_dismiss_without_board_templates_trusts_the_tap():
+    clock = FakeClock()
+    frames = iter([ad_frame(), ad_frame(with_close=True)])
+    monitor = make_monitor(frames, clock, board=False)
+    taps = []
+    assert monitor.dismiss(lambda x, y: taps.append((x, y)), timeout=35)
+    assert len(taps) == 1 and not AdMonitor(lambda: None).enabled
+
+
+def test_board_captured_from_own_frame():
+    # без файлов шаблонов: образец доски — шапка кадра до тапа по кнопке
+    clock = FakeClock()
+    frames = iter([BOARD] + [ad_frame() for _ in range(4)] + [BOARD] * 3)
+    monitor = AdMonitor(lambda: next(frames), interval=0.5, clock=clock, sleep=clock.sleep)
+    assert not monitor.enabled
+    assert monitor.dismiss(lambda x, y: None, timeout=35, board_frame=BOARD)
+    assert monitor.last_outcome == "closed" and clock.now < 5
+    # образец живёт только одно ожидание
+    assert monitor.classify(BOARD).state == "playing"
+    # однотонная шапка ничего не узнаёт — образца нет
+    assert monitor.board_template(np.zeros((H, W, 3), dtype=np.uint8)) is None
+
+
+def test_dismiss_reports_ad_that_never_started():
+    clock = FakeClock()
+    monitor = make_monitor(iter([BOARD] * 100), clock)
+    taps = []
+    assert not monitor.dismiss(lambda x, y: taps.append((x, y)), timeout=35)
+    assert monitor.last_outcome == "not_started" and taps == []
+
+
+def test_slow_ad_start_is_still_watched():
+    # реклама грузится 6 с — дольше AD_CLOSED_TIMEOUT, но это ещё не «не началась»
+    clock = FakeClock()
+    frames = iter([BOARD] * 13 + [ad_frame() for _ in range(4)] + [BOARD] * 3)
+    monitor = AdMonitor(lambda: next(frames), interval=0.5, clock=clock, sleep=clock.sleep)
+    assert monitor.dismiss(lambda x, y: None, timeout=35, board_frame=BOARD)
+    assert monitor.last_outcome == "closed"
+
+
+def test_runner_taps_close_points_when_ad_never_shows():
+    clock = FakeClock()
+    sent = []
+    monitor = make_monitor(iter([BOARD] * 1000), clock)
+    runner = GameRunner.__new__(GameRunner)
+    runner.screen_processor = SimpleNamespace(
+        grab_screen_cv2=lambda: BOARD,
+        adb_command=lambda cmd, capture_output=False: sent.append(cmd) or True,
+    )
+    runner.ad_detector = SimpleNamespace(tap_ad_button=lambda adb: True)
+    runner.ad_monitor = monitor
+    runner.settle = SimpleNamespace(wait=lambda *a, **kw: True)
+    runner._stop_requested = False
+
+    # как раньше: не найдя рекламу, бот тапает крестики, а не бросает игру
+    assert runner._handle_advertisement()
+    assert monitor.last_outcome == "not_started" and sent
+
+
+def test_should_stop_interrupts_watch():
+    clock = FakeClock()
+    monitor = make_monitor((ad_frame() for _ in range(1000)), clock)
+    assert not monitor.dismiss(
+        lambda x, y: None, timeout=35, should_stop=lambda: clock.now >= 2
+    )
+    assert monitor.last_outcome == "stopped" and clock.now < 3
+
+
+def test_wait_without_templates_checks_stop():
+    proc = ScreenProcessor.__new__(ScreenProcessor)
+    proc.config = {"ad_timeout": 60}
+    proc.ad_monitor = SimpleNamespace(enabled=False)
+    calls = []
+
+    started = time.monotonic()
+    assert not proc.wait_for_advertisement(should_stop=lambda: calls.append(1) or len(calls) > 1)
+    assert len(calls) == 2 and time.monotonic() - started < 3
+
+    proc.config = {"ad_timeout": 0.2}
+    assert proc.wait_for_advertisement(should_stop=lambda: False)
+
+
+def main():
+    test_classify_states()
+    test_dismiss_taps_close_as_soon_as_it_appears()
+    test_dismiss_times_out_without_close_button()
+    test_dismiss_without_board_templates_trusts_the_tap()
+    test_board_captured_from_own_frame()
+    test_dismiss_reports_ad_that_never_started()
+    test_slow_ad_start_is_still_watched()
+    test_runner_taps_close_points_when_ad_never_shows()
+    test_should_stop_interrupts_watch()
+    test_wait_without_templates_checks_stop()
+    print("✅ ad_monitor: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# test_adb_transport.py
+import os
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+import screen_processor
+import screen_processor_enhanced
+from adb_transport import AdbError, AdbTransport, AdbUnavailable, parse_adb_command
+from fake_adb import FakeAdbServer, raw_screencap
+from screen_capture import ScreenCapture
+
+
+@contextmanager
+def fake_server(tmp_path):
+    img = np.random.RandomState(2).randint(0, 256, (300, 200, 3)).astype(np.uint8)
+    frame_path = tmp_path / "frame.png"
+    cv2.imwrite(str(frame_path), img)
+    old_frames = os.environ.get("FAKE_ADB_FRAMES")
+    os.environ["FAKE_ADB_FRAMES"] = str(frame_path)
+    srv = FakeAdbServer().start()
+    srv.img = img
+    try:
+        yield srv
+    finally:
+        srv.stop()
+        if old_frames is None:
+            os.environ.pop("FAKE_ADB_FRAMES", None)
+        else:
+            os.environ["FAKE_ADB_FRAMES"] = old_frames
+
+
+def expect_error(error, func, *args):
+    try:
+        func(*args)
+    except error:
+        return
+    raise AssertionError(f"ожидался {error.__name__}")
+
+
+def test_parse_adb_command():
+    assert parse_adb_command("adb shell input tap 10 20") == ("shell", "input tap 10 20", None)
+    assert parse_adb_command('adb shell "sendevent a; sendevent b"') == (
+        "shell",
+        "sendevent a; sendevent b",
+        None,
+    )
+    assert parse_adb_command("adb exec-out screencap -p > s.png") == (
+        "exec-out",
+        "screencap -p",
+        "s.png",
+    )
+    assert parse_adb_command("adb devices") == ("devices", "", None)
+    expect_error(ValueError, parse_adb_command, "adb kill-server")
+
+
+def test_exec_out_and_capture(tmp_path):
+    with fake_server(tmp_path) as server:
+        adb = AdbTransport(port=server.port)
+        assert "fake\tdevice" in adb.devices()
+        assert adb.exec_out("screencap") == raw_screencap(server.img)
+        assert b"".join(adb.stream("screencap", 1000)) == raw_screencap(server.img)
+
+        cap = ScreenCapture(("adb-not-installed",), transport=adb)
+        assert (cap.grab() == server.img).all()
+
+        # команды из разных потоков — параллельные соединения
+        with ThreadPoolExecutor(4) as pool:
+            frames = list(pool.map(lambda _: adb.exec_out("screencap"), range(8)))
+        assert all(f == frames[0] for f in frames)
+
+        expect_error(AdbError, AdbTransport(serial="other", port=server.port).exec_out, "screencap")
+
+
+def test_persistent_shell_session(tmp_path):
+    with fake_server(tmp_path) as server:
+        adb = AdbTransport(port=server.port)
+        assert adb.adb_command("adb shell input tap 10 20") is True
+        assert adb.adb_command('adb shell "sendevent /dev/x 0 0 0; sendevent /dev/x 1 2 3"')
+        assert adb.run("input tap 1 2") == (0, "")
+        assert server.commands == [
+            "input tap 10 20",
+            "sendevent /dev/x 0 0 0; sendevent /dev/x 1 2 3",
+            "input tap 1 2",
+        ]
+        connections = server.connections
+        for _ in range(10):
+            adb.run("input tap 5 5")
+        assert server.connections == connections  # одна и та же сессия
+
+        # сессия оборвалась — переоткрывается сама
+        adb._session.sock.close()
+        assert adb.run("input tap 6 6") == (0, "")
+
+        target = tmp_path / "shot.png"
+        assert adb.adb_command(f"adb exec-out screencap -p > {target}") is True
+        assert (cv2.imread(str(target)) == server.img).all()
+        adb.close()
+
+
+def test_capture_output_goes_through_exec(tmp_path):
+    with fake_server(tmp_path) as server:
+        adb = AdbTransport(port=server.port)
+        server.outputs["getprop ro.product.model"] = "Pixel 7\n"
+        connections = server.connections
+        assert adb.adb_command("adb shell getprop ro.product.model", capture_output=True) == "Pixel 7"
+        # без интерактивной сессии: ни эха команды, ни приглашения в выводе
+        assert adb._session is None and server.connections == connections + 1
+        assert adb.exec_status("getprop ro.product.model") == (0, "Pixel 7\n")
+        adb.close()
+
+
+def test_timeout_after_send_is_not_retried(tmp_path):
+    with fake_server(tmp_path) as server:
+        adb = AdbTransport(port=server.port)
+        adb.run("input tap 1 1")
+
+        def stall(n):
+            raise socket.timeout("timed out")
+
+        adb._session.wait = stall
+        expect_error(socket.timeout, adb.run, "input tap 2 2")
+        assert adb._session is None
+
+        # следующая команда — в новой сессии; отправленная не повторялась
+        assert adb.run("input tap 3 3") == (0, "")
+        deadline = time.monotonic() + 2
+        while "input tap 2 2" not in server.commands and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server.commands.count("input tap 2 2") == 1
+        adb.close()
+
+
+class RaisingTransport:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def adb_command(self, cmd, capture_output=False):
+        self.calls += 1
+        raise self.error
+
+
+def test_no_subprocess_resend_after_send():
+    sent = []
+
+    def fake_run(cmd, *args, **kwargs):
+        sent.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="")
+
+    real_run = subprocess.run
+    subprocess.run = fake_run
+    try:
+        for cls in (screen_processor.ScreenProcessor, screen_processor_enhanced.EnhancedScreenProcessor):
+            proc = cls.__new__(cls)
+            proc.max_retries, proc.retry_delay = 3, 0.0
+
+            # обрыв / таймаут после отправки: ни повтора, ни subprocess
+            for error in (ConnectionError("adb: shell-сессия закрыта"), socket.timeout("timed out")):
+                proc.adb = RaisingTransport(error)
+                assert proc.adb_command("adb shell input tap 1 2") is None
+                assert proc.adb.calls == 1 and sent == []
+
+            # сервер недоступен до отправки — откат на subprocess
+            proc.adb = RaisingTransport(AdbUnavailable("refused"))
+            assert proc.adb_command("adb shell input tap 1 2") is True
+            assert sent == ["adb shell input tap 1 2"]
+            sent.clear()
+    finally:
+        subprocess.run = real_run
+
+    # закрытый порт — AdbUnavailable, до какой-либо отправки
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    expect_error(AdbUnavailable, AdbTransport(port=port).run, "input tap 1 2")
+
+
+def main():
+    import tempfile
+    from pathlib import Path
+
+    test_parse_adb_command()
+    for test in (
+        test_exec_out_and_capture,
+        test_persistent_shell_session,
+        test_capture_output_goes_through_exec,
+        test_timeout_after_send_is_not_retried,
+    ):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    test_no_subprocess_resend_after_send()
+    print("✅ adb_transport: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# test_batch_eval_2248.py
+import random
+
+from batch_eval_2248 import (
+    BATCH_MIN_CHAINS,
+    ChainBatch,
+    evaluate_chains_heuristics,
+    evaluate_chains_smart,
+)
+from board_engine import PackedBoard, indices_to_chain
+from evaluate_chain_smart import evaluate_chain_smart
+from find_all_chains import enumerate_chains
+from heuristics_2248 import Heuristics2248, _CENTER_CELLS
+from simulator_2248 import SmartPolicy
+
+
+def _boards(count, seed=11):
+    rng = random.Random(seed)
+    pools = ([0, 1, 1, 2, 2, 3, 4, 7, 8, 9, 11, 12], [1, 1, 2, 2, 1, 2, 3, 8, 8, 9])
+    for k in range(count):
+        cells = bytes(rng.choice(pools[k % 2]) for _ in range(20))
+        chains = [indices_to_chain(c) for c in enumerate_chains(cells, 20000, None)]
+        # префиксы — цепочки разной длины, в том числе короткие
+        chains += [c[:n] for c in chains for n in range(1, len(c))]
+        yield PackedBoard(cells), chains
+
+
+def test_batch_matches_scalar_scores():
+    heur = Heuristics2248(None)
+    heur.verbose = False
+    checked = 0
+    for board, chains in _boards(80):
+        smart = [evaluate_chain_smart(None, ch, board) for ch in chains]
+        scalar = [heur.evaluate_chain(ch, board) for ch in chains]
+        assert evaluate_chains_smart(board, chains).tolist() == smart
+        assert (
+            evaluate_chains_heuristics(board, chains, heur.weights, _CENTER_CELLS).tolist()
+            == scalar
+        )
+        checked += len(chains)
+    assert checked > 500
+
+
+def test_chain_batch_layout():
+    board = PackedBoard(bytes(range(1, 21)))
+    batch = ChainBatch(board, [[(0, 0), (0, 1)], [5, 9, 13]])
+    assert batch.index.tolist() == [[0, 1, -1], [5, 9, 13]]
+    assert batch.mask.sum(axis=1).tolist() == [2, 3]
+    assert batch.straight().tolist() == [True, True]
+
+
+def test_policy_batch_switch():
+    board, chains = next(_boards(1, seed=3))
+    chains = (chains * BATCH_MIN_CHAINS)[: BATCH_MIN_CHAINS + 1]
+    policy = SmartPolicy([4, 5, 3, 6, 2, 7, 8, 9])
+    assert policy.evaluate_chains(chains, board) == [
+        policy.evaluate_chain_smart(ch, board) for ch in chains
+    ]
+
+
+def main():
+    test_batch_matches_scalar_scores()
+    test_chain_batch_layout()
+    test_policy_batch_switch()
+    print("✅ batch_eval_2248: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
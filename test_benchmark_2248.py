@@ -0,0 +1,47 @@
+# test_benchmark_2248.py
+import benchmark_2248
+from benchmark_2248 import build_profiles, compare_with_baseline, run_profile
+from simulator_2248 import SmartPolicy
+
+
+def test_benchmark_profile_and_baseline():
+    stats = run_profile(SmartPolicy([4, 5, 3, 6, 2, 7, 8, 9]), 2, 1, 10, {})
+    assert stats["games"] == 2 and stats["moves"] > 0
+    assert stats["decisions_per_sec"] > 0
+
+    report = {"profiles": {"p": stats}}
+    slower = dict(stats, decisions_per_sec=stats["decisions_per_sec"] * 10)
+    assert compare_with_baseline(report, {"profiles": {"p": stats}}, 0.1) == []
+    assert compare_with_baseline(report, {"profiles": {"p": slower}}, 0.1)
+
+
+def test_order_index_out_of_range_is_rejected():
+    real_load = benchmark_2248.load_orders
+    benchmark_2248.load_orders = lambda: [[4, 5, 3, 6, 2, 7, 8, 9], [5, 4, 3, 6, 2, 7, 8, 9]]
+    try:
+        assert list(build_profiles([1], [], [])) == ["order:1"]
+        for idx in (2, -1):
+            try:
+                build_profiles([idx], [], [])
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"order:{idx} не должен заворачиваться по модулю")
+        try:
+            benchmark_2248.main(["--orders", "5"])
+        except SystemExit:
+            pass
+        else:
+            raise AssertionError("--orders 5 должен отвергаться")
+    finally:
+        benchmark_2248.load_orders = real_load
+
+
+def main():
+    test_benchmark_profile_and_baseline()
+    test_order_index_out_of_range_is_rejected()
+    print("✅ benchmark_2248: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
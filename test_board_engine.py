@@ -0,0 +1,134 @@
+# test_board_engine.py
+import random
+
+import constants as const
+from board_engine import (
+    CELL_COUNT,
+    FORWARD_PAIRS,
+    NEIGHBORS4,
+    NEIGHBORS8,
+    NEIGHBOR8_MASK,
+    PackedBoard,
+    chain_to_indices,
+    simulate_after_clear,
+    cells_mask,
+    count_potential_pairs,
+)
+from zobrist import hash_cells, update_hash
+
+BOARD = [
+    [128, 64, 128, 512],
+    [256, 512, 256, 256],
+    [2, 2, 2, 256],
+    [64, 16, 8, 256],
+    [1024, 64, -1, 2048],
+]
+
+
+def test_roundtrip():
+    pb = PackedBoard.from_rows(BOARD)
+    assert pb.to_rows() == BOARD
+    assert pb.value(4, 3) == 2048
+    assert pb.exp(2, 0) == 1
+    assert pb.value(4, 2) == -1
+
+
+def test_neighbors():
+    # угол: 3 соседа по 8 направлениям, 2 по 4
+    assert len(NEIGHBORS8[0]) == 3
+    assert len(NEIGHBORS4[0]) == 2
+    # центр доски 5x4: 8 соседей
+    assert len(NEIGHBORS8[5]) == 8
+    assert NEIGHBOR8_MASK[5] == sum(1 << j for j in NEIGHBORS8[5])
+    assert CELL_COUNT == 20
+
+
+def test_incremental_hash():
+    pb = PackedBoard.from_rows(BOARD)
+    h = pb.hash
+    chain = [(2, 0), (2, 1), (2, 2)]
+    after = pb.cleared(chain_to_indices(chain))
+
+    rows = [row[:] for row in BOARD]
+    for r, c in chain:
+        rows[r][c] = -1
+    fresh = PackedBoard.from_rows(rows)
+
+    assert after.hash == fresh.hash
+    assert after.hash != h
+    # исходная доска не изменилась
+    assert pb.to_rows() == BOARD
+    assert pb.clone() is pb
+
+
+def test_zobrist_by_exponent():
+    pb = PackedBoard.from_rows(BOARD)
+    # хэш совпадает со старой таблицей (r, c, v) -> getrandbits(64) с сидом 2248:
+    # сохранённые хэши bad_moves / good_moves / seen_boards остаются верными
+    legacy_rng = random.Random(2248)
+    legacy = {
+        (r, c, v): legacy_rng.getrandbits(64)
+        for r in range(const.ROWS)
+        for c in range(const.COLS)
+        for v in range(0, 4097)
+    }
+    rows = [row[:] for row in BOARD]
+    rows[0][0] = -1
+    expected = 0
+    for r in range(const.ROWS):
+        for c in range(const.COLS):
+            expected ^= legacy[(r, c, max(rows[r][c], 0))]
+    assert PackedBoard.from_rows(rows).hash == expected
+    assert hash_cells(bytes(20)) != 0
+    # крупные тайлы больше не склеиваются в один ключ (4096 и 8192 различаются)
+    a = pb.with_cells([(19, 12)])
+    b = pb.with_cells([(19, 13)])
+    assert a.hash != b.hash
+    # одна замена клетки — инкрементально
+    assert update_hash(pb.hash, 19, pb.cells[19], 13) == b.hash
+
+
+def test_simulate_after_clear():
+    pb = PackedBoard.from_rows(BOARD)
+    chain = [(2, 0), (2, 1), (2, 2)]
+    useful, pairs = simulate_after_clear(pb, cells_mask(chain_to_indices(chain)))
+    assert useful == 16
+    # 256-256 по горизонтали и три 256 по вертикали в последнем столбце
+    assert pairs == 3
+
+
+def test_board_features():
+    pb = PackedBoard.from_rows(BOARD)
+    f = pb.features
+    assert pb.features is f  # строится один раз на доску
+    cells = pb.cells
+
+    assert f.exp_count[8] == 5  # 256 x5
+    assert f.occupied_count == 19
+    assert f.potential_pairs == tuple(
+        count_potential_pairs(cells, i) for i in range(CELL_COUNT)
+    )
+    assert f.equal_pairs == sum(
+        1 for i, j in FORWARD_PAIRS if cells[i] and cells[i] == cells[j]
+    )
+    # максимум — 2048 в углу; без него — 1024
+    assert f.max_order[0] == 19
+    assert f.max_outside(1 << 19) == 16
+
+    chain = chain_to_indices([(1, 2), (1, 3), (2, 3), (3, 3)])  # четыре 256
+    assert f.same_left(8, [cells[i] for i in chain])
+    assert not f.same_left(8, [8] * 5)
+
+
+def main():
+    test_roundtrip()
+    test_neighbors()
+    test_incremental_hash()
+    test_zobrist_by_exponent()
+    test_simulate_after_clear()
+    test_board_features()
+    print("✅ board_engine: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# test_build_best_moves.py
+from best_moves_manager import BestMovesManager
+from board_engine import PackedBoard
+from build_best_moves import PositionSearch, build_best_moves
+from decision_cache import search_strategy_version, weights_digest
+from position_memory import PositionMemory
+
+ORDER = [4, 5, 3, 6, 2, 7, 8, 9]
+
+BOARDS = [
+    [
+        [8, 16, 32, 64],
+        [4, 4, 8, 2],
+        [2, 2, 4, 2],
+        [16, 8, 4, 2],
+        [32, 64, 128, 256],
+    ],
+    [
+        [2, 4, 8, 16],
+        [2, 4, 8, 16],
+        [32, 64, 2, 4],
+        [32, 64, 2, 4],
+        [128, 256, 512, 1024],
+    ],
+]
+
+
+def _corpus(tmp_path):
+    memory = PositionMemory(tmp_path / "seen_positions.dat", legacy_path=None)
+    for rows in BOARDS:
+        board = PackedBoard.from_rows(rows)
+        memory.mark_seen(board.hash, board)
+    return memory
+
+
+def test_precompute_fills_book(tmp_path):
+    memory = _corpus(tmp_path)
+    book = BestMovesManager(tmp_path / "best_moves.json")
+    config = {"expectimax": {"depth": 1}}
+
+    assert build_best_moves(memory, book, "expectimax", ORDER, config) == 2
+    search = PositionSearch("expectimax", ORDER, config)
+    for board_hash, board in memory.positions():
+        assert book.get(board_hash) == search(bytes(board.cells))[0]
+        assert book.moves[board_hash]["engine"] == "expectimax:1"
+
+    # уже известные позиции без force не пересчитываются
+    assert build_best_moves(memory, book, "expectimax", ORDER, config) == 0
+
+    book.save()
+    warm = BestMovesManager(tmp_path / "best_moves.json")
+    assert warm.load() == 2
+    assert warm.moves == book.moves
+
+
+def test_parallel_matches_serial(tmp_path):
+    memory = _corpus(tmp_path)
+    serial, parallel = BestMovesManager(None), BestMovesManager(None)
+    build_best_moves(memory, serial, "beam", ORDER, {"beam": {"depth": 2}})
+    build_best_moves(memory, parallel, "beam", ORDER, {"beam": {"depth": 2}}, workers=2)
+    assert serial.moves == parallel.moves and len(serial) == 2
+
+
+def test_book_entries_are_versioned(tmp_path):
+    memory = _corpus(tmp_path)
+    book = BestMovesManager(None)
+    config = {"expectimax": {"depth": 1}}
+    build_best_moves(memory, book, "expectimax", ORDER, config)
+
+    version = search_strategy_version("expectimax", ORDER, config, weights_digest())
+    other = search_strategy_version("smart", ORDER, config, weights_digest())
+    for board_hash, _ in memory.positions():
+        assert book.get(board_hash, version) is not None
+        # ход другой стратегии (режим, порядок, веса) из книги не отдаётся
+        assert book.get(board_hash, other) is None
+
+    # сменили порядок длин — записи устарели и пересчитываются
+    assert build_best_moves(memory, book, "expectimax", ORDER[::-1], config) == 2
+    assert book.get(board_hash, version) is None
+
+
+def main():
+    import tempfile
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_precompute_fills_book(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_parallel_matches_serial(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_book_entries_are_versioned(Path(tmp))
+    print("✅ build_best_moves: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# test_color_classifier.py
+from color_classifier import ColorClassifier
+
+COLORS = {
+    "2": [[230, 230, 230], [228, 229, 231]],
+    "4": [[23, 90, 206]],
+    "8": [],
+    "adv": [[0, 0, 0]],
+}
+
+
+def test_classify_matches_loop_semantics():
+    clf = ColorClassifier()
+    clf.ensure_compiled(COLORS)
+    assert clf.labels == ["2", "4", "adv"]  # метки без образцов пропускаются
+
+    (label, dist, conf), (label2, _, conf2) = clf.classify(
+        [[229, 229, 230], [23, 90, 206]]
+    )
+    assert label == "2" and dist < 2 and conf > 0.9
+    assert label2 == "4" and conf2 == 1.0  # точное совпадение
+
+
+def test_recompile_only_on_change():
+    colors = {k: list(v) for k, v in COLORS.items()}
+    clf = ColorClassifier()
+    clf.ensure_compiled(colors)
+    samples = clf.samples
+    clf.ensure_compiled(colors)
+    assert clf.samples is samples
+
+    colors["8"].append([200, 100, 50])
+    clf.ensure_compiled(colors)
+    assert clf.samples is not samples and "8" in clf.labels
+    assert clf.classify([[201, 100, 50]])[0][0] == "8"
+
+
+def main():
+    test_classify_matches_loop_semantics()
+    test_recompile_only_on_change()
+    print("✅ color_classifier: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# test_decision_cache.py
+from decision_cache import DecisionCache, strategy_version
+
+CHAIN = [(2, 0), (2, 1), (1, 1)]
+
+
+def test_versioned_lookup_and_counters():
+    cache = DecisionCache(path=None)
+    v1 = strategy_version("smart", [4, 5, 3, 6, 2, 7, 8, 9])
+    v2 = strategy_version("smart", [8, 4, 2, 3, 6, 5, 7, 9])
+    assert v1 != v2
+
+    assert cache.get(42, v1) is None
+    cache.put(42, v1, CHAIN)
+    assert cache.get(42, v1) == CHAIN
+    assert cache.get(42, v2) is None
+
+    st = cache.stats()
+    assert (st["hits"], st["misses"], st["evictions"]) == (1, 2, 0)
+
+    cache.discard(42, v1)
+    assert len(cache) == 0 and cache.bytes_used == 0
+
+
+def test_lru_eviction_by_memory_budget():
+    cache = DecisionCache(path=None, max_bytes=DecisionCache._entry_size(bytes(3)) * 2)
+    cache.put(1, "v", CHAIN)
+    cache.put(2, "v", CHAIN)
+    cache.get(1, "v")  # 1 становится самой свежей
+    cache.put(3, "v", CHAIN)
+
+    assert cache.get(2, "v") is None
+    assert cache.get(1, "v") == CHAIN and cache.get(3, "v") == CHAIN
+    assert cache.evictions == 1
+    assert cache.bytes_used <= cache.max_bytes
+
+
+def test_persist_and_warm_load(tmp_path):
+    path = tmp_path / "decision_cache.json"
+    cache = DecisionCache(path)
+    cache.put(0xFFFF_FFFF_FFFF_FFFF, "v", CHAIN)
+    cache.put(7, "v", [(0, 0), (0, 1)])
+    cache.record_search(0.25)
+    cache.save()
+
+    warm = DecisionCache(path)
+    assert warm.load() == 2
+    # порядок LRU сохранён: самая старая запись — первая
+    assert list(warm.entries) == [(0xFFFF_FFFF_FFFF_FFFF, "v"), (7, "v")]
+    assert warm.get(0xFFFF_FFFF_FFFF_FFFF, "v") == CHAIN
+    assert warm.stats()["saved_sec"] == 0.25
+
+
+def main():
+    import tempfile
+    from pathlib import Path
+
+    test_versioned_lookup_and_counters()
+    test_lru_eviction_by_memory_budget()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_persist_and_warm_load(Path(tmp))
+    print("✅ decision_cache: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
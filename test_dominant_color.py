@@ -0,0 +1,54 @@
+# test_dominant_color.py
+import cv2
+import numpy as np
+
+from dominant_color import ESTIMATORS, estimate_dominant_color
+
+
+def make_cell():
+    """Плитка (BGR 200, 90, 23) с белой цифрой на тёмном фоне."""
+    img = np.full((300, 300, 3), 32, dtype=np.uint8)
+    img[30:270, 30:270] = (200, 90, 23)
+    img[130:170, 140:160] = (255, 255, 255)
+    return img
+
+
+def test_all_estimators_find_tile_color():
+    cell = make_cell()
+    for name in ESTIMATORS:
+        r, g, b = estimate_dominant_color(cell, name)
+        assert abs(r - 23) <= 2 and abs(g - 90) <= 2 and abs(b - 200) <= 2, name
+
+
+def test_deterministic_and_empty():
+    cell = make_cell()
+    noisy = np.clip(cell + np.random.RandomState(0).randint(-8, 8, cell.shape), 0, 255)
+    noisy = noisy.astype(np.uint8)
+    for name in ("kmeans1", "median", "hist"):
+        assert estimate_dominant_color(noisy, name) == estimate_dominant_color(noisy, name)
+    assert estimate_dominant_color(None) is None
+    assert estimate_dominant_color(cell[:0]) is None
+
+
+def test_kmeans1_leaves_global_rng_alone():
+    def draws():
+        out = np.empty(8, dtype=np.float32)
+        cv2.randu(out, 0, 1)
+        return out
+
+    cv2.setRNGSeed(11)
+    expected = draws()
+    cv2.setRNGSeed(11)
+    estimate_dominant_color(make_cell(), "kmeans1")
+    assert (draws() == expected).all()
+
+
+def main():
+    test_all_estimators_find_tile_color()
+    test_deterministic_and_empty()
+    test_kmeans1_leaves_global_rng_alone()
+    print("✅ dominant_color: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# test_expectimax_2248.py
+from board_engine import PackedBoard
+from expectimax_2248 import Expectimax2248, ExpectimaxPolicy
+from simulator_2248 import SmartPolicy
+
+ORDER = [4, 5, 3, 6, 2, 7, 8, 9]
+
+BOARD = [
+    [8, 16, 32, 64],
+    [4, 4, 8, 2],
+    [2, 2, 4, 2],
+    [16, 8, 4, 2],
+    [32, 64, 128, 256],
+]
+
+
+def test_spawn_outcomes_sum_to_one():
+    engine = Expectimax2248(SmartPolicy(ORDER), exact_outcomes=5)
+    board = PackedBoard.from_rows(BOARD)
+
+    one_empty = board.cleared([0])
+    exact = engine.spawn_outcomes(one_empty)
+    assert len(exact) == len(engine.sim.spawn_model.exps)
+    assert abs(sum(p for p, _ in exact) - 1.0) < 1e-9
+    assert all(child.cells[0] for _, child in exact)
+
+    sampled = engine.spawn_outcomes(board.cleared([0, 1, 2]))
+    assert len(sampled) == engine.spawn_samples
+    assert abs(sum(p for p, _ in sampled) - 1.0) < 1e-9
+
+    assert engine.spawn_outcomes(board) == [(1.0, board)]
+
+
+def test_search_depth_and_transposition_table():
+    engine = Expectimax2248(SmartPolicy(ORDER), depth=3, time_limit=None)
+    board = PackedBoard.from_rows(BOARD)
+
+    chain, value = engine.search(board)
+    assert chain and engine.completed_depth == 3
+    assert engine.nodes > 0 and engine.tt
+
+    # повторный поиск той же доски целиком отвечает из таблицы
+    again, again_value = engine.search(board)
+    assert (again, again_value) == (chain, value)
+    assert engine.nodes == 0 and engine.tt_hits > 0
+
+
+def test_root_filter_and_policy():
+    board = PackedBoard.from_rows(BOARD)
+    engine = Expectimax2248(SmartPolicy(ORDER), depth=2, time_limit=None)
+    best, _ = engine.search(board)
+    other, _ = engine.search(board, lambda ch: ch != best)
+    assert other is not None and other != best
+    assert engine.search(board, lambda ch: False) == (None, -engine.dead_end_penalty)
+
+    policy = ExpectimaxPolicy(ORDER, {"depth": 2, "time_limit": None})
+    assert policy(board) == best
+
+
+def main():
+    test_spawn_outcomes_sum_to_one()
+    test_search_depth_and_transposition_table()
+    test_root_filter_and_policy()
+    print("✅ expectimax_2248: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
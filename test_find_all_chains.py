@@ -0,0 +1,82 @@
+# test_find_all_chains.py
+from board_engine import PackedBoard, indices_to_chain
+import find_all_chains as fac
+from find_all_chains import enumerate_chains
+from simulator_2248 import SmartPolicy
+
+
+def chains_of(rows, max_paths=None, max_length=None):
+    cells = PackedBoard.from_rows(rows).cells
+    return [indices_to_chain(ch) for ch in enumerate_chains(cells, max_paths, max_length)]
+
+
+def test_only_maximal_chains():
+    board = [
+        [2, 2, 4, -1],
+        [-1, -1, -1, -1],
+        [-1, -1, -1, -1],
+        [-1, -1, -1, -1],
+        [-1, -1, -1, -1],
+    ]
+    chains = chains_of(board)
+    # [2, 2] вложена в [2, 2, 4] — остаётся только длинная
+    assert len(chains) == 1
+    assert sorted(chains[0]) == [(0, 0), (0, 1), (0, 2)]
+    assert chains[0][-1] == (0, 2)
+
+
+def test_doubling_start_is_not_a_chain():
+    board = [
+        [2, 4, -1, -1],
+        [-1, -1, -1, -1],
+        [-1, -1, -1, -1],
+        [-1, -1, -1, -1],
+        [-1, -1, -1, -1],
+    ]
+    assert chains_of(board) == []
+
+
+def test_length_and_path_caps():
+    board = [[2, 2, 2, 2] for _ in range(5)]
+    capped = chains_of(board, max_paths=None, max_length=4)
+    assert capped and all(len(ch) == 4 for ch in capped)
+
+    # лимит путей ограничивает перебор, но что-то всё равно находится
+    limited = chains_of(board, max_paths=500, max_length=None)
+    assert limited
+
+
+def test_long_chains_are_not_truncated():
+    # цепочка из 13 клеток длиннее любой длины порядка — отдаётся целиком
+    board = [
+        [2, 2, 4, 8],
+        [64, 32, 16, 16],
+        [128, 256, 256, 512],
+        [-1, -1, -1, 1024],
+        [-1, -1, -1, -1],
+    ]
+    policy = SmartPolicy([4, 5, 3, 6, 2, 7, 8, 9])
+    chains = policy.find_all_chains(PackedBoard.from_rows(board))
+    assert max(len(ch) for ch in chains) == 13
+
+
+def test_budget_truncated_result_is_not_cached():
+    cells = PackedBoard.from_rows([[2, 2, 2, 2] for _ in range(5)]).cells
+    fac.clear_chain_cache()
+    enumerate_chains(cells, 500, None)
+    assert not fac._chain_cache
+    full = enumerate_chains(cells, None, 4)
+    assert fac._chain_cache[(cells, None, 4)] == full
+
+
+def main():
+    test_only_maximal_chains()
+    test_doubling_start_is_not_a_chain()
+    test_length_and_path_caps()
+    test_long_chains_are_not_truncated()
+    test_budget_truncated_result_is_not_cached()
+    print("✅ find_all_chains: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
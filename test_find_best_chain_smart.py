@@ -0,0 +1,101 @@
+# test_find_best_chain_smart.py
+from board_engine import PackedBoard
+from find_best_chain_smart import (
+    chain_move_key,
+    find_best_chain_smart,
+    rank_chains,
+    score_chains,
+)
+from simulator_2248 import SmartPolicy
+
+ORDER = [4, 5, 3, 6, 2, 7, 8, 9]
+
+BOARD = [
+    [8, 16, 32, 64],
+    [4, 4, 8, 2],
+    [2, 2, 4, 2],
+    [16, 8, 4, 2],
+    [32, 64, 128, 256],
+]
+
+
+def _counting_eval(policy, board):
+    calls = []
+
+    def evaluate(chain):
+        calls.append(tuple(chain))
+        return policy.evaluate_chain_smart(chain, board)
+
+    return evaluate, calls
+
+
+def test_rank_chains_scores_each_chain_once():
+    board = PackedBoard.from_rows(BOARD)
+    policy = SmartPolicy([9, 8, 7, 6, 5, 4, 3, 2])
+    evaluate, calls = _counting_eval(policy, board)
+
+    ranking = rank_chains(
+        board.hash,
+        lambda h, key: False,
+        evaluate,
+        lambda: policy.find_all_chains(board),
+        policy.optimal_lengths,
+        verbose=True,
+    )
+
+    assert ranking.best is not None
+    assert len(calls) == len(set(calls)) == len(ranking.candidates)
+    scores = [item.score for item in ranking.candidates]
+    assert scores == sorted(scores, reverse=True)
+    assert ranking.bucket in (None, len(ranking.best.chain))
+    assert ranking.score_of(ranking.best.chain) == ranking.best.score
+
+    # тот же выбор, что и у find_best_chain_smart
+    assert ranking.best.chain == find_best_chain_smart(
+        None,
+        board.hash,
+        lambda h, key: False,
+        lambda ch: policy.evaluate_chain_smart(ch, board),
+        lambda: policy.find_all_chains(board),
+        policy.optimal_lengths,
+        verbose=False,
+    )
+
+
+def test_rank_chains_skips_blacklisted():
+    board = PackedBoard.from_rows(BOARD)
+    policy = SmartPolicy(ORDER)
+    first = rank_chains(
+        board.hash,
+        lambda h, key: False,
+        lambda ch: policy.evaluate_chain_smart(ch, board),
+        lambda: policy.find_all_chains(board),
+        ORDER,
+        verbose=False,
+    )
+    banned = chain_move_key(first.best.chain)
+    second = rank_chains(
+        board.hash,
+        lambda h, key: key == banned,
+        lambda ch: policy.evaluate_chain_smart(ch, board),
+        lambda: policy.find_all_chains(board),
+        ORDER,
+        verbose=False,
+    )
+    assert all(chain_move_key(item.chain) != banned for item in second.candidates)
+
+
+def test_score_chains_is_stable():
+    ranked = score_chains([[(0, 0)], [(0, 1)], [(0, 2)]], lambda ch: 1 if ch[0][1] else 0)
+    assert [item.chain for item in ranked] == [[(0, 1)], [(0, 2)], [(0, 0)]]
+
+
+def main():
+    test_rank_chains_scores_each_chain_once()
+    test_rank_chains_skips_blacklisted()
+    test_score_chains_is_stable()
+    print("✅ find_best_chain_smart: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
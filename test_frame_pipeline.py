@@ -0,0 +1,64 @@
+# test_frame_pipeline.py
+import numpy as np
+
+import constants as const
+from frame_pipeline import FramePipeline, cell_roi
+
+GRID = [[(100 + 200 * c, 100 + 200 * r) for c in range(const.COLS)] for r in range(const.ROWS)]
+
+
+class FakeScreen:
+    def __init__(self, img):
+        self.img = img
+        self.calls = 0
+
+    def grab_screen_cv2(self):
+        self.calls += 1
+        return self.img
+
+
+def test_cell_roi_view_and_edge_padding():
+    img = np.arange(40 * 30 * 3, dtype=np.uint8).reshape(40, 30, 3)
+    roi = cell_roi(img, 15, 20, 5)
+    assert roi.shape == (10, 10, 3) and np.shares_memory(roi, img)
+
+    edge = cell_roi(img, 2, 2, 5)  # вылезает за левый верхний угол
+    assert edge.shape == (10, 10, 3) and not np.shares_memory(edge, img)
+    assert (edge[:3, :3] == 0).all()
+    assert (edge[3:, 3:] == img[0:7, 0:7]).all()
+
+
+def test_capture_slices_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(const, "CELLS_DIR", tmp_path)
+    img = np.zeros((1000, 800, 3), dtype=np.uint8)
+    img[280:320, 480:520] = (10, 20, 30)  # центр клетки (1, 2)
+
+    pipeline = FramePipeline(FakeScreen(img), {"grid": GRID}, pad=20)
+    frame = pipeline.capture("move1")
+    assert len(frame.cells) == const.ROWS and len(frame.cells[0]) == const.COLS
+    assert (frame.cells[1][2] == (10, 20, 30)).all()
+    assert list(tmp_path.iterdir()) == []  # без save_frames на диск ничего
+
+    pipeline.config["save_frames"] = True
+    monkeypatch.setattr(const, "MOVES_DIR", tmp_path)
+    pipeline.capture("move2")
+    assert (tmp_path / "move2.png").exists() and (tmp_path / "cell_4_3.png").exists()
+
+
+def main():
+    import tempfile
+    from pathlib import Path
+
+    test_cell_roi_view_and_edge_padding()
+
+    class _Patch:
+        def setattr(self, obj, name, value):
+            setattr(obj, name, value)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_capture_slices_in_memory(Path(tmp), _Patch())
+    print("✅ frame_pipeline: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# test_gesture_compiler.py
+import base64
+import re
+import shlex
+import struct
+
+import constants as const
+from gesture_compiler import (
+    EV_SYN,
+    SYN_REPORT,
+    GestureCompiler,
+    chain_events,
+    frame_chunks,
+    pack_events,
+)
+from input_controller import InputController
+
+GRID = [[(60 + 60 * c, 80 + 70 * r) for c in range(const.COLS)] for r in range(const.ROWS)]
+CHAIN = [(0, 0), (0, 1), (1, 1), (2, 2)]
+
+
+class FakeSp:
+    def __init__(self, config):
+        self.config = config
+        self.gx_min = self.gx_max = self.gy_min = self.gy_max = None
+        self.commands = []
+
+    def _init_grid_bounds(self):
+        grid = self.config["grid"]
+        self.gx_min, self.gy_min = grid[0][0]
+        self.gx_max, _ = grid[0][const.COLS - 1]
+        _, self.gy_max = grid[const.ROWS - 1][0]
+
+    def adb_command(self, cmd, capture_output=False):
+        self.commands.append(cmd)
+        return True
+
+
+def _sendevent_triples(script_cmd):
+    script = shlex.split(script_cmd)[2]
+    return [
+        tuple(int(v) for v in part.split()[2:])
+        for part in script.split("; ")
+    ]
+
+
+def _writes(cmd):
+    """Куски, которые команда пишет в устройство, по порядку."""
+    remote = shlex.split(cmd)[2]
+    return [
+        base64.b64decode(data)
+        for data in re.findall(r"echo (\S+) \| base64 -d > ", remote)
+    ]
+
+
+def gc_points(config):
+    return GestureCompiler(InputController(FakeSp(config)).to_abs_coords).chain_points(
+        config, CHAIN, steps=2
+    )
+
+
+def test_events_match_sendevent_script():
+    config = {"grid": GRID}
+    sp = FakeSp(config)
+    ic = InputController(sp)
+
+    assert ic.perform_chain_swipe_mt(config, CHAIN, [[2] * 4] * 5, steps=2)
+    expected = _sendevent_triples(sp.commands[-1])
+
+    config["gesture_mode"] = "events"
+    assert ic.perform_chain_swipe_mt(config, CHAIN, [[2] * 4] * 5, steps=2)
+    cmd = sp.commands[-1]
+    assert cmd.endswith(f'> {const.EVENT_DEV}"')
+    writes = _writes(cmd)
+    # кадр за кадром: DOWN, каждое перемещение, UP — с паузами между ними
+    assert len(writes) == cmd.count("sleep 0.008") + 1 == len(gc_points(config)) + 1
+    payload = b"".join(writes)
+    assert len(payload) == 24 * len(expected)
+    events = [ev[2:] for ev in struct.iter_unpack("<qqHHi", payload)]
+    assert events == expected
+
+
+def test_cache_and_grid_change():
+    config = {"grid": [row[:] for row in GRID]}
+    sp = FakeSp(config)
+    gc = GestureCompiler(InputController(sp).to_abs_coords)
+
+    first = gc.compile(config, CHAIN)
+    assert gc.compile(config, list(CHAIN)) is first
+    assert gc.stats() == {"cached": 1, "hits": 1, "misses": 1}
+
+    config["grid"][0][1] = (70, 90)  # перекалибровали сетку
+    assert gc.compile(config, CHAIN) != first
+    assert gc.stats()["cached"] == 1
+
+
+def test_printf_encoding_and_32bit_events():
+    events = chain_events([(1, 2), (3, 4)], pressure=7)
+    payload = pack_events(events, 16)
+    assert len(payload) == 16 * len(events)
+    assert struct.unpack_from("<llHHi", payload, 16 * 11)[2:] == (3, 57, -1)
+
+    config = {"grid": GRID}
+    gc = GestureCompiler(lambda cfg, x, y: (x, y), encoding="printf", event_size=16)
+    remote = shlex.split(gc.compile(config, CHAIN))[2]
+    data = b"".join(
+        bytes(int(o, 8) for o in re.findall(r"\\(\d{3})", escaped))
+        for escaped in re.findall(r"printf '([^']*)' > ", remote)
+    )
+    points = gc.chain_points(config, CHAIN)
+    assert data == pack_events(chain_events(points), 16)
+
+
+def test_frame_chunks_are_whole_events_ending_in_syn():
+    events = chain_events([(i, i) for i in range(200)])
+    for size in (24, 16):
+        chunks = frame_chunks(events, size)
+        assert b"".join(chunks) == pack_events(events, size)
+        assert len(chunks) == 201  # DOWN, 199 перемещений, UP
+        for chunk in chunks:
+            assert len(chunk) % size == 0
+            fmt = "<qqHHi" if size == 24 else "<llHHi"
+            assert struct.unpack_from(fmt, chunk, len(chunk) - size)[2:4] == (EV_SYN, SYN_REPORT)
+
+    # кадр длиннее лимита режется по границам событий
+    long_frame = [(3, 53, i) for i in range(10)] + [(EV_SYN, SYN_REPORT, 0)]
+    chunks = frame_chunks(long_frame, 24, max_bytes=24 * 4)
+    assert [len(c) // 24 for c in chunks] == [4, 4, 3]
+    assert b"".join(chunks) == pack_events(long_frame, 24)
+
+
+def main():
+    test_events_match_sendevent_script()
+    test_cache_and_grid_change()
+    test_printf_encoding_and_32bit_events()
+    test_frame_chunks_are_whole_events_ending_in_syn()
+    print("✅ gesture_compiler: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
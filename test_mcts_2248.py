@@ -0,0 +1,78 @@
+# test_mcts_2248.py
+from board_engine import PackedBoard, chain_to_indices
+from mcts_2248 import GreedyRollout, MCTS2248, MCTSPolicy
+from simulator_2248 import SmartPolicy, is_valid_chain
+
+ORDER = [4, 5, 3, 6, 2, 7, 8, 9]
+
+BOARD = [
+    [8, 16, 32, 64],
+    [4, 4, 8, 2],
+    [2, 2, 4, 2],
+    [16, 8, 4, 2],
+    [32, 64, 128, 256],
+]
+
+
+def test_greedy_rollout_is_seeded():
+    rollout = GreedyRollout(depth=4)
+    after = PackedBoard.from_rows(BOARD).cleared([0, 1])
+    assert rollout((after.cells, 7)) == rollout((after.cells, 7))
+    assert rollout.best_chain(PackedBoard.from_rows(BOARD)) is not None
+
+
+def test_search_reports_root_visits():
+    board = PackedBoard.from_rows(BOARD)
+    engine = MCTS2248(
+        SmartPolicy(ORDER), iterations=60, time_limit=None, workers=0, batch_size=4, seed=1
+    )
+    chain, stats = engine.search(board)
+
+    assert engine.simulations == 60
+    assert sum(st["visits"] for st in stats) == 60
+    assert all(st["visits"] > 0 for st in stats)
+    assert chain == stats[0]["chain"]
+    assert stats[0]["visits"] == max(st["visits"] for st in stats)
+    assert is_valid_chain(board, chain_to_indices(chain))
+
+    # тот же сид — тот же ход и та же статистика
+    again = MCTS2248(
+        SmartPolicy(ORDER), iterations=60, time_limit=None, workers=0, batch_size=4, seed=1
+    )
+    assert again.search(board) == (chain, stats)
+
+
+def test_root_filter_and_policy():
+    board = PackedBoard.from_rows(BOARD)
+    engine = MCTS2248(SmartPolicy(ORDER), iterations=20, time_limit=None, workers=0, seed=2)
+    best, _ = engine.search(board)
+    other, stats = engine.search(board, lambda ch: ch != best)
+    assert other is not None and all(st["chain"] != best for st in stats)
+    assert engine.search(board, lambda ch: False) == (None, [])
+
+    policy = MCTSPolicy(ORDER, {"iterations": 10, "time_limit": None, "workers": 0})
+    assert policy(board) is not None
+
+
+def test_process_pool_rollouts():
+    board = PackedBoard.from_rows(BOARD)
+    engine = MCTS2248(
+        SmartPolicy(ORDER), iterations=8, time_limit=None, workers=2, batch_size=4, seed=3
+    )
+    try:
+        chain, stats = engine.search(board)
+    finally:
+        engine.close()
+    assert chain is not None and sum(st["visits"] for st in stats) == 8
+
+
+def main():
+    test_greedy_rollout_is_seeded()
+    test_search_reports_root_visits()
+    test_root_filter_and_policy()
+    test_process_pool_rollouts()
+    print("✅ mcts_2248: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# test_move_pipeline.py
+import asyncio
+
+import numpy as np
+
+import constants as const
+from board_engine import PackedBoard, chain_to_indices, indices_to_chain
+from game_runner import GameRunner
+from move_pipeline import MovePipeline, prediction_holds
+from settle_detector import SettleDetector
+from simulator_2248 import Simulator2248
+
+GRID = [[(50 + 100 * c, 50 + 100 * r) for c in range(const.COLS)] for r in range(const.ROWS)]
+
+
+class FakeDevice:
+    """Экран + ввод: свайп сливает цепочку, пустые клетки заполняются двойками."""
+
+    def __init__(self, board: PackedBoard, end_labels=()):
+        self.board = board
+        self.sim = Simulator2248()
+        self.end_labels = list(end_labels)
+        self.swipes = []
+        self.restarts = 0
+        self.grabs = 0
+
+    def grab_screen_cv2(self):
+        self.grabs += 1
+        return np.zeros((10 * const.ROWS, 10 * const.COLS, 3), dtype=np.uint8)
+
+    def classify_image(self, img):
+        return self.end_labels.pop(0) if self.end_labels else None
+
+    def _tap_restart(self):
+        self.restarts += 1
+
+    def perform_chain_swipe_mt(self, config, chain, board, steps=1):
+        self.swipes.append(chain)
+        after, _ = self.sim.apply_chain(self.board, chain_to_indices(chain))
+        self.board = after.with_cells((i, 1) for i, e in enumerate(after.cells) if not e)
+        return True
+
+
+class FakeLogic:
+    def __init__(self, device: FakeDevice):
+        self.device = device
+        self.board = None
+        self.show_board_each_move = False
+        self.current_move_attempts = 0
+        self.last_move_hash = None
+        self.last_move_type = None
+        self.last_move_direction = None
+        self.last_ranking = None
+        self.searches = []
+        self.good = []
+
+    def recognize_board_with_confidence(self, frame):
+        packed = self.device.board
+        self.board = [
+            [(1 << packed.cells[r * const.COLS + c]) if packed.cells[r * const.COLS + c] else -1
+             for c in range(const.COLS)]
+            for r in range(const.ROWS)
+        ]
+        return self.board, None
+
+    def on_new_board(self):
+        pass
+
+    def packed_board(self):
+        return PackedBoard.from_rows(self.board)
+
+    def find_best_chain_smart(self, board_hash, board=None, use_cache=True):
+        self.searches.append(use_cache)
+        cells = board.cells
+        for i in range(len(cells) - 1):
+            if cells[i] and i % const.COLS != const.COLS - 1 and cells[i] == cells[i + 1]:
+                return indices_to_chain([i, i + 1])
+        return None
+
+    def is_move_blacklisted(self, board_hash, move_key):
+        return False
+
+    def simulate_board_after_move(self, chain):
+        return 0, 0
+
+    def chain_score(self, chain):
+        return 1.0
+
+    def remember_good_move(self, board_hash, **kwargs):
+        self.good.append(board_hash)
+
+    def remember_bad_move(self, move_context):
+        pass
+
+
+class FakeRunner:
+    _register_attempt = GameRunner._register_attempt
+    _plan_chain_move = GameRunner._plan_chain_move
+    _on_chain_done = GameRunner._on_chain_done
+
+    def __init__(self, device):
+        self.config = {"grid": GRID}
+        self.screen_processor = device
+        self.end_handler = device
+        self.input = device
+        self.game_logic = FakeLogic(device)
+        self._stop_requested = False
+
+
+def make_settle(device):
+    return SettleDetector(device.grab_screen_cv2, interval=0.0, min_wait=0.0)
+
+
+def make_board():
+    # ряд двоек снизу, выше — чередование, чтобы пары были только внизу
+    cells = [(r + c) % 2 + 3 for r in range(const.ROWS) for c in range(const.COLS)]
+    for c in range(const.COLS):
+        cells[(const.ROWS - 1) * const.COLS + c] = 1
+    return PackedBoard(bytes(cells))
+
+
+def test_prediction_holds_ignores_empty_cells():
+    predicted = PackedBoard(bytes([0, 2, 3] + [1] * (const.ROWS * const.COLS - 3)))
+    spawned = predicted.with_cells([(0, 5)])
+    assert prediction_holds(predicted, spawned)
+    assert not prediction_holds(predicted, predicted.with_cells([(1, 4)]))
+
+
+def test_pipeline_plays_moves_and_uses_speculation():
+    device = FakeDevice(make_board())
+    runner = FakeRunner(device)
+    pipeline = MovePipeline(runner, settle=make_settle(device))
+
+    stats = asyncio.run(pipeline.run(max_moves=4))
+    assert stats["moves"] == 4 and len(device.swipes) == 4
+    # после первого хода следующая доска предсказуема: ходы готовы заранее
+    assert stats["speculative_hits"] == 3 and stats["speculative_misses"] == 0
+    assert runner.game_logic.searches == [True, False, False, False, False]
+    assert stats["moves_per_minute"] > 0
+    # кадр, на котором экран успокоился, и есть следующий захват:
+    # 1 стартовый скриншот + 3 кадра ожидания на каждый из 4 ходов
+    assert device.grabs == 1 + 3 * 4
+
+
+def test_pipeline_restarts_on_end_screen():
+    device = FakeDevice(make_board(), end_labels=["lose"])
+    runner = FakeRunner(device)
+    pipeline = MovePipeline(runner, settle=make_settle(device), speculate=False)
+
+    stats = asyncio.run(pipeline.run(max_moves=3))
+    assert device.restarts == 1 and stats["restarts"] == 1
+    assert stats["moves"] == 2 and runner.game_logic.searches == [True, True]
+
+
+def main():
+    test_prediction_holds_ignores_empty_cells()
+    test_pipeline_plays_moves_and_uses_speculation()
+    test_pipeline_restarts_on_end_screen()
+    print("✅ move_pipeline: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# test_order_tournament.py
+from order_tournament import main as tournament_main
+from order_tournament import successive_halving
+
+
+def test_order_tournament_halving():
+    orders = [[4, 5, 3, 6, 2, 7, 8, 9], [2, 3, 4, 5, 6, 7, 8, 9], [9, 8, 7, 6, 5, 4, 3, 2]]
+    stats = successive_halving(orders, [0, 1, 2], 1, 3, 1, 1, {}, 10)
+    assert set(stats) == {0, 1, 2}
+    # после первого раунда остаётся один порядок — второй раунд не играется
+    assert all(st["games"] == 1 and st["round"] == 0 for st in stats.values())
+
+
+def test_eta_below_two_is_rejected():
+    # eta = 1 не сокращает поле — турнир не закончился бы
+    for eta in ("1", "0"):
+        try:
+            tournament_main(["--eta", eta])
+        except SystemExit:
+            pass
+        else:
+            raise AssertionError(f"eta={eta} должен отвергаться")
+
+
+def main():
+    test_order_tournament_halving()
+    test_eta_below_two_is_rejected()
+    print("✅ order_tournament: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# test_persistence.py
+import json
+import time
+
+from persistence import WriteBehindStore
+
+
+def test_flush_writes_only_dirty_files(tmp_path):
+    store = WriteBehindStore(interval=60)
+    data = {"a": [1]}
+    calls = []
+
+    def producer():
+        calls.append(1)
+        return data
+
+    path = tmp_path / "sub" / "bad_moves.json"
+    store.register(path, producer)
+    assert store.flush() == 0 and not path.exists()
+
+    for _ in range(5):
+        data["a"].append(2)
+        store.mark_dirty(path)
+    assert not path.exists()  # ничего не пишется в момент пометки
+
+    assert store.flush() == 1
+    assert len(calls) == 1  # пять пометок — одна запись
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": [1, 2, 2, 2, 2, 2]}
+    assert not list(tmp_path.glob("sub/*.tmp"))
+    store.close()
+
+
+def test_background_flush_by_count_and_close(tmp_path):
+    store = WriteBehindStore(interval=60, max_pending=3)
+    path = tmp_path / "stats.json"
+    store.register(path, lambda: {"games": 3})
+    for _ in range(3):
+        store.mark_dirty(path)
+
+    deadline = time.time() + 5
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert json.loads(path.read_text(encoding="utf-8")) == {"games": 3}
+
+    other = tmp_path / "problem_cells.json"
+    store.register(other, lambda: {"problems": []})
+    store.mark_dirty(other)
+    store.close()  # гарантированный сброс при выходе
+    assert json.loads(other.read_text(encoding="utf-8")) == {"problems": []}
+
+
+def test_changed_during_serialization_is_retried(tmp_path):
+    store = WriteBehindStore(interval=60)
+    path = tmp_path / "good_moves.json"
+    attempts = []
+
+    def producer():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("dictionary changed size during iteration")
+        return {"ok": True}
+
+    store.register(path, producer)
+    store.mark_dirty(path)
+    assert store.flush() == 0 and store.dirty
+    assert store.flush() == 1 and not store.dirty
+    assert json.loads(path.read_text(encoding="utf-8")) == {"ok": True}
+    store.close()
+
+
+def main():
+    import tempfile
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_flush_writes_only_dirty_files(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_background_flush_by_count_and_close(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_changed_during_serialization_is_retried(Path(tmp))
+    print("✅ persistence: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
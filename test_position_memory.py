@@ -0,0 +1,110 @@
+# test_position_memory.py
+import json
+
+from board_engine import PackedBoard
+from position_memory import PositionMemory
+
+BOARD = [
+    [8, 16, 32, 64],
+    [4, 4, 8, 2],
+    [2, 2, 4, 2],
+    [16, 8, 4, 2],
+    [32, 64, 128, 256],
+]
+
+
+def test_corpus_round_trip(tmp_path):
+    path = tmp_path / "seen_positions.dat"
+    board = PackedBoard.from_rows(BOARD)
+
+    memory = PositionMemory(path, legacy_path=None)
+    memory.mark_seen(board.hash, board)
+    memory.mark_seen(123)  # хэш без доски
+    assert path.with_suffix(".log").stat().st_size == 2 * 28
+
+    # журнал переигрывается при старте, без сжатия
+    warm = PositionMemory(path, legacy_path=None)
+    assert warm.was_seen(board.hash) and warm.was_seen(123)
+    assert not warm.was_seen(124)
+    assert warm.board_of(board.hash) == board
+    assert warm.board_of(board.hash).hash == board.hash
+    assert warm.board_of(123) is None
+    assert [h for h, _ in warm.positions()] == [board.hash]
+    assert len(warm) == 2
+
+
+def test_torn_log_tail_is_truncated(tmp_path):
+    path = tmp_path / "seen_positions.dat"
+    log = path.with_suffix(".log")
+    board = PackedBoard.from_rows(BOARD)
+    PositionMemory(path, legacy_path=None).mark_seen(board.hash, board)
+    with open(log, "ab") as f:
+        f.write(b"\x01" * 11)  # обрыв посреди записи
+
+    memory = PositionMemory(path, legacy_path=None)
+    assert log.stat().st_size == 28
+    memory.mark_seen(77)
+
+    warm = PositionMemory(path, legacy_path=None)
+    assert warm.was_seen(77) and warm.board_of(board.hash) == board
+
+
+def test_compaction_and_lookup(tmp_path):
+    path = tmp_path / "seen_positions.dat"
+    board = PackedBoard.from_rows(BOARD)
+    memory = PositionMemory(path, legacy_path=None, compact_every=64)
+    hashes = [(k * 0x9E3779B97F4A7C15) & (2**64 - 1) for k in range(1, 200)]
+    for h in hashes:
+        memory.mark_seen(h)
+    memory.mark_seen(board.hash, board)
+    memory.compact()
+    assert not path.with_suffix(".log").exists()
+
+    warm = PositionMemory(path, legacy_path=None)
+    assert not warm.pending and len(warm) == len(hashes) + 1
+    assert all(warm.was_seen(h) for h in hashes)
+    assert not any(warm.was_seen(h + 1) for h in hashes)
+    assert warm.board_of(board.hash) == board
+
+    # доска для хэша, сжатого без доски, дописывается журналом
+    warm.mark_seen(hashes[0], board)
+    assert warm.board_of(hashes[0]) == board
+    warm.close()
+    assert PositionMemory(path, legacy_path=None).board_count() == 2
+
+
+def test_legacy_json_is_imported(tmp_path):
+    legacy = tmp_path / "seen_boards.json"
+    board = PackedBoard.from_rows(BOARD)
+    legacy.write_text(
+        json.dumps(
+            {
+                "seen_hashes": [f"{board.hash:016x}", "00000000000000ff"],
+                "boards": {f"{board.hash:016x}": bytes(board.cells).hex()},
+            }
+        )
+    )
+
+    memory = PositionMemory(tmp_path / "seen_positions.dat", legacy_path=legacy)
+    assert memory.was_seen(0xFF) and memory.board_of(0xFF) is None
+    assert memory.board_of(board.hash) == board
+    assert (tmp_path / "seen_positions.dat").exists()
+
+
+def main():
+    import tempfile
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_corpus_round_trip(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_torn_log_tail_is_truncated(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_compaction_and_lookup(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_legacy_json_is_imported(Path(tmp))
+    print("✅ position_memory: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
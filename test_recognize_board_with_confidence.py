@@ -0,0 +1,46 @@
+# test_recognize_board_with_confidence.py
+from types import SimpleNamespace
+
+import constants as const
+from recognize_board_with_confidence import recognize_board_with_confidence
+
+COLORS = {"2": [[200, 200, 200]], "1024": [[10, 120, 240]]}
+
+
+class FakeScreen:
+    def extract_color_from_image(self, img):
+        return img  # «срез кадра» — сразу цвет клетки
+
+
+def make_logic(max_samples):
+    colors = {label: [list(c) for c in samples] for label, samples in COLORS.items()}
+    return SimpleNamespace(
+        config={"calibrated": True, "colors": colors, "max_samples": max_samples},
+        screen_processor=FakeScreen(),
+        adaptive_threshold=8000,
+        confidence_threshold=0.7,
+    )
+
+
+def test_big_tiles_add_colour_samples_up_to_cap():
+    cells = [[(200, 200, 200)] * const.COLS for _ in range(const.ROWS)]
+    cells[0][0] = (12, 118, 238)
+    cells[0][1] = (11, 121, 241)
+    frame = SimpleNamespace(cells=cells)
+
+    gl = make_logic(max_samples=2)
+    board, _ = recognize_board_with_confidence(gl, frame)
+    assert board[0][0] == 1024 and board[0][1] == 1024 and board[1][1] == 2
+    # образец 1024 добавлен один раз — дальше упёрлись в max_samples
+    assert gl.config["colors"]["1024"] == [[10, 120, 240], [12, 118, 238]]
+    # мелкие числа образцы не копят
+    assert gl.config["colors"]["2"] == [[200, 200, 200]]
+
+
+def main():
+    test_big_tiles_add_colour_samples_up_to_cap()
+    print("✅ recognize_board_with_confidence: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# test_screen_capture.py
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import constants as const
+from fake_adb import raw_screencap
+from frame_pipeline import FramePipeline
+from screen_capture import ScreenCapture, grid_bounds, parse_raw_header, raw_to_bgr
+
+FAKE_ADB = [sys.executable, str(Path(__file__).with_name("fake_adb.py"))]
+GRID = [[(60 + 60 * c, 80 + 70 * r) for c in range(const.COLS)] for r in range(const.ROWS)]
+
+
+def make_screen():
+    rng = np.random.RandomState(1)
+    return rng.randint(0, 256, (500, 320, 3)).astype(np.uint8)
+
+
+def test_parse_raw_both_headers():
+    img = make_screen()
+    for header_size in (12, 16):
+        raw = raw_screencap(img, header_size)
+        w, h, fmt, hs = parse_raw_header(raw)
+        assert (w, h, fmt, hs) == (320, 500, 1, header_size)
+        assert (raw_to_bgr(raw, w, fmt, hs) == img).all()
+
+
+def test_fake_adb_raw_crop_and_png(tmp_path, monkeypatch):
+    img = make_screen()
+    frame_path = tmp_path / "frame.png"
+    cv2.imwrite(str(frame_path), img)
+    monkeypatch.setenv("FAKE_ADB_FRAMES", str(frame_path))
+
+    cap = ScreenCapture(FAKE_ADB)
+    assert (cap.grab() == img).all()
+
+    box = grid_bounds(GRID, 20)
+    region, (x0, y0) = cap.grab_region(box)  # строки режутся "на телефоне"
+    assert (x0, y0) == (box[0], box[1])
+    assert (region == img[box[1] : box[3], box[0] : box[2]]).all()
+
+    assert (ScreenCapture(FAKE_ADB, mode="png").grab() == img).all()
+
+    class Sp:
+        def grab_grid_region(self, pad):
+            return cap.grab_region(grid_bounds(GRID, pad))
+
+    frame = FramePipeline(Sp(), {"grid": GRID}, pad=20).capture()
+    x, y = GRID[4][3]
+    assert (frame.cells[4][3] == img[y - 20 : y + 20, x - 20 : x + 20]).all()
+
+
+def main():
+    import os
+    import tempfile
+
+    test_parse_raw_both_headers()
+
+    class _Patch:
+        def setenv(self, name, value):
+            os.environ[name] = value
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_fake_adb_raw_crop_and_png(Path(tmp), _Patch())
+    print("✅ screen_capture: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
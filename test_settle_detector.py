@@ -0,0 +1,78 @@
+# test_settle_detector.py
+import numpy as np
+
+from settle_detector import SettleDetector, frame_delta, thumbnail
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def frames_changing_for(n_changing, total=100):
+    """n_changing разных кадров (анимация), потом один и тот же."""
+    frames = []
+    for i in range(total):
+        level = min(i, n_changing) * 40 % 256
+        frames.append(np.full((60, 40, 3), level, dtype=np.uint8))
+    return iter(frames)
+
+
+def make_detector(frames, clock, **kwargs):
+    return SettleDetector(
+        lambda: next(frames), interval=0.05, clock=clock, sleep=clock.sleep, **kwargs
+    )
+
+
+def test_thumbnail_and_delta():
+    img = np.zeros((480, 320, 3), dtype=np.uint8)
+    thumb = thumbnail(img, (32, 24))
+    assert thumb.shape == (24, 32) and thumb.dtype == np.float32
+    assert frame_delta(thumb, thumb + 10) == 10.0
+
+
+def test_returns_once_frames_stop_changing():
+    clock = FakeClock()
+    detector = make_detector(frames_changing_for(4), clock, min_wait=0.0, stable_frames=2)
+    assert detector.wait(timeout=5.0)
+    # кадры 0..4 меняются, 5 и 6 совпадают с 4 -> 7 кадров, 6 пауз
+    assert abs(detector.last_wait - 0.30) < 1e-9
+    assert detector.last_frame is not None
+    assert detector.stats()["timeouts"] == 0
+
+
+def test_times_out_while_screen_keeps_changing():
+    clock = FakeClock()
+    detector = make_detector(frames_changing_for(1000), clock, min_wait=0.1)
+    assert not detector.wait(timeout=1.0)
+    assert 1.0 <= detector.last_wait < 1.1
+    assert detector.stats() == {
+        "waits": 1, "timeouts": 1, "total_wait": detector.last_wait,
+        "avg_wait": detector.last_wait,
+    }
+
+
+def test_missing_frames_do_not_count_as_stable():
+    clock = FakeClock()
+    frames = iter([None, None, None] + [np.zeros((10, 10, 3), np.uint8)] * 10)
+    detector = make_detector(frames, clock, min_wait=0.0, stable_frames=2)
+    assert detector.wait(timeout=5.0)
+    assert abs(detector.last_wait - 0.25) < 1e-9
+
+
+def main():
+    test_thumbnail_and_delta()
+    test_returns_once_frames_stop_changing()
+    test_times_out_while_screen_keeps_changing()
+    test_missing_frames_do_not_count_as_stable()
+    print("✅ settle_detector: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
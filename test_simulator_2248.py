@@ -0,0 +1,54 @@
+# test_simulator_2248.py
+from board_engine import PackedBoard, chain_to_indices
+from simulator_2248 import Simulator2248, SmartPolicy, is_valid_chain, merge_exp
+
+BOARD = [
+    [8, 16, 32, 64],
+    [4, 4, 8, 2],
+    [2, 2, 4, 2],
+    [16, 8, 4, 2],
+    [32, 64, 128, 256],
+]
+
+
+def test_merge_exp():
+    assert merge_exp(4) == 2  # 2+2 = 4
+    assert merge_exp(6) == 3  # 2+2+2 -> 8 (вверх)
+    assert merge_exp(6, "down") == 2
+    assert merge_exp(8) == 3
+
+
+def test_apply_chain_gravity():
+    sim = Simulator2248(seed=0)
+    board = PackedBoard.from_rows(BOARD)
+    chain = chain_to_indices([(2, 0), (2, 1), (1, 1)])  # 2, 2, 4 -> 8 в (1, 1)
+    assert is_valid_chain(board, chain)
+
+    after, gained = sim.apply_chain(board, chain)
+    rows = after.to_rows()
+    assert gained == 8
+    # столбец 0: 8, 4, [2 ушло], 16, 32 -> пусто сверху
+    assert [rows[r][0] for r in range(5)] == [-1, 8, 4, 16, 32]
+    # столбец 1: 16, [4 -> 8], [2 ушло], 8, 64
+    assert [rows[r][1] for r in range(5)] == [-1, 16, 8, 8, 64]
+    # хэш обновлён инкрементально и совпадает с полным пересчётом
+    assert after.hash == PackedBoard.from_rows(rows).hash
+
+
+def test_seeded_game_is_reproducible():
+    policy = SmartPolicy([4, 5, 3, 6, 2, 7, 8, 9])
+    a = Simulator2248(seed=7).play_game(policy, max_moves=30)
+    b = Simulator2248(seed=7).play_game(policy, max_moves=30)
+    assert a.moves > 0
+    assert (a.score, a.moves, a.final_board) == (b.score, b.moves, b.final_board)
+
+
+def main():
+    test_merge_exp()
+    test_apply_chain_gravity()
+    test_seeded_game_is_reproducible()
+    print("✅ simulator_2248: все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
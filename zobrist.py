@@ -0,0 +1,76 @@
+# zobrist.py
+"""
+Zobrist-хэш доски 2248.
+
+Ключи лежат в плоском списке, индекс = клетка * (MAX_EXP + 1) + показатель
+степени тайла (0 — пустая клетка). Применение цепочки обновляет хэш за
+O(длина цепочки): XOR старого ключа клетки и XOR нового.
+
+Ключи совпадают со старой таблицей ZOBRIST_TABLE[(r, c, v)] (random.seed(2248),
+getrandbits(64) в порядке r, c, v для v = 0..4096): для всех досок с тайлами
+до 4096 хэши те же, что записаны в bad_moves.json, good_moves.json и
+seen_boards.json. Показатели выше 12 старая таблица склеивала в ключ 4096 —
+для них ключи берутся новые, из того же генератора дальше.
+"""
+import random
+from typing import Iterable, Sequence, Tuple
+
+import constants as const
+
+CELL_COUNT = const.ROWS * const.COLS
+_STRIDE = const.MAX_EXP + 1
+
+
+# старая таблица: значения 0..4096, ключ значения v — по (r, c, v)
+_LEGACY_MAX_VALUE = 4096
+_LEGACY_MAX_EXP = 12
+
+
+def _build_keys():
+    # проигрываем последовательность старой таблицы целиком, по клеткам
+    rng = random.Random(const.ZOBRIST_SEED)
+    legacy = [
+        [rng.getrandbits(64) for _ in range(_LEGACY_MAX_VALUE + 1)]
+        for _ in range(CELL_COUNT)
+    ]
+    keys = []
+    for cell in range(CELL_COUNT):
+        keys.append(legacy[cell][0])  # пустая клетка
+        keys.extend(legacy[cell][1 << exp] for exp in range(1, _LEGACY_MAX_EXP + 1))
+        keys.extend(rng.getrandbits(64) for _ in range(_LEGACY_MAX_EXP + 1, const.MAX_EXP + 1))
+    return keys
+
+
+ZOBRIST_KEYS = _build_keys()
+
+
+def zobrist_key(index: int, exp: int) -> int:
+    return ZOBRIST_KEYS[index * _STRIDE + exp]
+
+
+def hash_cells(cells: Sequence[int]) -> int:
+    """Полный хэш по показателям степени клеток (bytes/list длиной CELL_COUNT)."""
+    h = 0
+    keys = ZOBRIST_KEYS
+    base = 0
+    for e in cells:
+        h ^= keys[base + e]
+        base += _STRIDE
+    return h
+
+
+def update_hash(board_hash: int, index: int, old_exp: int, new_exp: int) -> int:
+    """Хэш после замены одной клетки."""
+    base = index * _STRIDE
+    return board_hash ^ ZOBRIST_KEYS[base + old_exp] ^ ZOBRIST_KEYS[base + new_exp]
+
+
+def update_hash_many(
+    board_hash: int, changes: Iterable[Tuple[int, int, int]]
+) -> int:
+    """Хэш после нескольких замен: changes = [(index, old_exp, new_exp), ...]."""
+    keys = ZOBRIST_KEYS
+    for index, old_exp, new_exp in changes:
+        base = index * _STRIDE
+        board_hash ^= keys[base + old_exp] ^ keys[base + new_exp]
+    return board_hash